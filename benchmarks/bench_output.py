@@ -0,0 +1,50 @@
+"""compares the transform and instancer outputs of the scatter engine
+
+runs against the recording fake cmds, so the seconds column is only the
+python side of the engine. node and command counts are what the scene pays.
+
+    python benchmarks/bench_output.py 1000 10000 100000
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import scatter_engine  # noqa: E402
+from fake_maya import FakeCmds, grid_points  # noqa: E402
+
+
+def run(count, mode):
+    cmds = FakeCmds()
+    cmds.add_mesh('ground', grid_points(count))
+    cmds.add_mesh('proto', grid_points(4))
+    backend = scatter_engine.CmdsBackend(cmds)
+    nodes_before = len(cmds.nodes)
+
+    start = time.time()
+    indices = np.arange(len(cmds.meshes['ground']))
+    matrices = scatter_engine.face_up_matrices(backend, 'ground', indices)
+    if mode == 'instancer':
+        scatter_engine.build_instancer(backend, 'proto', matrices)
+    else:
+        scatter_engine.build_transforms(backend, 'proto', matrices,
+                                        translate_only=True)
+    elapsed = time.time() - start
+    return len(cmds.nodes) - nodes_before, sum(cmds.calls.values()), elapsed
+
+
+def main(counts):
+    print('%10s %12s %10s %10s %10s' % ('points', 'mode', 'nodes', 'calls',
+                                        'seconds'))
+    for count in counts:
+        for mode in ('transforms', 'instancer'):
+            nodes, calls, elapsed = run(count, mode)
+            print('%10d %12s %10d %10d %10.3f' % (count, mode, nodes, calls,
+                                                  elapsed))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
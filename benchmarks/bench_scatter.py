@@ -0,0 +1,168 @@
+"""times the Scatter tool phases against fake maya on synthetic meshes
+
+every phase reports wall seconds, peak traced memory and the number of
+fake cmds and api calls it made. rename_inst_obj_group runs inside
+scatter_obj and is reported on its own as well. seconds are taken with
+tracemalloc running, so they are only comparable between runs of this
+script.
+
+    python benchmarks/bench_scatter.py --sizes 1000 10000 100000 --save
+    python benchmarks/bench_scatter.py --sizes 1000 10000 100000
+
+the first writes the baseline, later runs compare against it and exit
+with status 1 when a phase regressed past the threshold.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import fake_maya  # noqa: E402
+
+CMDS, API = fake_maya.install()
+
+import scatter  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+PHASES = ('scatter_obj', 'rename_inst_obj_group', 'scatter_face_normal',
+          'scatter_rotate_obj', 'scatter_scale_obj', 'scatter_height_obj')
+
+
+class Recorder(object):
+    """accumulates seconds and calls of the phases run through it"""
+
+    def __init__(self):
+        self.results = {}
+
+    def measure(self, phase, func, *args):
+        """runs func as a top level phase, tracing its peak memory"""
+        calls = sum(CMDS.calls.values())
+        tracemalloc.start()
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.add(phase, elapsed, sum(CMDS.calls.values()) - calls, peak)
+
+    def add(self, phase, seconds, calls, peak=0):
+        result = self.results.setdefault(
+            phase, {'seconds': 0.0, 'calls': 0, 'peak_bytes': 0})
+        result['seconds'] += seconds
+        result['calls'] += calls
+        result['peak_bytes'] = max(result['peak_bytes'], peak)
+
+    def wrap(self, phase, method):
+        """times a method called from inside another phase"""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            calls = sum(CMDS.calls.values())
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(phase, time.time() - start,
+                         sum(CMDS.calls.values()) - calls)
+        return timed
+
+
+def run(mesh, count, density):
+    """every phase on a fresh scene holding one synthetic mesh"""
+    CMDS.reset()
+    CMDS.add_mesh('ground', *fake_maya.MESHES[mesh](count))
+    CMDS.add_mesh('proto', *fake_maya.grid_mesh(4))
+    recorder = Recorder()
+    tool = scatter.Scatter()
+    tool.def_density = density
+    tool.rename_inst_obj_group = recorder.wrap(
+        'rename_inst_obj_group', tool.rename_inst_obj_group)
+
+    CMDS.select('ground')
+    recorder.measure('scatter_obj', tool.scatter_obj, 'proto')
+    tool.is_face_normal = True
+    recorder.measure('scatter_face_normal', tool.scatter_obj, 'proto')
+
+    CMDS.select(CMDS.listRelatives(tool.last_group, children=True))
+    for phase in PHASES[3:]:
+        recorder.measure(phase, getattr(tool, phase))
+    return recorder.results
+
+
+def compare(results, baseline, threshold):
+    """lines describing every phase that regressed against baseline"""
+    regressions = []
+    for key, base in sorted(baseline.items()):
+        if key not in results:
+            continue
+        result = results[key]
+        if result['calls'] > base['calls']:
+            regressions.append('%s: %d calls, baseline %d'
+                               % (key, result['calls'], base['calls']))
+        for field in ('seconds', 'peak_bytes'):
+            limit = base[field] * (1 + threshold)
+            # skip noise on phases too short to time reliably
+            if field == 'seconds' and result[field] < 0.05:
+                continue
+            if result[field] > limit:
+                regressions.append('%s: %s %.4g, baseline %.4g'
+                                   % (key, field, result[field],
+                                      base[field]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='target vertex counts, up to 1000000')
+    parser.add_argument('--meshes', nargs='+', default=sorted(
+        fake_maya.MESHES), choices=sorted(fake_maya.MESHES))
+    parser.add_argument('--density', type=float, default=1.0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown and memory growth')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print('%-40s %10s %10s %12s' % ('phase', 'seconds', 'calls', 'peak MB'))
+    for mesh in args.meshes:
+        for count in args.sizes:
+            for phase, result in sorted(run(mesh, count,
+                                            args.density).items()):
+                key = '%s/%d/%s' % (mesh, count, phase)
+                results[key] = result
+                print('%-40s %10.3f %10d %12.1f'
+                      % (key, result['seconds'], result['calls'],
+                         result['peak_bytes'] / 1e6))
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as baseline_file:
+        regressions = compare(results, json.load(baseline_file),
+                              args.threshold)
+    for line in regressions:
+        print('REGRESSION ' + line)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
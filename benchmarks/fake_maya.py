@@ -0,0 +1,735 @@
+"""recording stand-ins for maya.cmds and maya.api.OpenMaya used by the
+benchmarks
+
+install() puts them, together with empty PySide2 and shiboken2 modules,
+into sys.modules so scatter.py imports outside of maya. plugin commands
+loaded through loadPlugin run for real and can be undone with undo.
+"""
+import collections
+import functools
+import os
+import sys
+import types
+
+import numpy as np
+
+
+class FakeCmds(object):
+    """records every command call and keeps a flat table of nodes
+
+    nodes are keyed by their short name, long names are built from the
+    parent of every node.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = collections.Counter()
+        self.nodes = {}
+        self.meshes = {}
+        self.normals = {}
+        self.polygons = {}
+        self.colors = {}
+        self.selection = []
+        self.next_index = 1
+        self.plugins = set()
+        self.commands = {}
+        self.undo_queue = []
+        self.redo_queue = []
+        self.undo_state = True
+
+    def add_mesh(self, name, points, normals=None, counts=None,
+                 connects=None):
+        """registers a mesh whose vertices are the (N, 3) points"""
+        points = np.asarray(points, dtype=np.float64)
+        self.meshes[name] = points
+        if normals is None:
+            normals = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+        self.normals[name] = np.asarray(normals, dtype=np.float64)
+        self.polygons[name] = (
+            np.asarray(counts if counts is not None else [], dtype=np.int32),
+            np.asarray(connects if connects is not None else [],
+                       dtype=np.int32))
+        self.nodes[name] = {'type': 'transform', 'parent': None, 'attrs': {}}
+
+    def _new_node(self, name, node_type, parent=None):
+        base = name.rstrip('0123456789') or node_type
+        while base + str(self.next_index) in self.nodes:
+            self.next_index += 1
+        name = base + str(self.next_index)
+        self.next_index += 1
+        self.nodes[name] = {'type': node_type, 'parent': parent,
+                            'attrs': {}}
+        return name
+
+    def _short(self, name):
+        return name.split('.')[0].rpartition('|')[2]
+
+    def _long(self, name):
+        path = []
+        while name is not None:
+            path.append(name)
+            name = self.nodes[name]['parent']
+        return '|' + '|'.join(reversed(path))
+
+    def _names(self, nodes):
+        if isinstance(nodes, str):
+            nodes = [nodes]
+        return [self._short(node) for node in nodes]
+
+    def __getattr__(self, command):
+        creator = self.__dict__.get('commands', {}).get(command)
+        if creator is not None:
+            return functools.partial(self._run_command, command, creator)
+
+        def record(*args, **kwargs):
+            self.calls[command] += 1
+        return record
+
+    def _run_command(self, command, creator, *args):
+        self.calls[command] += 1
+        instance = creator()
+        instance.doIt(args)
+        if instance.isUndoable():
+            self.undo_queue.append(instance)
+            self.redo_queue = []
+
+    def undo(self):
+        """undoes the last plugin command"""
+        self.calls['undo'] += 1
+        instance = self.undo_queue.pop()
+        instance.undoIt()
+        self.redo_queue.append(instance)
+
+    def redo(self):
+        self.calls['redo'] += 1
+        instance = self.redo_queue.pop()
+        instance.redoIt()
+        self.undo_queue.append(instance)
+
+    def undoInfo(self, **kwargs):
+        self.calls['undoInfo'] += 1
+        if kwargs.get('q') or kwargs.get('query'):
+            return self.undo_state
+        for flag in ('state', 'stateWithoutFlush'):
+            if flag in kwargs:
+                self.undo_state = bool(kwargs[flag])
+
+    def pluginInfo(self, plugin, query=True, loaded=True):
+        self.calls['pluginInfo'] += 1
+        return plugin in self.plugins
+
+    def loadPlugin(self, path, quiet=False):
+        """initializes the plugin module of path, it has to be importable"""
+        self.calls['loadPlugin'] += 1
+        name = os.path.splitext(os.path.basename(path))[0]
+        module = sys.modules.get(name) or __import__(name)
+        module.initializePlugin(self)
+        self.plugins.add(path)
+
+    def _descendants(self, name):
+        """name and every node below it"""
+        return [node for node in self.nodes
+                if name in self._long(node).split('|')]
+
+    def xform(self, obj, **kwargs):
+        self.calls['xform'] += 1
+        if kwargs.get('q') or kwargs.get('query'):
+            if isinstance(obj, list):
+                ids = [int(vertex.rpartition('[')[2][:-1]) for vertex in obj]
+                return self.meshes[self._short(obj[0])][ids].ravel().tolist()
+            return self.meshes[self._short(obj)].ravel().tolist()
+
+    def instance(self, obj, n='instance'):
+        """one new transform per object, like maya named after n"""
+        self.calls['instance'] += 1
+        return [self._new_node(n, 'transform') for _ in self._names(obj)]
+
+    def group(self, em=True, n='group', parent=None):
+        self.calls['group'] += 1
+        return self._new_node(n, 'transform',
+                              parent and self._short(parent))
+
+    def ls(self, *args, **kwargs):
+        self.calls['ls'] += 1
+        if kwargs.get('uuid'):
+            return ['uuid-' + name for name in self._names(args[0])]
+        if kwargs.get('sl') or kwargs.get('selection'):
+            if kwargs.get('shapes'):
+                return [self._long(name) + '|' + name + 'Shape'
+                        for name in self.selection]
+            return list(self.selection)
+        names = self._names(args[0])
+        if kwargs.get('long'):
+            return [self._long(name) for name in names]
+        return names
+
+    def select(self, nodes, **kwargs):
+        self.calls['select'] += 1
+        self.selection = self._names(nodes)
+
+    def objExists(self, obj):
+        self.calls['objExists'] += 1
+        return self._short(obj) in self.nodes
+
+    def objectType(self, obj):
+        self.calls['objectType'] += 1
+        return self.nodes[self._short(obj)]['type']
+
+    def parent(self, nodes, group):
+        self.calls['parent'] += 1
+        group = self._short(group)
+        names = self._names(nodes)
+        for name in names:
+            self.nodes[name]['parent'] = group
+        return names
+
+    def rename(self, node, name):
+        self.calls['rename'] += 1
+        return self._rename(node, name)
+
+    def _rename(self, node, name):
+        old = self._short(node)
+        if name in self.nodes and name != old:
+            name = self._new_node(name, 'transform')
+        self.nodes[name] = self.nodes.pop(old)
+        for data in (self.meshes, self.normals, self.polygons, self.colors):
+            if old in data:
+                data[name] = data.pop(old)
+        return name
+
+    def listRelatives(self, node, **kwargs):
+        self.calls['listRelatives'] += 1
+        node = self._short(node)
+        if kwargs.get('shapes'):
+            return [node + 'Shape']
+        return [self._long(name) for name, data in self.nodes.items()
+                if data['parent'] == node]
+
+    def delete(self, nodes):
+        self.calls['delete'] += 1
+        for name in self._names(nodes):
+            self.nodes.pop(name, None)
+
+    def attributeQuery(self, attr, node=None, exists=True):
+        self.calls['attributeQuery'] += 1
+        return attr in self.nodes[self._short(node)]['attrs']
+
+    def addAttr(self, node, ln=None, dt=None):
+        self.calls['addAttr'] += 1
+        self.nodes[self._short(node)]['attrs'].setdefault(ln, None)
+
+    def getAttr(self, plug):
+        self.calls['getAttr'] += 1
+        attr = plug.split('.', 1)[1]
+        attrs = self.nodes.get(self._short(plug), {}).get('attrs', {})
+        if attr in attrs:
+            return attrs[attr]
+        if attr == 'scale':
+            return [(1.0, 1.0, 1.0)]
+        if attr in ('worldMatrix[0]', 'parentInverseMatrix[0]'):
+            return np.eye(4).ravel().tolist()
+        return [(0.0, 0.0, 0.0)]
+
+    def setAttr(self, plug, *values, **kwargs):
+        self.calls['setAttr'] += 1
+        node = self.nodes.get(self._short(plug))
+        if node is None:
+            return
+        attr = plug.split('.', 1)[1]
+        if kwargs.get('type') == 'double3':
+            node['attrs'][attr] = [tuple(values)]
+        elif kwargs.get('type') == 'doubleArray':
+            node['attrs'][attr] = values[0]
+
+    def polyEvaluate(self, mesh, vertex=False, edge=False, face=False):
+        self.calls['polyEvaluate'] += 1
+        mesh = self._short(mesh)
+        counts = self.polygons[mesh][0]
+        if vertex:
+            return len(self.meshes[mesh])
+        if face:
+            return len(counts)
+        return int(counts.sum())
+
+    def polyListComponentConversion(self, components, fromEdge=False,
+                                    toVertex=False, toFace=False):
+        """edge i of a fake mesh runs from face corner i to the next
+        corner of its face, so it borders that face only
+        """
+        self.calls['polyListComponentConversion'] += 1
+        mesh = self._short(components[0])
+        counts, connects = self.polygons[mesh]
+        ids = []
+        for component in components:
+            first, _, last = component.rpartition('[')[2].rstrip(']') \
+                .partition(':')
+            ids.extend(range(int(first), int(last or first) + 1))
+        ids = np.asarray(ids, dtype=np.int64)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        corners = np.arange(len(connects))
+        sizes = np.repeat(counts, counts)
+        following = starts + (corners - starts + 1) % sizes
+        if toFace:
+            kind, converted = 'f', np.repeat(np.arange(len(counts)),
+                                             counts)[ids]
+        else:
+            kind, converted = 'vtx', np.concatenate(
+                [connects[ids], connects[following[ids]]])
+        return ['%s.%s[%d]' % (mesh, kind, index)
+                for index in np.unique(converted).tolist()]
+
+    def exactWorldBoundingBox(self, mesh):
+        self.calls['exactWorldBoundingBox'] += 1
+        points = self.meshes[self._short(mesh)]
+        return points.min(axis=0).tolist() + points.max(axis=0).tolist()
+
+    def particle(self, p=(), n='particle'):
+        self.calls['particle'] += 1
+        particle = self._new_node(n, 'transform')
+        return [particle, self._new_node(particle + 'Shape', 'particle')]
+
+    def particleInstancer(self, shape, **kwargs):
+        self.calls['particleInstancer'] += 1
+        return self._new_node(kwargs.get('name', 'instancer'), 'instancer')
+
+
+class FakeOpenMaya(object):
+    """the parts of maya.api.OpenMaya the backend uses, reading the meshes
+    of a FakeCmds. every call is counted as api.<method>
+    """
+
+    class MSpace(object):
+        kObject = 2
+        kWorld = 4
+
+    class MFn(object):
+        kDagNode = 1
+        kMesh = 2
+        kMeshVertComponent = 3
+        kMeshEdgeComponent = 4
+        kMeshPolygonComponent = 5
+
+    class MDistance(object):
+
+        @staticmethod
+        def internalToUI(value):
+            return value
+
+    MAngle = MDistance
+
+    MPxCommand = object
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+        self.MGlobal = _Global(cmds)
+
+    def MSelectionList(self):
+        return _SelectionList(self.cmds)
+
+    def MFnMesh(self, path=None):
+        return _MeshFn(self.cmds, path.name if path is not None else None)
+
+    def MFnDagNode(self, node):
+        return node
+
+    def MObjectHandle(self, node):
+        return _Handle(self.cmds, node)
+
+    def MFnDependencyNode(self, node):
+        return _DependNodeFn(self.cmds, node.name)
+
+    def MDGModifier(self):
+        return _Modifier(self.cmds)
+
+    MDagModifier = MDGModifier
+
+    def MFnPlugin(self, plugin, vendor=None, version=None):
+        return _PluginFn(self.cmds)
+
+    def MFloatPoint(self, x, y, z):
+        return _Point(x, y, z)
+
+    MFloatVector = MFloatPoint
+
+    def MPointArray(self, points):
+        self.cmds.calls['api.MPointArray'] += 1
+        return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+
+class _Global(object):
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+
+    def getActiveSelectionList(self):
+        self.cmds.calls['api.getActiveSelectionList'] += 1
+        sel = _SelectionList(self.cmds)
+        sel.names = list(self.cmds.selection)
+        return sel
+
+    def displayInfo(self, message):
+        self.cmds.calls['api.displayInfo'] += 1
+
+
+class _Node(object):
+    """dag path, depend node and empty component in one"""
+
+    def __init__(self, cmds, name):
+        self.cmds = cmds
+        self.name = name
+
+    def hasFn(self, fn):
+        return True
+
+    def isNull(self):
+        return True
+
+    def extendToShape(self):
+        return self
+
+    def fullPathName(self):
+        return self.cmds._long(self.name)
+
+
+class _Handle(object):
+
+    def __init__(self, cmds, node):
+        self.cmds = cmds
+        self.node = node
+
+    def isValid(self):
+        return self.node.name in self.cmds.nodes
+
+    def object(self):
+        return self.node
+
+
+class _DependNodeFn(object):
+
+    def __init__(self, cmds, name):
+        self.cmds = cmds
+        self.name = name
+
+    def findPlug(self, attr, want_networked):
+        self.cmds.calls['api.findPlug'] += 1
+        return _Plug(self.cmds, self.name, attr)
+
+
+class _Plug(object):
+    """a double3 plug, or one of its children once axis is set"""
+
+    def __init__(self, cmds, name, attr, axis=None):
+        self.cmds = cmds
+        self.name = name
+        self.attr = attr
+        self.axis = axis
+
+    def child(self, axis):
+        return _Plug(self.cmds, self.name, self.attr, axis)
+
+    def _value(self):
+        attrs = self.cmds.nodes[self.name]['attrs']
+        default = (1.0, 1.0, 1.0) if self.attr == 'scale' else (0.0,) * 3
+        return list((attrs.get(self.attr) or [default])[0])
+
+    def asDouble(self):
+        return self._value()[self.axis]
+
+    def setDouble(self, value):
+        values = self._value()
+        values[self.axis] = value
+        self.cmds.nodes[self.name]['attrs'][self.attr] = [tuple(values)]
+
+    def asInt(self):
+        return self.cmds.nodes[self.name]['attrs'].get(self.attr, 0)
+
+    def setInt(self, value):
+        self.cmds.nodes[self.name]['attrs'][self.attr] = value
+
+
+class _Modifier(object):
+    """MDGModifier and MDagModifier, queued plug writes, renames and
+    deletes
+    """
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+        self.values = []
+        self.ints = []
+        self.renames = []
+        self.deletes = []
+        self.old_values = []
+        self.old_ints = []
+        self.removed = {}
+
+    def newPlugValueDouble(self, plug, value):
+        self.values.append((plug, value))
+
+    def newPlugValueInt(self, plug, value):
+        self.ints.append((plug, value))
+
+    def renameNode(self, node, name):
+        self.renames.append((node, name))
+
+    def deleteNode(self, node):
+        self.deletes.append(node.name)
+
+    def doIt(self):
+        self.cmds.calls['api.doIt'] += 1
+        self.old_values = [(plug, plug.asDouble()) for plug, _ in self.values]
+        self.old_ints = [(plug, plug.asInt()) for plug, _ in self.ints]
+        for plug, value in self.values:
+            plug.setDouble(value)
+        for plug, value in self.ints:
+            plug.setInt(value)
+        for node, name in self.renames:
+            node.name = self.cmds._rename(node.name, name)
+        for name in self.deletes:
+            for node in self.cmds._descendants(name):
+                self.removed[node] = self.cmds.nodes.pop(node)
+
+    def undoIt(self):
+        self.cmds.calls['api.undoIt'] += 1
+        for plug, value in reversed(self.old_values):
+            plug.setDouble(value)
+        for plug, value in reversed(self.old_ints):
+            plug.setInt(value)
+        self.cmds.nodes.update(self.removed)
+        self.removed = {}
+
+
+class _PluginFn(object):
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+
+    def registerCommand(self, name, creator):
+        self.cmds.commands[name] = creator
+
+    def deregisterCommand(self, name):
+        self.cmds.commands.pop(name, None)
+
+
+class _Point(object):
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class _SelectionList(object):
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+        self.names = []
+
+    def add(self, name):
+        self.names.append(self.cmds._short(name))
+
+    def length(self):
+        return len(self.names)
+
+    def getDependNode(self, index):
+        return _Node(self.cmds, self.names[index])
+
+    def getDagPath(self, index):
+        return _Node(self.cmds, self.names[index])
+
+    def getComponent(self, index):
+        node = _Node(self.cmds, self.names[index])
+        return node, node
+
+
+class _MeshFn(object):
+
+    def __init__(self, cmds, name):
+        self.cmds = cmds
+        self.name = name
+        self.grid = None
+
+    def autoUniformGridParams(self):
+        """stands in for the accelerator by caching the triangles"""
+        self.cmds.calls['api.autoUniformGridParams'] += 1
+        return 'grid'
+
+    def freeCachedIntersectionAccelerator(self):
+        self.cmds.calls['api.freeCachedIntersectionAccelerator'] += 1
+        self.grid = None
+
+    def closestIntersection(self, source, direction, space, max_param,
+                            both, face_ids, tri_ids, ids_sorted, accel):
+        """closest hit of a straight down ray, hit face -1 on a miss"""
+        self.cmds.calls['api.closestIntersection'] += 1
+        if self.grid is None or accel is None:
+            counts, vertices = self.getTriangles()
+            counts = np.asarray(counts)
+            faces = np.repeat(np.arange(len(counts)), counts)
+            local = np.arange(len(faces)) - np.repeat(
+                np.cumsum(counts) - counts, counts)
+            corners = self.cmds.meshes[self.name][
+                np.asarray(vertices).reshape(-1, 3)]
+            self.grid = (corners, faces, local)
+        corners, faces, local = self.grid
+        first = corners[:, 0, [0, 2]] - corners[:, 2, [0, 2]]
+        second = corners[:, 1, [0, 2]] - corners[:, 2, [0, 2]]
+        offset = np.array([source.x, source.z]) - corners[:, 2, [0, 2]]
+        det = first[:, 0] * second[:, 1] - first[:, 1] * second[:, 0]
+        det = np.where(np.abs(det) < 1e-12, np.nan, det)
+        bary1 = (offset[:, 0] * second[:, 1] -
+                 offset[:, 1] * second[:, 0]) / det
+        bary2 = (first[:, 0] * offset[:, 1] -
+                 first[:, 1] * offset[:, 0]) / det
+        height = (bary1 * corners[:, 0, 1] + bary2 * corners[:, 1, 1] +
+                  (1 - bary1 - bary2) * corners[:, 2, 1])
+        params = source.y - height
+        inside = ((bary1 >= 0) & (bary2 >= 0) & (bary1 + bary2 <= 1) &
+                  (params >= 0) & (params <= max_param))
+        if not inside.any():
+            return _Point(0, 0, 0), 0.0, -1, -1, 0.0, 0.0
+        best = np.flatnonzero(inside)[np.argmin(params[inside])]
+        return (_Point(source.x, height[best], source.z), params[best],
+                int(faces[best]), int(local[best]), bary1[best],
+                bary2[best])
+
+    def getVertexNormals(self, angle_weighted, space):
+        self.cmds.calls['api.getVertexNormals'] += 1
+        return self.cmds.normals[self.name].tolist()
+
+    def getVertexColors(self):
+        self.cmds.calls['api.getVertexColors'] += 1
+        points = self.cmds.meshes[self.name]
+        colors = self.cmds.colors.get(self.name)
+        if colors is None:
+            colors = np.full((len(points), 4), -1.0)
+        return colors.tolist()
+
+    def create(self, points, counts, connects):
+        """registers a new mesh, returns its transform"""
+        self.cmds.calls['api.create'] += 1
+        self.name = self.cmds._new_node('polySurface', 'transform')
+        self.cmds.add_mesh(self.name, points, counts=counts,
+                           connects=connects)
+        return _Node(self.cmds, self.name)
+
+    def setPoints(self, points, space):
+        self.cmds.calls['api.setPoints'] += 1
+        self.cmds.meshes[self.name] = np.asarray(points, dtype=np.float64)
+
+    def getPoints(self, space):
+        self.cmds.calls['api.getPoints'] += 1
+        points = self.cmds.meshes[self.name]
+        return np.column_stack([points, np.ones(len(points))]).tolist()
+
+    def getUVs(self):
+        self.cmds.calls['api.getUVs'] += 1
+        return [], []
+
+    def getAssignedUVs(self):
+        self.cmds.calls['api.getAssignedUVs'] += 1
+        return [0] * len(self.cmds.polygons[self.name][0]), []
+
+    def getVertices(self):
+        self.cmds.calls['api.getVertices'] += 1
+        counts, connects = self.cmds.polygons[self.name]
+        return counts.tolist(), connects.tolist()
+
+    def getTriangles(self):
+        """fans every polygon, like maya does for convex faces"""
+        self.cmds.calls['api.getTriangles'] += 1
+        counts, connects = self.cmds.polygons[self.name]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        tri_counts = counts - 2
+        face = np.repeat(np.arange(len(counts)), tri_counts)
+        corner = (np.arange(tri_counts.sum()) -
+                  np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts))
+        first = connects[starts[face]]
+        second = connects[starts[face] + corner + 1]
+        third = connects[starts[face] + corner + 2]
+        triangles = np.stack([first, second, third], axis=1)
+        return tri_counts.tolist(), triangles.ravel().tolist()
+
+
+def install():
+    """puts fake maya, PySide2 and shiboken2 modules into sys.modules
+
+    returns the (FakeCmds, FakeOpenMaya) pair they are bound to.
+    """
+    cmds = FakeCmds()
+    api = FakeOpenMaya(cmds)
+
+    maya = types.ModuleType('maya')
+    maya.cmds = cmds
+    maya.OpenMaya = types.ModuleType('maya.OpenMaya')
+    maya.OpenMaya.MGlobal = api.MGlobal
+    maya.OpenMayaUI = types.ModuleType('maya.OpenMayaUI')
+    maya.api = types.ModuleType('maya.api')
+    maya.api.OpenMaya = api
+
+    pyside = types.ModuleType('PySide2')
+    pyside.QtWidgets = types.ModuleType('PySide2.QtWidgets')
+    pyside.QtWidgets.QDialog = object
+    pyside.QtGui = types.ModuleType('PySide2.QtGui')
+    pyside.QtCore = types.ModuleType('PySide2.QtCore')
+    pyside.QtCore.Slot = lambda *args: (lambda method: method)
+    shiboken = types.ModuleType('shiboken2')
+    shiboken.wrapInstance = lambda *args: None
+
+    sys.modules.update({
+        'maya': maya, 'maya.cmds': cmds, 'maya.OpenMaya': maya.OpenMaya,
+        'maya.OpenMayaUI': maya.OpenMayaUI, 'maya.api': maya.api,
+        'maya.api.OpenMaya': api, 'PySide2': pyside,
+        'PySide2.QtWidgets': pyside.QtWidgets, 'PySide2.QtGui': pyside.QtGui,
+        'PySide2.QtCore': pyside.QtCore, 'shiboken2': shiboken})
+    return cmds, api
+
+
+def grid_points(count):
+    """roughly count vertices laid out on a flat square grid"""
+    side = max(int(round(count ** 0.5)), 2)
+    u, v = np.meshgrid(np.arange(side), np.arange(side))
+    return np.stack([u.ravel(), np.zeros(u.size), v.ravel()],
+                    axis=1).astype(np.float64)
+
+
+def _quads(rows, columns, wrap=False):
+    """face counts and vertex ids of a rows x columns vertex quad grid"""
+    row, column = np.meshgrid(np.arange(rows - 1),
+                              np.arange(columns if wrap else columns - 1),
+                              indexing='ij')
+    row, column = row.ravel(), column.ravel()
+    following = (column + 1) % columns
+    connects = np.stack([row * columns + column,
+                         (row + 1) * columns + column,
+                         (row + 1) * columns + following,
+                         row * columns + following], axis=1)
+    return np.full(len(connects), 4, dtype=np.int32), connects.ravel()
+
+
+def grid_mesh(count):
+    """points, normals, face counts and face vertices of a flat grid"""
+    points = grid_points(count)
+    side = int(round(len(points) ** 0.5))
+    counts, connects = _quads(side, side)
+    normals = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+    return points, normals, counts, connects
+
+
+def sphere_mesh(count, radius=10.0):
+    """points, normals, face counts and face vertices of a uv sphere
+
+    the poles are left open so every face is a quad.
+    """
+    rings = max(int(round((count / 2.0) ** 0.5)), 3)
+    segments = max(count // rings, 3)
+    theta = np.linspace(0, np.pi, rings + 2)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing='ij')
+    normals = np.stack([np.sin(theta) * np.cos(phi), np.cos(theta),
+                        np.sin(theta) * np.sin(phi)],
+                       axis=-1).reshape(-1, 3)
+    counts, connects = _quads(rings, segments, wrap=True)
+    return normals * radius, normals, counts, connects
+
+
+MESHES = {'grid': grid_mesh, 'sphere': sphere_mesh}
@@ -1,11 +1,31 @@
 import maya.OpenMayaUI as omui
 import maya.cmds as cmds
-import pymel.core as pm
 import maya.OpenMaya as om
-import random
+import threading
+import time
+import numpy as np
+import scatter_batch
+import scatter_cache
+import scatter_cmd
+import scatter_engine
+import scatter_io
+import scatter_profile
+import scatter_random
+import scatter_sampling
 from PySide2 import QtWidgets, QtGui, QtCore
 from shiboken2 import wrapInstance
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+CACHE_FILTER = "Scatter Cache (*.sctc)"
+PROFILE_FILTER = "Chrome Trace (*.json);;Log (*.log)"
+# milliseconds the preview waits for settings to stop changing
+PREVIEW_DELAY = 150
+DENSITY_MAPS = {'None': 'none', 'Vertex Color': 'color', 'Texture': 'texture'}
+
 
 def maya_main_window():
     """Return the maya main window widget"""
@@ -22,11 +42,17 @@ class ScatterUI(QtWidgets.QDialog):
         self.setWindowTitle("Scatter UI")
         self.setMinimumWidth(600)
         self.setMaximumWidth(600)
-        self.setMinimumHeight(400)
-        self.setMaximumHeight(400)
+        self.setMinimumHeight(720)
+        self.setMaximumHeight(720)
         self.setWindowFlags(self.windowFlags() ^
                             QtCore.Qt.WindowContextHelpButtonHint)
         self.scatterT = Scatter()
+        self.scatter_job = None
+        self.scatter_timer = QtCore.QTimer(self)
+        self.scatter_timer.setInterval(0)
+        self.preview_timer = QtCore.QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY)
         self.create_ui()
         self.create_connections()
 
@@ -50,6 +76,8 @@ class ScatterUI(QtWidgets.QDialog):
         self.rnd_scale_lay = self.rnd_scale_ui()
         self.rnd_height_lay = self.rnd_height_ui()
         self.create_den_sct_lay = self.create_density_scatter_ui()
+        self.density_map_lay = self.create_density_map_ui()
+        self.filter_lay = self.create_filter_ui()
         self.ui_main_layout()
 
     def ui_main_layout(self):
@@ -66,21 +94,82 @@ class ScatterUI(QtWidgets.QDialog):
         self.main_lay.addWidget(self.scatter_hgt_lbl)
         self.main_lay.addLayout(self.rnd_height_lay)
         self.main_lay.addLayout(self.create_den_sct_lay)
+        self.main_lay.addLayout(self.density_map_lay)
         self.main_lay.addStretch()
+        self.main_lay.addLayout(self.filter_lay)
         self.main_lay.addLayout(self.sct_cnl_lay)
         self.setLayout(self.main_lay)
 
     def create_connections(self):
         self.obj_to_inst_btn.clicked.connect(self.update_sct_obj_inst)
+        self.remove_inst_btn.clicked.connect(self.remove_sct_obj_inst)
+        self.obj_to_inst_lst.currentItemChanged.connect(
+            self.update_proto_weight_sbx)
+        self.proto_weight_sbx.valueChanged.connect(self.update_proto_weight)
         self.scatter_btn.clicked.connect(self.scatter_object)
+        self.scatter_timer.timeout.connect(self.step_scatter)
+        self.rescatter_btn.clicked.connect(self.rescatter_object)
         self.inst_face_cbx.stateChanged.connect(self.update_inst_face_cbx)
         self.whole_sel_cbx.stateChanged.connect(self.update_whole_sel_cbx)
+        self.output_cmb.currentIndexChanged.connect(self.update_output_cmb)
+        self.convert_btn.clicked.connect(self.convert_instancer)
+        self.export_cache_btn.clicked.connect(self.export_cache)
+        self.import_cache_btn.clicked.connect(self.import_cache)
+        self.profile_cbx.stateChanged.connect(self.update_profile_cbx)
+        self.save_profile_btn.clicked.connect(self.save_profile)
+        self.overlap_cbx.stateChanged.connect(self.update_overlap_cbx)
+        self.overlap_scale_sbx.valueChanged.connect(
+            self.update_overlap_scl_val)
+        self.remove_overlap_btn.clicked.connect(self.remove_overlaps)
         self.cancel_btn.clicked.connect(self.cancel)
+        self.preview_cbx.stateChanged.connect(self.update_preview_cbx)
+        self.preview_timer.timeout.connect(self.refresh_preview)
+        self.commit_btn.clicked.connect(self.commit_preview)
+        self.bake_vertices_sbx.valueChanged.connect(
+            self.update_bake_vertices_val)
+        self.tile_size_sbx.valueChanged.connect(self.update_tile_size_val)
+        self.tile_processes_sbx.valueChanged.connect(
+            self.update_tile_processes_val)
         self.create_shape_connections()
         self.rot_btn.clicked.connect(self.scatter_rotate_object)
         self.scl_btn.clicked.connect(self.scatter_scale_object)
         self.height_btn.clicked.connect(self.scatter_height_object)
         self.scatter_density_sbx.valueChanged.connect(self.update_sct_den_val)
+        self.sample_mode_cmb.currentIndexChanged.connect(
+            self.update_sample_mode)
+        self.surface_density_sbx.valueChanged.connect(
+            self.update_surface_den_val)
+        self.min_distance_sbx.valueChanged.connect(self.update_min_dist_val)
+        self.seed_sbx.valueChanged.connect(self.update_seed_val)
+        self.density_map_cmb.currentIndexChanged.connect(
+            self.update_density_map)
+        self.density_tex_le.textChanged.connect(self.update_density_tex)
+        self.density_tex_btn.clicked.connect(self.update_density_tex_sel)
+        for cbx in (self.slope_cbx, self.height_cbx, self.facing_cbx):
+            cbx.stateChanged.connect(self.update_filters)
+        for sbx in self.filter_sbxs:
+            sbx.valueChanged.connect(self.update_filters)
+        self.create_preview_connections()
+
+    def create_preview_connections(self):
+        """every setting the preview shows restarts its debounce timer"""
+        for sbx in (self.scatter_density_sbx, self.surface_density_sbx,
+                    self.min_distance_sbx, self.seed_sbx,
+                    self.overlap_scale_sbx, self.proto_weight_sbx,
+                    self.min_x_rot_sbx, self.max_x_rot_sbx,
+                    self.min_y_rot_sbx, self.max_y_rot_sbx,
+                    self.min_z_rot_sbx, self.max_z_rot_sbx,
+                    self.min_x_scl_sbx, self.max_x_scl_sbx,
+                    self.min_y_scl_sbx, self.max_y_scl_sbx,
+                    self.min_z_scl_sbx, self.max_z_scl_sbx,
+                    self.min_height_sbx, self.max_height_sbx) + \
+                tuple(self.filter_sbxs):
+            sbx.valueChanged.connect(self.schedule_preview)
+        for cbx in (self.inst_face_cbx, self.whole_sel_cbx, self.overlap_cbx,
+                    self.slope_cbx, self.height_cbx, self.facing_cbx):
+            cbx.stateChanged.connect(self.schedule_preview)
+        for cmb in (self.sample_mode_cmb, self.density_map_cmb):
+            cmb.currentIndexChanged.connect(self.schedule_preview)
 
     def create_shape_connections(self):
         self.shape_btn.clicked.connect(self.create_shape)
@@ -105,9 +194,102 @@ class ScatterUI(QtWidgets.QDialog):
     def update_sct_den_val(self):
         self.scatterT.def_density = self.scatter_density_sbx.value() / 100
 
+    @QtCore.Slot()
+    def update_density_map(self):
+        self.scatterT.density_map = DENSITY_MAPS[
+            self.density_map_cmb.currentText()]
+
+    @QtCore.Slot()
+    def update_density_tex(self):
+        self.scatterT.density_texture = self.density_tex_le.text()
+
+    @QtCore.Slot()
+    def update_density_tex_sel(self):
+        self.density_tex_le.setText(self.scatterT.selected_obj_inst())
+
+    @QtCore.Slot()
+    def update_filters(self):
+        """slope, height and facing filters"""
+        self.scatterT.is_slope_filter = self.slope_cbx.isChecked()
+        self.scatterT.min_slope = self.min_slope_sbx.value()
+        self.scatterT.max_slope = self.max_slope_sbx.value()
+        self.scatterT.is_height_filter = self.height_cbx.isChecked()
+        self.scatterT.min_altitude = self.min_altitude_sbx.value()
+        self.scatterT.max_altitude = self.max_altitude_sbx.value()
+        self.scatterT.is_facing_filter = self.facing_cbx.isChecked()
+        self.scatterT.facing_x = self.facing_x_sbx.value()
+        self.scatterT.facing_y = self.facing_y_sbx.value()
+        self.scatterT.facing_z = self.facing_z_sbx.value()
+        self.scatterT.facing_angle = self.facing_angle_sbx.value()
+
+    @QtCore.Slot()
+    def update_sample_mode(self):
+        self.scatterT.sample_mode = self.sample_mode_cmb.currentText().lower()
+
+    @QtCore.Slot()
+    def update_surface_den_val(self):
+        self.scatterT.surface_density = self.surface_density_sbx.value()
+
+    @QtCore.Slot()
+    def update_min_dist_val(self):
+        self.scatterT.min_distance = self.min_distance_sbx.value()
+
+    @QtCore.Slot()
+    def update_overlap_cbx(self):
+        self.scatterT.reject_overlap = self.overlap_cbx.isChecked()
+
+    @QtCore.Slot()
+    def update_overlap_scl_val(self):
+        self.scatterT.overlap_scale = self.overlap_scale_sbx.value()
+
+    @QtCore.Slot()
+    def remove_overlaps(self):
+        """delete overlapping instances of the last scatter"""
+        self.scatterT.remove_overlaps(self.prototypes()[0])
+
+    @QtCore.Slot()
+    def update_seed_val(self):
+        self.scatterT.seed = self.seed_sbx.value()
+
     @QtCore.Slot()
     def update_sct_obj_inst(self):
-        self.obj_to_inst_le.setText(self.scatterT.selected_obj_inst())
+        """add the selected object to the objects to instance"""
+        name = self.scatterT.selected_obj_inst()
+        if name in self.prototypes()[0]:
+            return
+        item = QtWidgets.QListWidgetItem()
+        item.setData(QtCore.Qt.UserRole, name)
+        self.set_proto_weight(item, self.proto_weight_sbx.value())
+        self.obj_to_inst_lst.addItem(item)
+        self.obj_to_inst_lst.setCurrentItem(item)
+
+    @QtCore.Slot()
+    def remove_sct_obj_inst(self):
+        self.obj_to_inst_lst.takeItem(self.obj_to_inst_lst.currentRow())
+
+    @QtCore.Slot()
+    def update_proto_weight_sbx(self):
+        item = self.obj_to_inst_lst.currentItem()
+        if item is not None:
+            self.proto_weight_sbx.setValue(
+                item.data(QtCore.Qt.UserRole + 1))
+
+    @QtCore.Slot()
+    def update_proto_weight(self):
+        item = self.obj_to_inst_lst.currentItem()
+        if item is not None:
+            self.set_proto_weight(item, self.proto_weight_sbx.value())
+
+    def set_proto_weight(self, item, weight):
+        item.setData(QtCore.Qt.UserRole + 1, weight)
+        item.setText("%s  x%.2f" % (item.data(QtCore.Qt.UserRole), weight))
+
+    def prototypes(self):
+        """names and weights of the objects to instance"""
+        items = [self.obj_to_inst_lst.item(row)
+                 for row in range(self.obj_to_inst_lst.count())]
+        return ([item.data(QtCore.Qt.UserRole) for item in items],
+                [item.data(QtCore.Qt.UserRole + 1) for item in items])
 
     @QtCore.Slot()
     def update_inst_face_cbx(self):
@@ -117,6 +299,72 @@ class ScatterUI(QtWidgets.QDialog):
     def update_whole_sel_cbx(self):
         self.scatterT.is_whole_object = self.whole_sel_cbx.isChecked()
 
+    @QtCore.Slot()
+    def update_output_cmb(self):
+        self.scatterT.output_mode = self.output_cmb.currentText().lower()
+
+    @QtCore.Slot()
+    def update_bake_vertices_val(self):
+        self.scatterT.bake_max_vertices = self.bake_vertices_sbx.value()
+
+    @QtCore.Slot()
+    def update_tile_size_val(self):
+        self.scatterT.tile_size = self.tile_size_sbx.value()
+
+    @QtCore.Slot()
+    def update_tile_processes_val(self):
+        self.scatterT.tile_processes = self.tile_processes_sbx.value()
+
+    @QtCore.Slot()
+    def update_profile_cbx(self):
+        self.scatterT.set_profiling(self.profile_cbx.isChecked())
+
+    @QtCore.Slot()
+    def update_preview_cbx(self):
+        if self.preview_cbx.isChecked():
+            self.refresh_preview()
+        else:
+            self.preview_timer.stop()
+            self.scatterT.clear_preview()
+
+    @QtCore.Slot()
+    def schedule_preview(self):
+        """refreshes the preview once the settings stop changing"""
+        if self.preview_cbx.isChecked():
+            self.preview_timer.start()
+
+    @QtCore.Slot()
+    def refresh_preview(self):
+        """redraws the preview with the current settings"""
+        self.sync_ranges()
+        self.scatterT.update_preview(*self.prototypes())
+
+    @QtCore.Slot()
+    def commit_preview(self):
+        """instances what the preview shows"""
+        self.preview_timer.stop()
+        self.sync_ranges()
+        self.scatterT.commit_preview(*self.prototypes())
+        self.preview_cbx.setChecked(False)
+
+    def sync_ranges(self):
+        """copies the rotation, scale and height ranges to the tool"""
+        sct = self.scatterT
+        sct.min_rot_x = self.min_x_rot_sbx.value()
+        sct.min_rot_y = self.min_y_rot_sbx.value()
+        sct.min_rot_z = self.min_z_rot_sbx.value()
+        sct.max_rot_x = self.max_x_rot_sbx.value()
+        sct.max_rot_y = self.max_y_rot_sbx.value()
+        sct.max_rot_z = self.max_z_rot_sbx.value()
+        sct.min_scl_x = self.min_x_scl_sbx.value()
+        sct.min_scl_y = self.min_y_scl_sbx.value()
+        sct.min_scl_z = self.min_z_scl_sbx.value()
+        sct.max_scl_x = self.max_x_scl_sbx.value()
+        sct.max_scl_y = self.max_y_scl_sbx.value()
+        sct.max_scl_z = self.max_z_scl_sbx.value()
+        sct.min_height = self.min_height_sbx.value()
+        sct.max_height = self.max_height_sbx.value()
+
     @QtCore.Slot()
     def create_shape(self):
         """create polygon tool"""
@@ -131,8 +379,79 @@ class ScatterUI(QtWidgets.QDialog):
 
     @QtCore.Slot()
     def scatter_object(self):
-        """scatter object"""
-        self.scatterT.scatter_obj(self.obj_to_inst_le.text())
+        """scatter object in batches without blocking the dialog"""
+        if self.scatter_job is not None:
+            return
+        prototypes, weights = self.prototypes()
+        if not prototypes or any(cmds.objectType(prototype) != 'transform'
+                                 for prototype in prototypes):
+            return
+        if self.scatterT.tile_size > 0.0:
+            self.scatterT.scatter_obj(prototypes, weights)
+            return
+        self.scatter_job = self.scatterT.start_scatter_job(
+            prototypes, self.batch_size_sbx.value(), weights)
+        self.enable_output_btns(False)
+        self.scatter_pbar.setValue(0)
+        self.scatter_timer.start()
+
+    @QtCore.Slot()
+    def step_scatter(self):
+        """apply the next scatter batch"""
+        finished = True
+        try:
+            finished = self.scatterT.step_scatter_job(self.scatter_job)
+        finally:
+            self.scatter_pbar.setValue(self.scatter_job.progress())
+            if finished:
+                self.scatter_timer.stop()
+                self.scatter_job = None
+                self.enable_output_btns(True)
+
+    def enable_output_btns(self, enabled):
+        """buttons that make or change scatter output, off while a job runs"""
+        for btn in (self.scatter_btn, self.rescatter_btn,
+                    self.import_cache_btn, self.commit_btn, self.convert_btn,
+                    self.remove_overlap_btn):
+            btn.setEnabled(enabled)
+
+    @QtCore.Slot()
+    def rescatter_object(self):
+        """update the last scatter in place"""
+        self.scatterT.rescatter_obj(*self.prototypes())
+
+    @QtCore.Slot()
+    def convert_instancer(self):
+        """convert instancer to instances"""
+        self.scatterT.convert_instancer(self.prototypes()[0])
+
+    @QtCore.Slot()
+    def export_cache(self):
+        """write the last scatter to a cache file"""
+        path = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Scatter Cache", "", CACHE_FILTER)[0]
+        if path:
+            self.scatterT.export_cache(path, self.prototypes()[0])
+
+    @QtCore.Slot()
+    def import_cache(self):
+        """instance the contents of a cache file"""
+        path = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Import Scatter Cache", "", CACHE_FILTER)[0]
+        if path:
+            self.scatterT.import_cache(path, self.batch_size_sbx.value())
+
+    @QtCore.Slot()
+    def save_profile(self):
+        """write the recorded profile as a chrome trace or a text log"""
+        path = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save Scatter Profile", "", PROFILE_FILTER)[0]
+        if not path:
+            return
+        if path.endswith('.log'):
+            self.scatterT.profiler.write_log(path)
+        else:
+            self.scatterT.profiler.write_chrome_trace(path)
 
     @QtCore.Slot()
     def scatter_rotate_object(self):
@@ -181,7 +500,10 @@ class ScatterUI(QtWidgets.QDialog):
 
     @QtCore.Slot()
     def cancel(self):
-        """Quits the dialog"""
+        """Stops a running scatter, otherwise quits the dialog"""
+        if self.scatter_job is not None:
+            self.scatter_job.cancel()
+            return
         self.close()
 
     def create_density_scatter_ui(self):
@@ -196,9 +518,105 @@ class ScatterUI(QtWidgets.QDialog):
         self.scatter_density_sbx.setValue(100)
         self.scatter_density_lbl = QtWidgets.QLabel("Scatter Density")
         self.scatter_density_lbl.setFixedWidth(80)
+        self.sample_mode_cmb = QtWidgets.QComboBox()
+        self.sample_mode_cmb.addItems(['Vertex', 'Surface', 'Projection'])
+        self.surface_density_sbx = QtWidgets.QDoubleSpinBox()
+        self.surface_density_sbx.setDecimals(2)
+        self.surface_density_sbx.setMaximum(10000)
+        self.surface_density_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.surface_density_sbx.setFixedWidth(100)
+        self.surface_density_sbx.setValue(self.scatterT.surface_density)
+        self.surface_density_lbl = QtWidgets.QLabel("Points / Unit Area")
+        self.min_distance_sbx = QtWidgets.QDoubleSpinBox()
+        self.min_distance_sbx.setDecimals(2)
+        self.min_distance_sbx.setSingleStep(.1)
+        self.min_distance_sbx.setMaximum(1000)
+        self.min_distance_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.min_distance_sbx.setFixedWidth(75)
+        self.min_distance_sbx.setValue(self.scatterT.min_distance)
+        self.min_distance_lbl = QtWidgets.QLabel("Min Distance")
+        self.seed_sbx = QtWidgets.QSpinBox()
+        self.seed_sbx.setMaximum(999999)
+        self.seed_sbx.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.seed_sbx.setFixedWidth(75)
+        self.seed_sbx.setValue(self.scatterT.seed)
+        self.seed_lbl = QtWidgets.QLabel("Seed")
         layout = QtWidgets.QHBoxLayout()
         layout.addWidget(self.scatter_density_lbl, 0, 0)
         layout.addWidget(self.scatter_density_sbx, 0, 1)
+        layout.addWidget(self.sample_mode_cmb)
+        layout.addWidget(self.surface_density_lbl)
+        layout.addWidget(self.surface_density_sbx)
+        layout.addWidget(self.min_distance_lbl)
+        layout.addWidget(self.min_distance_sbx)
+        layout.addWidget(self.seed_lbl)
+        layout.addWidget(self.seed_sbx)
+        return layout
+
+    def filter_sbx(self, value, minimum, maximum):
+        """double spinbox for a filter value"""
+        sbx = QtWidgets.QDoubleSpinBox()
+        sbx.setDecimals(1)
+        sbx.setRange(minimum, maximum)
+        sbx.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        sbx.setFixedWidth(60)
+        sbx.setValue(value)
+        return sbx
+
+    def create_filter_ui(self):
+        """slope, height and facing filters next to the face normal and
+        whole object options
+        """
+        sct = self.scatterT
+        self.slope_cbx = QtWidgets.QCheckBox("Slope")
+        self.min_slope_sbx = self.filter_sbx(sct.min_slope, 0, 180)
+        self.max_slope_sbx = self.filter_sbx(sct.max_slope, 0, 180)
+        self.height_cbx = QtWidgets.QCheckBox("Height")
+        self.min_altitude_sbx = self.filter_sbx(sct.min_altitude, -1e6, 1e6)
+        self.max_altitude_sbx = self.filter_sbx(sct.max_altitude, -1e6, 1e6)
+        self.facing_cbx = QtWidgets.QCheckBox("Facing")
+        self.facing_x_sbx = self.filter_sbx(sct.facing_x, -1, 1)
+        self.facing_y_sbx = self.filter_sbx(sct.facing_y, -1, 1)
+        self.facing_z_sbx = self.filter_sbx(sct.facing_z, -1, 1)
+        self.facing_angle_lbl = QtWidgets.QLabel("Angle")
+        self.facing_angle_sbx = self.filter_sbx(sct.facing_angle, 0, 180)
+        self.filter_sbxs = [self.min_slope_sbx, self.max_slope_sbx,
+                            self.min_altitude_sbx, self.max_altitude_sbx,
+                            self.facing_x_sbx, self.facing_y_sbx,
+                            self.facing_z_sbx, self.facing_angle_sbx]
+        layout = QtWidgets.QGridLayout()
+        layout.addWidget(self.inst_face_cbx, 0, 0)
+        layout.addWidget(self.slope_cbx, 0, 1)
+        layout.addWidget(self.min_slope_sbx, 0, 2)
+        layout.addWidget(self.max_slope_sbx, 0, 3)
+        layout.addWidget(self.height_cbx, 0, 4)
+        layout.addWidget(self.min_altitude_sbx, 0, 5)
+        layout.addWidget(self.max_altitude_sbx, 0, 6)
+        layout.addWidget(self.whole_sel_cbx, 1, 0)
+        layout.addWidget(self.facing_cbx, 1, 1)
+        layout.addWidget(self.facing_x_sbx, 1, 2)
+        layout.addWidget(self.facing_y_sbx, 1, 3)
+        layout.addWidget(self.facing_z_sbx, 1, 4)
+        layout.addWidget(self.facing_angle_lbl, 1, 5)
+        layout.addWidget(self.facing_angle_sbx, 1, 6)
+        return layout
+
+    def create_density_map_ui(self):
+        """density painted as vertex colour or read from a texture"""
+        self.density_map_lbl = QtWidgets.QLabel("Density Map")
+        self.density_map_lbl.setFixedWidth(80)
+        self.density_map_cmb = QtWidgets.QComboBox()
+        self.density_map_cmb.addItems(['None', 'Vertex Color', 'Texture'])
+        self.density_tex_le = QtWidgets.QLineEdit()
+        self.density_tex_le.setPlaceholderText("Texture Node")
+        self.density_tex_btn = QtWidgets.QPushButton("Set Texture")
+        layout = QtWidgets.QHBoxLayout()
+        layout.addWidget(self.density_map_lbl)
+        layout.addWidget(self.density_map_cmb)
+        layout.addWidget(self.density_tex_le)
+        layout.addWidget(self.density_tex_btn)
         return layout
 
     def create_obj_layout_ui(self):
@@ -223,12 +641,16 @@ class ScatterUI(QtWidgets.QDialog):
         """select object to instance"""
         self.set_selected_obj()
         self.set_selected_obj_to_sct()
-        self.obj_to_inst_btn = QtWidgets.QPushButton("Set Object")
-        layout = QtWidgets.QHBoxLayout()
+        self.obj_to_inst_btn = QtWidgets.QPushButton("Add Object")
+        self.remove_inst_btn = QtWidgets.QPushButton("Remove Object")
+        layout = QtWidgets.QGridLayout()
         layout.addWidget(self.obj_to_inst_txt, 0, 0)
-        layout.addWidget(self.obj_to_inst_le, 0, 1)
+        layout.addWidget(self.obj_to_inst_lst, 0, 1, 2, 1)
         layout.addWidget(self.obj_to_inst_btn, 0, 2)
-        layout.addWidget(self.obj_to_scat_txt, 0, 3)
+        layout.addWidget(self.remove_inst_btn, 1, 2)
+        layout.addWidget(self.proto_weight_lbl, 0, 3)
+        layout.addWidget(self.proto_weight_sbx, 0, 4)
+        layout.addWidget(self.obj_to_scat_txt, 2, 0, 1, 5)
         return layout
 
     def sub_div_ax_sbx(self):
@@ -272,12 +694,20 @@ class ScatterUI(QtWidgets.QDialog):
         self.shape_btn = QtWidgets.QPushButton("Create Shape")
 
     def set_selected_obj(self):
-        """set object to instance lineEdit"""
-        self.obj_to_inst_txt = QtWidgets.QLabel("Object to Instance")
-        self.obj_to_inst_le = QtWidgets.QLineEdit()
-        self.obj_to_inst_le.setReadOnly(True)
-        self.obj_to_inst_le.setText("Object")
-        self.obj_to_inst_le.setFixedWidth(95)
+        """objects to instance list with a weight per object"""
+        self.obj_to_inst_txt = QtWidgets.QLabel("Objects to Instance")
+        self.obj_to_inst_lst = QtWidgets.QListWidget()
+        self.obj_to_inst_lst.setFixedHeight(50)
+        self.obj_to_inst_lst.setFixedWidth(160)
+        self.proto_weight_lbl = QtWidgets.QLabel("Weight")
+        self.proto_weight_sbx = QtWidgets.QDoubleSpinBox()
+        self.proto_weight_sbx.setDecimals(2)
+        self.proto_weight_sbx.setMaximum(1000)
+        self.proto_weight_sbx.setSingleStep(.1)
+        self.proto_weight_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.proto_weight_sbx.setFixedWidth(75)
+        self.proto_weight_sbx.setValue(1.0)
 
     def set_selected_obj_to_sct(self):
         self.obj_to_scat_txt = QtWidgets.QLabel("Note: Object to Scatter to"
@@ -288,14 +718,85 @@ class ScatterUI(QtWidgets.QDialog):
     def sct_cnl_layout_ui(self):
         """scatter and cancel layout"""
         self.scatter_btn = QtWidgets.QPushButton("Scatter Object")
+        self.rescatter_btn = QtWidgets.QPushButton("Update Scatter")
         self.inst_face_cbx = QtWidgets.QCheckBox("Face Normal")
         self.whole_sel_cbx = QtWidgets.QCheckBox("Whole Object Selection")
+        self.output_cmb = QtWidgets.QComboBox()
+        self.output_cmb.addItems(['Transforms', 'Instancer', 'Bake'])
+        self.convert_btn = QtWidgets.QPushButton("Convert Instancer")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
+        self.export_cache_btn = QtWidgets.QPushButton("Export Cache")
+        self.import_cache_btn = QtWidgets.QPushButton("Import Cache")
+        self.profile_cbx = QtWidgets.QCheckBox("Profile")
+        self.save_profile_btn = QtWidgets.QPushButton("Save Profile")
+        self.overlap_cbx = QtWidgets.QCheckBox("Reject Overlaps")
+        self.overlap_scale_lbl = QtWidgets.QLabel("Overlap Scale")
+        self.overlap_scale_sbx = QtWidgets.QDoubleSpinBox()
+        self.overlap_scale_sbx.setDecimals(2)
+        self.overlap_scale_sbx.setSingleStep(.1)
+        self.overlap_scale_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.overlap_scale_sbx.setValue(self.scatterT.overlap_scale)
+        self.remove_overlap_btn = QtWidgets.QPushButton("Remove Overlaps")
+        self.preview_cbx = QtWidgets.QCheckBox("Preview Points")
+        self.commit_btn = QtWidgets.QPushButton("Commit")
+        self.bake_vertices_lbl = QtWidgets.QLabel("Bake Chunk Vertices")
+        self.bake_vertices_sbx = QtWidgets.QSpinBox()
+        self.bake_vertices_sbx.setRange(3, 10000000)
+        self.bake_vertices_sbx.setSingleStep(1000)
+        self.bake_vertices_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.bake_vertices_sbx.setValue(self.scatterT.bake_max_vertices)
+        self.tile_size_lbl = QtWidgets.QLabel("Tile Size")
+        self.tile_size_sbx = QtWidgets.QDoubleSpinBox()
+        self.tile_size_sbx.setDecimals(1)
+        self.tile_size_sbx.setMaximum(100000)
+        self.tile_size_sbx.setSingleStep(10)
+        self.tile_size_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.tile_size_sbx.setSpecialValueText("Off")
+        self.tile_size_sbx.setValue(self.scatterT.tile_size)
+        self.tile_processes_lbl = QtWidgets.QLabel("Processes")
+        self.tile_processes_sbx = QtWidgets.QSpinBox()
+        self.tile_processes_sbx.setRange(0, 256)
+        self.tile_processes_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.tile_processes_sbx.setSpecialValueText("All Cores")
+        self.tile_processes_sbx.setValue(self.scatterT.tile_processes)
+        self.scatter_pbar = QtWidgets.QProgressBar()
+        self.scatter_pbar.setValue(0)
+        self.batch_size_lbl = QtWidgets.QLabel("Batch Size")
+        self.batch_size_sbx = QtWidgets.QSpinBox()
+        self.batch_size_sbx.setRange(1, 100000)
+        self.batch_size_sbx.setSingleStep(100)
+        self.batch_size_sbx.setButtonSymbols(
+            QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.batch_size_sbx.setValue(1000)
         layout = QtWidgets.QGridLayout()
         layout.addWidget(self.scatter_btn, 0, 0)
-        layout.addWidget(self.inst_face_cbx, 0, 1)
-        layout.addWidget(self.whole_sel_cbx, 0, 2)
+        layout.addWidget(self.rescatter_btn, 0, 1)
+        layout.addWidget(self.output_cmb, 0, 2)
         layout.addWidget(self.cancel_btn, 0, 3)
+        layout.addWidget(self.convert_btn, 1, 0)
+        layout.addWidget(self.scatter_pbar, 1, 1)
+        layout.addWidget(self.batch_size_lbl, 1, 2)
+        layout.addWidget(self.batch_size_sbx, 1, 3)
+        layout.addWidget(self.export_cache_btn, 2, 0)
+        layout.addWidget(self.import_cache_btn, 2, 1)
+        layout.addWidget(self.profile_cbx, 2, 2)
+        layout.addWidget(self.save_profile_btn, 2, 3)
+        layout.addWidget(self.overlap_cbx, 3, 0)
+        layout.addWidget(self.overlap_scale_lbl, 3, 1)
+        layout.addWidget(self.overlap_scale_sbx, 3, 2)
+        layout.addWidget(self.remove_overlap_btn, 3, 3)
+        layout.addWidget(self.preview_cbx, 4, 0)
+        layout.addWidget(self.commit_btn, 4, 1)
+        layout.addWidget(self.bake_vertices_lbl, 4, 2)
+        layout.addWidget(self.bake_vertices_sbx, 4, 3)
+        layout.addWidget(self.tile_size_lbl, 5, 0)
+        layout.addWidget(self.tile_size_sbx, 5, 1)
+        layout.addWidget(self.tile_processes_lbl, 5, 2)
+        layout.addWidget(self.tile_processes_sbx, 5, 3)
         return layout
 
     def rnd_height_ui(self):
@@ -528,6 +1029,65 @@ class ScatterUI(QtWidgets.QDialog):
         self.max_z_scl_sbx.setValue(self.scatterT.max_scl_z)
 
 
+class ScatterJob(object):
+    """computes scatter batches on a worker thread for the main thread"""
+
+    WAITING = object()
+
+    def __init__(self, batches, prototypes, translate_only):
+        self.batches = batches
+        self.prototypes = prototypes
+        self.translate_only = translate_only
+        self.done = 0
+        self.total = 0
+        self.nodes = []
+        self.error = None
+        self.undo = False
+        self.output = None
+        self.cancelled = threading.Event()
+        self.queue = queue.Queue(maxsize=4)
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        """worker thread, pure numpy only"""
+        try:
+            for batch in self.batches:
+                if not self.put(batch):
+                    return
+        except Exception as error:
+            self.error = error
+        self.put(None)
+
+    def put(self, item):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def next_batch(self):
+        """the next computed batch, WAITING if none is ready, None at end"""
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return self.WAITING
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        """percentage of instances applied so far"""
+        if not self.total:
+            return 0
+        return int(100 * self.done / float(self.total))
+
+
 class Scatter(object):
 
     def __init__(self):
@@ -572,12 +1132,75 @@ class Scatter(object):
 
         self.def_density = 1.0
 
+        self.density_map = 'none'
+
+        self.density_texture = ''
+
+        self.is_slope_filter = False
+        self.min_slope = 0.0
+        self.max_slope = 45.0
+
+        self.is_height_filter = False
+        self.min_altitude = 0.0
+        self.max_altitude = 100.0
+
+        self.is_facing_filter = False
+        self.facing_x = 0.0
+        self.facing_y = 1.0
+        self.facing_z = 0.0
+        self.facing_angle = 90.0
+
+        self.sample_mode = 'vertex'
+
+        self.surface_density = 1.0
+
+        self.min_distance = 0.0
+
+        self.reject_overlap = False
+
+        self.overlap_scale = 1.0
+
+        self.seed = 0
+
         self.inst_obj_name = ""
 
         self.is_face_normal = False
 
         self.is_whole_object = False
 
+        self.output_mode = 'transforms'
+
+        self.bake_max_vertices = 65535
+
+        self.tile_size = 0.0
+
+        self.tile_processes = 0
+
+        self.tile_root = None
+
+        self.tile_groups = {}
+
+        self.last_group = None
+
+        self.preview_node = None
+
+        self.preview_sample = None
+
+        self.preview_drawn = None
+
+        self.mesh_cache = scatter_cache.MeshCache()
+
+        self.profiler = scatter_profile.Profiler()
+
+        self.cmds = cmds
+
+        self.scene_backend = scatter_engine.CmdsBackend(cmds)
+
+        self.cached_backend = scatter_cache.CachedBackend(
+            self.scene_backend, self.mesh_cache)
+
+        self.backend = self.cached_backend
+
     def cube(self):
         cmds.polyCube(name="Cube",
                       sw=self.cur_sub_ax,
@@ -623,96 +1246,859 @@ class Scatter(object):
 
     def selected_obj_inst(self):
         """returns the current selected object"""
-        return cmds.ls(sl=True, sn=True, fl=True)[0]
-
-    def scatter_obj(self, obj_to_instance):
-        """scatter an Object"""
-        vert_list = cmds.ls(selection=True, fl=True)
-        cmds.filterExpand(vert_list, selectionMask=31, expand=True)
-        obj_vert_list = cmds.ls(vert_list[0] + ".vtx[*]", flatten=True)
-        den_list = random.sample(vert_list, int(float(len(vert_list)) *
-                                                self.def_density))
-        if self.is_whole_object:
-            den_list = random.sample(obj_vert_list, int(float(
-                len(obj_vert_list)*self.def_density)))
-        if cmds.objectType(obj_to_instance) == 'transform':
-            if not self.is_face_normal:
-                self.scatter_face_up(den_list, obj_to_instance)
+        return self.cmds.ls(sl=True, sn=True, fl=True)[0]
+
+    def set_profiling(self, enabled):
+        """times every phase and counts backend and cmds calls when on
+
+        the tool's own cmds calls go through the same counting proxy as
+        the backend's.
+        """
+        profiler = self.profiler
+        profiler.enabled = enabled
+        if enabled:
+            profiler.reset()
+            self.cmds = self.scene_backend.cmds = \
+                scatter_profile.ProfiledProxy(cmds, profiler, 'cmds.')
+            self.backend = scatter_profile.ProfiledProxy(
+                self.cached_backend, profiler, 'backend.', spans=True)
+        else:
+            self.cmds = self.scene_backend.cmds = cmds
+            self.backend = self.cached_backend
+
+    def scatter_obj(self, obj_to_instance, weights=None):
+        """scatter an Object
+
+        obj_to_instance can be a list of prototypes, every instance then
+        picks one of them by weights. the whole scatter is one undo step.
+        """
+        prototypes = self.prototype_list(obj_to_instance)
+        if not prototypes or any(self.cmds.objectType(prototype) != 'transform'
+                                 for prototype in prototypes):
+            return None
+        return self.undoable_create('scatter_obj', self.scatter_now,
+                                    prototypes, weights)
+
+    def scatter_now(self, prototypes, weights=None):
+        """scatter_obj without its undo step"""
+        if self.tile_size > 0.0:
+            return self.scatter_tiles(prototypes, weights)
+        with self.profiler.span('scatter_obj'):
+            ids, proto_ids, matrices, translate_only = self.sample_matrices(
+                prototypes, weights)
+            return self.create_output(prototypes, ids, matrices,
+                                      translate_only, proto_ids=proto_ids)
+
+    def undoable_create(self, name, create, *args):
+        """runs create(*args) as one undo step
+
+        undo deletes the group create made and redo restores it, both in
+        bulk.
+        """
+        return scatter_cmd.execute(scatter_cmd.CreateOperation(
+            lambda: create(*args), lambda: [self.last_group]), name)
+
+    def rescatter_obj(self, obj_to_instance, weights=None):
+        """updates the last scatter in place, or scatters if there is none"""
+        prototypes = self.prototype_list(obj_to_instance)
+        if not prototypes or any(self.cmds.objectType(prototype) != 'transform'
+                                 for prototype in prototypes):
+            return None
+        if self.tile_size > 0.0:
+            return self.scatter_tiles(prototypes, weights, update=True)
+        with self.profiler.span('rescatter_obj'):
+            ids, proto_ids, matrices, translate_only = self.sample_matrices(
+                prototypes, weights)
+            nodes = None
+            if self.output_mode == 'transforms' and self.last_group and \
+                    self.cmds.objExists(self.last_group):
+                with self.profiler.span('update_transforms'):
+                    nodes = scatter_engine.update_transforms(
+                        self.backend, prototypes, self.last_group, ids,
+                        matrices, translate_only, proto_ids)
+            if nodes is None:
+                nodes = self.create_output(prototypes, ids, matrices,
+                                           translate_only,
+                                           proto_ids=proto_ids)
+            return nodes
+
+    def prototype_list(self, obj_to_instance):
+        """obj_to_instance as a list of prototypes"""
+        if isinstance(obj_to_instance, (list, tuple)):
+            return list(obj_to_instance)
+        return [obj_to_instance] if obj_to_instance else []
+
+    def proto_weights(self, prototypes, weights=None):
+        """prototype weights for the engine, None for a single prototype"""
+        if len(prototypes) < 2:
+            return None
+        return list(weights) if weights else [1.0] * len(prototypes)
+
+    def overlap_radius(self, prototypes):
+        """radius per prototype its instances keep clear of
+
+        0 when overlaps are kept.
+        """
+        if not self.reject_overlap or not prototypes:
+            return 0.0
+        return np.array([self.backend.bounding_radius(prototype)
+                         for prototype in prototypes]) * self.overlap_scale
+
+    def sample_matrices(self, prototypes=None, weights=None, sources=None):
+        """instance ids, prototype ids, matrices and the translate only flag
+
+        sources are gathered from the scene unless given.
+        """
+        prototypes = prototypes or []
+        if sources is None:
+            with self.profiler.span('gather_sources'):
+                sources = self.gather_sources()
+        with self.profiler.span('compute_scatter'):
+            ids, proto_ids, matrices = scatter_engine.compute_scatter(
+                sources, self.is_face_normal, self.seed, self.min_distance,
+                self.overlap_radius(prototypes),
+                self.proto_weights(prototypes, weights))
+        self.profiler.count('instances', len(ids))
+        return ids, proto_ids, matrices, not self.is_face_normal
+
+    def gather_sources(self):
+        """reads the target geometry the scatter needs from the scene"""
+        if self.sample_mode == 'projection':
+            with self.profiler.span('resolve_selection'):
+                selection = scatter_engine.resolve_selection(
+                    self.backend, 'face', self.is_whole_object)
+            low, high = scatter_engine.selection_bounds(self.backend,
+                                                        selection)
+            try:
+                return [self.projection_source(selection, low, high,
+                                               self.seed)]
+            finally:
+                self.backend.free_intersectors()
+        if self.sample_mode == 'surface':
+            with self.profiler.span('resolve_selection'):
+                selection = scatter_engine.resolve_selection(
+                    self.backend, 'face', self.is_whole_object)
+            return [scatter_engine.surface_source(
+                scatter_engine.surface_sampler(
+                    self.backend, mesh, self.filtered_faces(mesh, face_ids),
+                    self.vertex_weights(mesh, filtered=False)),
+                slot, self.surface_density, self.filters())
+                for slot, (mesh, face_ids) in enumerate(selection)]
+        return self.vertex_sources(self.density_vertices())
+
+    def vertex_sources(self, vertices):
+        """a vertex source for every (mesh, vertex ids) pair"""
+        return [scatter_engine.vertex_source(
+            slot, vert_ids, self.backend.mesh_points(mesh),
+            self.backend.mesh_normals(mesh) if self.is_face_normal else None)
+            for slot, (mesh, vert_ids) in enumerate(vertices)]
+
+    def gather_tiles(self):
+        """{(x, z) tile: (seed, sources)} of every tile the selection touches
+
+        targets are split on a world grid of tile_size and every tile is
+        sampled on its own with a seed derived from its coordinates.
+        surface and projection tiles get slots of their own, vertex ids
+        are already unique per target.
+        """
+        size = self.tile_size
+        tiles = {}
+        mode = 'vertex' if self.sample_mode == 'vertex' else 'face'
+        with self.profiler.span('resolve_selection'):
+            selection = scatter_engine.resolve_selection(
+                self.backend, mode, self.is_whole_object)
+        if self.sample_mode == 'projection':
+            low, high = scatter_engine.selection_bounds(self.backend,
+                                                        selection)
+            try:
+                for tile in scatter_engine.tiles_between(low, high, size):
+                    seed = scatter_random.tile_seed(self.seed, tile)
+                    tile_low, tile_high = scatter_engine.tile_bounds(
+                        tile, size, low, high)
+                    tiles[tile] = (seed, [self.projection_source(
+                        selection, tile_low, tile_high, seed)])
+            finally:
+                self.backend.free_intersectors()
+            return scatter_engine.tile_slots(tiles, 1)
+        for slot, (mesh, ids) in enumerate(selection):
+            points = self.backend.mesh_points(mesh)
+            weights = self.vertex_weights(
+                mesh, filtered=self.sample_mode != 'surface')
+            if self.sample_mode == 'surface':
+                ids = self.filtered_faces(mesh, ids)
+                counts, connects = self.backend.mesh_polygons(mesh)
+                positions = scatter_engine.face_centers(points, counts,
+                                                        connects)[ids]
+            else:
+                positions = points[ids]
+            for tile, index in scatter_engine.group_by_tile(positions,
+                                                            size).items():
+                seed = scatter_random.tile_seed(self.seed, tile)
+                sources = tiles.setdefault(tile, (seed, []))[1]
+                if self.sample_mode == 'surface':
+                    sources.append(scatter_engine.surface_source(
+                        scatter_engine.surface_sampler(
+                            self.backend, mesh, ids[index], weights),
+                        slot, self.surface_density, self.filters()))
+                else:
+                    sources.append(scatter_engine.vertex_source(
+                        slot, self.kept_vertices(slot, ids[index], seed,
+                                                 weights), points,
+                        self.backend.mesh_normals(mesh)
+                        if self.is_face_normal else None))
+        if self.sample_mode == 'surface':
+            scatter_engine.tile_slots(tiles, len(selection))
+        return tiles
+
+    def filters(self):
+        """filter_mask keyword arguments of the filters that are on"""
+        filters = {}
+        if self.is_slope_filter:
+            filters['slope'] = (self.min_slope, self.max_slope)
+        if self.is_height_filter:
+            filters['height'] = (self.min_altitude, self.max_altitude)
+        if self.is_facing_filter:
+            filters['facing'] = ((self.facing_x, self.facing_y,
+                                  self.facing_z), self.facing_angle)
+        return filters
+
+    def projection_source(self, selection, low, high, seed):
+        """points cast straight down onto the selected faces
+
+        candidates are spread over the xz box between the low and high
+        corners at the surface density. the filters are tested on the
+        hits, the density map thins them.
+        """
+        ids, xz = scatter_engine.projection_candidates(
+            seed, low, high, self.surface_density)
+        vert_weights = None
+        if self.density_map != 'none':
+            vert_weights = [scatter_engine.density_weights(
+                self.backend, mesh, self.density_map, self.density_texture)
+                for mesh, _ in selection]
+        with self.profiler.span('project_points', count=len(ids)):
+            hit, points, normals, weights = scatter_engine.project_points(
+                self.backend, selection, xz, high[1] + 1.0,
+                high[1] - low[1] + 2.0, vert_weights)
+        keep = scatter_engine.filter_mask(points, normals, **self.filters())
+        if vert_weights is not None:
+            keep &= scatter_random.keep_fraction(seed, ids[hit], weights)
+        return scatter_engine.projection_source(ids[hit][keep], points[keep],
+                                                normals[keep])
+
+    def filtered_faces(self, mesh, face_ids):
+        """face_ids that have a vertex passing the filters
+
+        faces no sampled point could pass are dropped before sampling, the
+        points drawn on the rest are tested one by one.
+        """
+        filters = self.filters()
+        if not filters:
+            return face_ids
+        passing = np.flatnonzero(scatter_engine.filter_mask(
+            self.backend.mesh_points(mesh), self.backend.mesh_normals(mesh),
+            **filters))
+        counts, connects = self.backend.mesh_polygons(mesh)
+        return np.intersect1d(face_ids, scatter_engine.vertices_to_faces(
+            counts, connects, passing))
+
+    def vertex_weights(self, mesh, filtered=True):
+        """per vertex density map weights times the filter masks of mesh
+
+        filtered False leaves the filters out. None when there is nothing
+        to weigh.
+        """
+        filters = self.filters() if filtered else {}
+        if self.density_map == 'none' and not filters:
+            return None
+        with self.profiler.span('vertex_weights'):
+            weights = np.ones(self.backend.vertex_count(mesh))
+            if self.density_map != 'none':
+                weights = scatter_engine.density_weights(
+                    self.backend, mesh, self.density_map,
+                    self.density_texture)
+            if filters:
+                weights = weights * scatter_engine.filter_mask(
+                    self.backend.mesh_points(mesh),
+                    self.backend.mesh_normals(mesh), **filters)
+            return weights
+
+    def density_vertices(self, cut=True):
+        """(mesh, vertex ids) pairs kept by the scatter density
+
+        cut False keeps every selected vertex.
+        """
+        den_list = []
+        with self.profiler.span('resolve_selection'):
+            selection = scatter_engine.resolve_selection(
+                self.backend, 'vertex', self.is_whole_object)
+        if not cut:
+            return selection
+        for slot, (mesh, vert_ids) in enumerate(selection):
+            den_list.append((mesh, self.kept_vertices(
+                slot, vert_ids, self.seed, self.vertex_weights(mesh))))
+        return den_list
+
+    def kept_vertices(self, slot, vert_ids, seed, weights=None):
+        """the vertex ids kept by the density and per vertex weights"""
+        fraction = self.def_density
+        if weights is not None:
+            fraction = fraction * weights[vert_ids]
+        keep = scatter_random.keep_fraction(
+            seed, scatter_engine.stable_ids(slot, vert_ids), fraction)
+        return vert_ids[keep]
+
+    def rename_inst_obj_group(self, nodes, ids, group):
+        """moves the given instances into the output group and names them"""
+        return scatter_engine.group_instances(self.backend, nodes, group,
+                                              ids)
+
+    def begin_output(self, obj_to_instance, mode=None, parent=None,
+                     name='scatter_grp'):
+        """starts a new scatter group, returns the output batches go to
+
+        every output keeps its own group and arrays, so a running job and
+        other scatters do not share any state until end_output.
+        """
+        options = {} if parent is None else {'parent': parent}
+        scatter_grp = self.cmds.group(em=True, n=name, **options)
+        return {'group': self.cmds.ls(scatter_grp, long=True)[0],
+                'mode': mode or self.output_mode,
+                'prototypes': self.prototype_list(obj_to_instance),
+                'nodes': [], 'ids': [], 'proto_ids': [], 'matrices': [],
+                'translate_only': False}
+
+    def output_batch(self, pending, ids, matrices, translate_only=False,
+                     proto_ids=None):
+        """instances one batch of matrices into the group of pending
+
+        transforms are created in one batch per prototype.
+        """
+        pending['translate_only'] = translate_only
+        if proto_ids is None:
+            proto_ids = np.zeros(len(ids), dtype=np.int32)
+        if pending['mode'] == 'transforms':
+            with self.profiler.span('build_transforms', count=len(ids)):
+                nodes, order = scatter_engine.build_prototypes(
+                    self.backend, pending['prototypes'], proto_ids,
+                    matrices, translate_only)
+            ids, proto_ids, matrices = \
+                ids[order], proto_ids[order], matrices[order]
+            with self.profiler.span('rename_inst_obj_group'):
+                pending['nodes'].extend(self.rename_inst_obj_group(
+                    nodes, ids, pending['group']))
+        pending['ids'].append(ids)
+        pending['proto_ids'].append(proto_ids)
+        pending['matrices'].append(matrices)
+
+    def end_output(self, pending):
+        """finishes the group of pending, returns the nodes it holds
+
+        the group becomes the last group.
+        """
+        self.last_group = pending['group']
+        ids = np.concatenate(pending['ids'] or
+                             [np.zeros(0, dtype=np.int64)])
+        proto_ids = np.concatenate(pending['proto_ids'] or
+                                   [np.zeros(0, dtype=np.int32)])
+        matrices = scatter_engine.stack_matrices(pending['matrices'])
+        prototypes = pending['prototypes']
+        with self.profiler.span('store_scatter'):
+            scatter_engine.store_scatter(
+                self.backend, pending['group'], ids, matrices, proto_ids,
+                pending['mode'] == 'transforms')
+        if pending['mode'] == 'instancer':
+            with self.profiler.span('build_instancer', count=len(ids)):
+                if len(prototypes) > 1:
+                    nodes = scatter_engine.build_instancer(
+                        self.backend, prototypes, matrices, proto_ids)
+                else:
+                    nodes = scatter_engine.build_instancer(
+                        self.backend, prototypes[0], matrices)
+                return self.backend.parent(nodes, pending['group'])
+        if pending['mode'] == 'bake':
+            with self.profiler.span('bake_meshes', count=len(ids)):
+                nodes = scatter_engine.bake_meshes(
+                    self.backend, prototypes, proto_ids, matrices,
+                    pending['translate_only'], self.bake_max_vertices)
+                return self.backend.parent(nodes, pending['group'])
+        return pending['nodes']
+
+    def create_output(self, object_to_instance, ids, matrices,
+                      translate_only=False, mode=None, proto_ids=None):
+        """instance object at every matrix with the current output mode"""
+        pending = self.begin_output(object_to_instance, mode)
+        self.output_batch(pending, ids, matrices, translate_only, proto_ids)
+        return self.end_output(pending)
+
+    def scatter_tiles(self, obj_to_instance, weights=None, tiles=None,
+                      update=False):
+        """scatters tile by tile, every tile in its own group
+
+        the tiles are computed in tile_processes worker processes and
+        grouped under one scatter group. update regenerates the tiles of
+        the last tiled scatter in place, tiles limits the work to the
+        given (x, z) tiles. returns the tile groups.
+        """
+        prototypes = self.prototype_list(obj_to_instance)
+        root = self.tile_root if update else None
+        if root is None or not self.cmds.objExists(root):
+            scatter_grp = self.cmds.group(em=True, n='scatter_grp')
+            root = self.tile_root = self.cmds.ls(scatter_grp, long=True)[0]
+            self.tile_groups = {}
+        with self.profiler.span('scatter_tiles'):
+            with self.profiler.span('gather_tiles'):
+                gathered = self.gather_tiles()
+            if tiles is not None:
+                gathered = dict((tile, gathered[tile]) for tile in tiles
+                                if tile in gathered)
+            elif update:
+                for tile in set(self.tile_groups) - set(gathered):
+                    self.backend.delete([self.tile_groups.pop(tile)])
+            tasks = [(tile, seed, sources, self.is_face_normal,
+                      self.min_distance, self.overlap_radius(prototypes),
+                      self.proto_weights(prototypes, weights))
+                     for tile, (seed, sources) in sorted(gathered.items())]
+            with self.profiler.span('compute_tiles', count=len(tasks)):
+                results = scatter_batch.run_tiles(
+                    tasks, self.tile_processes or None)
+            for tile, ids, proto_ids, matrices in results:
+                with self.profiler.span('output_tile', count=len(ids)):
+                    self.output_tile(prototypes, root, tile, ids, proto_ids,
+                                     matrices)
+        self.last_group = root
+        return self.scatter_groups()
+
+    def scatter_groups(self):
+        """groups the last scatter stored its arrays on
+
+        the tile groups of a tiled scatter, the last group otherwise.
+        """
+        if self.last_group is not None and self.last_group == self.tile_root:
+            groups = [self.tile_groups[tile]
+                      for tile in sorted(self.tile_groups)]
+        else:
+            groups = [self.last_group] if self.last_group else []
+        return [group for group in groups if self.cmds.objExists(group)]
+
+    def output_tile(self, prototypes, root, tile, ids, proto_ids, matrices):
+        """updates the group of tile in place, or builds it under root"""
+        group = self.tile_groups.get(tile)
+        if group is not None and self.cmds.objExists(group):
+            if self.output_mode == 'transforms' and \
+                    scatter_engine.update_transforms(
+                        self.backend, prototypes, group, ids, matrices,
+                        not self.is_face_normal, proto_ids) is not None:
+                return
+            self.backend.delete([group])
+        pending = self.begin_output(prototypes, parent=root,
+                                    name=scatter_engine.tile_name(tile))
+        self.output_batch(pending, ids, matrices, not self.is_face_normal,
+                          proto_ids)
+        self.end_output(pending)
+        self.tile_groups[tile] = pending['group']
+
+    def start_scatter_job(self, obj_to_instance, batch_size=1000,
+                          weights=None):
+        """reads the targets, then computes the scatter on a worker thread
+
+        feed the returned job to step_scatter_job from a timer until it
+        reports it is finished.
+        """
+        prototypes = self.prototype_list(obj_to_instance)
+        with self.profiler.span('gather_sources'):
+            sources = self.gather_sources()
+        batches = self.profiler.iterate(
+            'compute_batch', scatter_engine.iter_batches(
+                sources, self.is_face_normal, self.seed, self.min_distance,
+                batch_size, self.overlap_radius(prototypes),
+                self.proto_weights(prototypes, weights)))
+        job = ScatterJob(batches, prototypes, not self.is_face_normal)
+        job.undo = scatter_cmd.available()
+        with scatter_cmd.undo_suspended(job.undo):
+            job.output = self.begin_output(prototypes)
+        job.start()
+        return job
+
+    def step_scatter_job(self, job):
+        """applies the next finished batch, returns True once job is done
+
+        a cancelled job stops here and keeps what was already applied.
+        with job.undo the batches record no undo and the finished scatter
+        becomes one undo step.
+        """
+        batch = None if job.cancelled.is_set() else job.next_batch()
+        if batch is ScatterJob.WAITING:
+            return False
+        if batch is not None:
+            ids, proto_ids, matrices, job.total = batch
+            with scatter_cmd.undo_suspended(job.undo):
+                self.output_batch(job.output, ids, matrices,
+                                  job.translate_only, proto_ids)
+            job.done += len(ids)
+            return False
+        job.cancel()
+        with scatter_cmd.undo_suspended(job.undo):
+            job.nodes = self.end_output(job.output)
+        if job.undo:
+            scatter_cmd.execute(scatter_cmd.CreateOperation(
+                None, lambda: [job.output['group']]), 'scatter_obj')
+        if job.error is not None:
+            raise job.error
+        return True
+
+    def convert_instancer(self, object_to_instance):
+        """turns the selected scatter instancer into instance transforms"""
+        prototypes = self.prototype_list(object_to_instance)
+        particle = self.cmds.ls(selection=True, type='transform')[0]
+        matrices = scatter_engine.trs_to_matrices(
+            *self.backend.instancer_trs(particle))
+        proto_ids = np.minimum(self.backend.instancer_proto_ids(particle),
+                               len(prototypes) - 1)
+        return self.create_output(prototypes, np.arange(len(matrices)),
+                                  matrices, mode='transforms',
+                                  proto_ids=proto_ids)
+
+    def export_target(self, mesh, path):
+        """writes mesh geometry for headless scatter_batch jobs"""
+        triangles, tri_faces = self.backend.mesh_triangles(mesh)
+        scatter_engine.save_target(path, self.backend.mesh_points(mesh),
+                                   self.backend.mesh_normals(mesh),
+                                   triangles, tri_faces)
+
+    def apply_batch(self, spec_path, chunk_size=10000):
+        """instances the results of a finished scatter_batch spec"""
+        return [self.import_cache(job['output'], chunk_size)
+                for job in scatter_batch.load_jobs(spec_path)]
+
+    def export_cache(self, path, object_to_instance):
+        """writes the ids and matrices of the last scatter
+
+        works for every output mode and for tiled scatters, the arrays are
+        stored on each group.
+        """
+        stored = [scatter_engine.stored_arrays(self.backend, group)
+                  for group in self.scatter_groups()]
+        stored = [arrays for arrays in stored if arrays is not None]
+        if not stored:
+            raise RuntimeError('no scatter stored on %s' % self.last_group)
+        ids, matrices, proto_ids = [np.concatenate(arrays)
+                                    for arrays in zip(*stored)]
+        scatter_io.save(path, matrices, proto_ids, ids,
+                        self.prototype_list(object_to_instance))
+
+    def import_cache(self, path, chunk_size=10000):
+        """instances a cache file chunk by chunk as one undo step
+
+        returns its group.
+        """
+        return self.undoable_create('import_cache', self.load_cache, path,
+                                    chunk_size)
+
+    def load_cache(self, path, chunk_size=10000):
+        """import_cache without its undo step"""
+        cache = scatter_io.load(path)
+        pending = self.begin_output(cache.prototypes)
+        for ids, proto_ids, matrices in cache.iter_chunks(chunk_size):
+            self.output_batch(pending, ids, matrices, proto_ids=proto_ids)
+        self.end_output(pending)
+        return self.last_group
+
+    def remove_overlaps(self, obj_to_instance):
+        """deletes instances of the last scatter that overlap others
+
+        uses the current transforms, so scale randomizing is taken into
+        account. the instances of every tile of a tiled scatter are
+        checked against each other. returns the nodes that were deleted.
+        """
+        prototypes = self.prototype_list(obj_to_instance)
+        stored = []
+        for group in self.scatter_groups():
+            arrays = scatter_engine.stored_scatter(self.backend, group)
+            if arrays is not None:
+                stored.append((group,) + arrays)
+        if not stored or not prototypes:
+            return []
+        nodes = [node for entry in stored for node in entry[3]]
+        proto_ids = np.concatenate([entry[4] for entry in stored])
+        with self.profiler.span('remove_overlaps', count=len(nodes)):
+            matrices = scatter_engine.trs_to_matrices(
+                self.backend.get_vectors(nodes, 'translate'),
+                self.backend.get_vectors(nodes, 'rotate'),
+                self.backend.get_vectors(nodes, 'scale'))
+            radii = np.array([self.backend.bounding_radius(prototype)
+                              for prototype in prototypes]) * \
+                self.overlap_scale
+            keep = scatter_sampling.reject_overlaps(
+                matrices[:, 3, :3], scatter_engine.instance_radii(
+                    matrices,
+                    radii[np.minimum(proto_ids, len(prototypes) - 1)]))
+            drop = np.ones(len(nodes), dtype=bool)
+            drop[keep] = False
+            removed = [node for node, gone in zip(nodes, drop) if gone]
+            self.backend.delete(removed)
+            start = 0
+            for group, ids, stored_matrices, group_nodes, group_protos \
+                    in stored:
+                kept = ~drop[start:start + len(group_nodes)]
+                start += len(group_nodes)
+                if not kept.all():
+                    scatter_engine.store_scatter(
+                        self.backend, group, ids[kept], stored_matrices[kept],
+                        group_protos[kept])
+        return removed
+
+    def preview_cut(self):
+        """how the preview applies the density to its candidates
+
+        'vertex' keeps every selected vertex and masks them by their
+        density draw and weight, 'surface' keeps the points up to the
+        current density and masks the ones past a lower density's count.
+        None resamples on every density change, thinning depends on which
+        points are kept.
+        """
+        if self.min_distance > 0.0 or self.reject_overlap or \
+                self.sample_mode not in ('vertex', 'surface'):
+            return None
+        return self.sample_mode
+
+    def weight_key(self):
+        """the settings deciding which vertices the density keeps"""
+        return (self.def_density, self.density_map, self.density_texture,
+                tuple(sorted(self.filters().items())))
+
+    def cut_key(self):
+        """the settings the density cut of a sample depends on"""
+        return self.weight_key() + (self.surface_density,)
+
+    def sample_key(self, prototypes, weights=None):
+        """every setting and the selection the preview candidates depend on
+
+        the density settings preview_mask applies to the candidates are
+        left out.
+        """
+        selection = self.cmds.ls(sl=True, long=True) or []
+        cut = self.preview_cut()
+        return (tuple(selection), tuple(prototypes), tuple(weights or ()),
+                self.sample_mode, cut, self.min_distance, self.seed,
+                self.is_face_normal, self.is_whole_object,
+                self.reject_overlap, self.overlap_scale,
+                None if cut == 'vertex' else self.weight_key(),
+                None if cut == 'surface' else self.surface_density)
+
+    def preview_state(self, prototypes, weights=None):
+        """the candidates the preview draws, redone when their key changes
+
+        a surface sample is also redone when the density grows past the one
+        it was drawn at. face up samples are placed with the rotation and
+        scale of their prototype, like the instances scatter_obj makes. the
+        unit jitter draws, tick lengths and height axes are kept with them,
+        so range and density tweaks only rescale and mask them.
+        """
+        key = self.sample_key(prototypes, weights)
+        sample = self.preview_sample
+        if sample is not None and sample['key'] == key and \
+                self.surface_density <= sample['density']:
+            return sample
+        cut = self.preview_cut()
+        with self.profiler.span('gather_sources'):
+            if cut == 'vertex':
+                vertices = self.density_vertices(cut=False)
+                sources = self.vertex_sources(vertices)
+            else:
+                sources = self.gather_sources()
+        ids, proto_ids, matrices, translate_only = self.sample_matrices(
+            prototypes, weights, sources)
+        if translate_only:
+            matrices = scatter_engine.placed_matrices(
+                self.backend, prototypes, proto_ids, matrices)
+        radii = np.array([self.backend.bounding_radius(prototype)
+                          for prototype in prototypes])
+        sample = self.preview_sample = {
+            'key': key, 'cut': cut, 'ids': ids, 'proto_ids': proto_ids,
+            'matrices': matrices,
+            'units': scatter_random.jitter_units(self.seed, ids),
+            'lengths': radii[proto_ids],
+            'up': scatter_engine.height_axes(matrices),
+            'density': self.surface_density if cut == 'surface' else np.inf,
+            'slots': ids >> 32, 'local': ids & 0xffffffff,
+            'mask_key': None, 'rot_key': None}
+        if cut == 'vertex':
+            sample['meshes'] = [mesh for mesh, _ in vertices]
+            sample['draws'] = scatter_random.uniform(
+                self.seed, ids, scatter_random.DENSITY)
+        elif cut == 'surface':
+            sample['areas'] = np.array(
+                [source['sampler'].total_area for source in sources] or
+                [0.0])[sample['slots']]
+        return sample
+
+    def preview_mask(self, sample):
+        """mask of the candidates the current density keeps
+
+        the same cut kept_vertices and count_for_density make, kept until
+        the density settings change.
+        """
+        key = self.cut_key()
+        if sample['mask_key'] == key:
+            return sample['mask']
+        if sample['cut'] == 'vertex':
+            weights = np.ones(len(sample['ids']))
+            for slot, mesh in enumerate(sample['meshes']):
+                mesh_weights = self.vertex_weights(mesh)
+                if mesh_weights is not None:
+                    here = sample['slots'] == slot
+                    weights[here] = mesh_weights[sample['local'][here]]
+            mask = sample['draws'] < self.def_density * weights
+        elif sample['cut'] == 'surface':
+            mask = sample['local'] < np.round(self.surface_density *
+                                              sample['areas'])
+        else:
+            mask = np.ones(len(sample['ids']), dtype=bool)
+        sample['mask_key'], sample['mask'] = key, mask
+        return mask
+
+    def preview_points(self, sample):
+        """tick corners of every candidate under the current jitter
+
+        candidates the density drops collapse into a point, so the mesh
+        keeps its topology. the rotated axes are kept until the rotation
+        range changes, scale and height changes only rescale and move
+        them.
+        """
+        ranges = self.jitter_ranges()
+        rotations, scales, heights = scatter_random.scale_jitter(
+            sample['units'], *ranges)
+        if sample['rot_key'] != ranges[0]:
+            with self.profiler.span('jitter_axes'):
+                sample['rot_axes'] = scatter_engine.jitter_axes(
+                    sample['matrices'], rotations)
+            sample['rot_key'] = ranges[0]
+        origins = sample['matrices'][:, 3, :3] + \
+            sample['up'] * heights[:, None]
+        return scatter_engine.tick_points(
+            origins, sample['rot_axes'] * scales[:, :2, None],
+            sample['lengths'] * self.preview_mask(sample))
+
+    def jitter_sample(self, sample):
+        """ids, prototype ids and matrices the preview shows, jittered"""
+        mask = self.preview_mask(sample)
+        with self.profiler.span('jitter_matrices'):
+            return sample['ids'][mask], sample['proto_ids'][mask], \
+                scatter_engine.jitter_matrices(
+                    sample['matrices'][mask], *scatter_random.scale_jitter(
+                        sample['units'][mask], *self.jitter_ranges()))
+
+    def preview_matrices(self, obj_to_instance, weights=None):
+        """ids, prototype ids and jittered matrices the preview shows"""
+        return self.jitter_sample(self.preview_state(
+            self.prototype_list(obj_to_instance), weights))
+
+    def update_preview(self, obj_to_instance, weights=None):
+        """draws the scatter as one tick mesh instead of instances
+
+        a tick is as long as its prototype is wide. nothing is redrawn
+        while the sample, density and jitter ranges stay the same, and the
+        mesh is reused while the candidates do. returns the mesh, None when
+        nothing would be scattered.
+        """
+        prototypes = self.prototype_list(obj_to_instance)
+        if not prototypes:
+            return None
+        with self.profiler.span('update_preview'):
+            sample = self.preview_state(prototypes, weights)
+            drawn = (sample['key'], sample['density'], self.cut_key(),
+                     self.jitter_ranges())
+            node = self.preview_node
+            exists = bool(node) and self.cmds.objExists(node)
+            if exists and self.preview_drawn == drawn:
+                return node
+            points = self.preview_points(sample)
+            if exists and self.backend.vertex_count(node) == len(points):
+                self.backend.set_mesh_points(node, points)
             else:
-                self.scatter_face_normal(den_list, obj_to_instance)
-        self.rename_inst_obj_group()
-
-    def rename_inst_obj_group(self):
-        """rename instances in the group"""
-        ls_obj_inst = cmds.ls('obj_inst*')
-        scatter_grp = cmds.group(em=True, n='scatter_grp')
-        cmds.parent('obj_inst*', scatter_grp)
-        for obj in ls_obj_inst:
-            cmds.rename(obj, "group_" + "inst_obj" +
-                        str(ls_obj_inst.index(obj)))
-
-    def scatter_face_up(self, den_list, object_to_instance):
-        """scatter inst face up"""
-        for vert in den_list:
-            vertex_pos = cmds.xform(vert, q=True, ws=True,
-                                    t=True)
-            new_instance = cmds.instance(object_to_instance, n='obj_inst')
-            cmds.move(vertex_pos[0], vertex_pos[1], vertex_pos[2],
-                      new_instance)
-
-    def scatter_face_normal(self, den_list, object_to_instance):
-        """scatter inst face normal"""
-        for vert in den_list:
-            mesh_vert = pm.MeshVertex(vert)
-            vert_normal = mesh_vert.getNormal()
-            up_vector = pm.dt.Vector(0.0, 1.0, 0.0)
-            tangent = vert_normal.cross(up_vector).normal()
-            tangent2 = vert_normal.cross(tangent).normal()
-            pos = cmds.xform([vert], q=True, ws=True, t=True)
-
-            matrix_trans = [tangent2.x, tangent2.y, tangent2.z, 0.0,
-                            vert_normal.x, vert_normal.y, vert_normal.z,
-                            0.0,
-                            tangent.x, tangent.y, tangent.z, 0.0,
-                            pos[0], pos[1], pos[2], 1.0]
-
-            new_instance = cmds.instance(object_to_instance, n='obj_inst')
-            cmds.xform(new_instance, ws=True, matrix=matrix_trans)
+                self.clear_preview(keep_sample=True)
+                if len(points):
+                    self.preview_node = self.backend.create_mesh(
+                        points, *scatter_engine.tick_faces(len(sample['ids'])),
+                        name='scatter_preview', reference=True)
+            self.preview_drawn = drawn
+            return self.preview_node
+
+    def clear_preview(self, keep_sample=False):
+        """deletes the preview mesh"""
+        if self.preview_node and self.cmds.objExists(self.preview_node):
+            self.backend.delete([self.preview_node])
+        self.preview_node = None
+        self.preview_drawn = None
+        if not keep_sample:
+            self.preview_sample = None
+
+    def commit_preview(self, obj_to_instance, weights=None):
+        """instances exactly what the preview shows, then removes it"""
+        prototypes = self.prototype_list(obj_to_instance)
+        if not prototypes or any(self.cmds.objectType(prototype) != 'transform'
+                                 for prototype in prototypes):
+            return None
+        with self.profiler.span('commit_preview'):
+            ids, proto_ids, matrices = self.preview_matrices(prototypes,
+                                                             weights)
+            self.clear_preview()
+            return self.undoable_create('commit_preview', self.create_output,
+                                        prototypes, ids, matrices, False,
+                                        None, proto_ids)
+
+    def jitter_ranges(self):
+        """(min, max) rotation, scale and height ranges of the jitter"""
+        return (((self.min_rot_x, self.min_rot_y, self.min_rot_z),
+                 (self.max_rot_x, self.max_rot_y, self.max_rot_z)),
+                ((self.min_scl_x, self.min_scl_y, self.min_scl_z),
+                 (self.max_scl_x, self.max_scl_y, self.max_scl_z)),
+                (self.min_height, self.max_height))
+
+    def jitter(self, ids):
+        """seeded rotation, scale and height jitter for ids"""
+        return scatter_random.jitter(self.seed, ids, *self.jitter_ranges())
+
+    def node_ids(self, nodes):
+        """stable instance ids of nodes, the jitter only depends on them"""
+        with self.profiler.span('instance_ids', count=len(nodes)):
+            return scatter_engine.instance_ids(self.backend, nodes)
+
+    def apply_vectors(self, nodes, attr, values, start):
+        """writes the new values as a single undo step and reports timing"""
+        with self.profiler.span('apply_vectors', count=len(nodes)):
+            scatter_cmd.execute(scatter_cmd.TransformOperation(
+                self.backend, nodes, attr, values), 'scatter_' + attr)
+        om.MGlobal.displayInfo("Scatter: set %s on %d transforms in %.3fs"
+                               % (attr, len(nodes), time.time() - start))
 
     def scatter_rotate_obj(self):
         """random rotation"""
-        obj_list = cmds.ls(selection=True, dag=1)
-        for obj in obj_list:
-            rand_rot_x = random.uniform(self.min_rot_x,
-                                        self.max_rot_x)
-            rand_rot_y = random.uniform(self.min_rot_y,
-                                        self.max_rot_y)
-            rand_rot_z = random.uniform(self.min_rot_z,
-                                        self.max_rot_z)
-            cmds.rotate(rand_rot_x,
-                        rand_rot_y,
-                        rand_rot_z,
-                        obj, relative=True, objectSpace=True, ocp=True)
+        start = time.time()
+        with self.profiler.span('scatter_rotate_obj'):
+            nodes = self.backend.selected_transforms()
+            rotations = scatter_engine.compose_rotations(
+                self.backend.get_vectors(nodes, 'rotate'),
+                self.jitter(self.node_ids(nodes))[0])
+            self.apply_vectors(nodes, 'rotate', rotations, start)
 
     def scatter_scale_obj(self):
         """random scale"""
-        obj_list = cmds.ls(selection=True, fl=True, dag=1)
-        for obj in obj_list:
-            rand_scl_x = random.uniform(self.min_scl_x,
-                                        self.max_scl_x)
-            rand_scl_y = random.uniform(self.min_scl_y,
-                                        self.max_scl_y)
-            rand_scl_z = random.uniform(self.min_scl_z,
-                                        self.max_scl_z)
-            cmds.scale(rand_scl_x,
-                       rand_scl_y,
-                       rand_scl_z,
-                       obj, relative=True)
+        start = time.time()
+        with self.profiler.span('scatter_scale_obj'):
+            nodes = self.backend.selected_transforms()
+            scales = (self.backend.get_vectors(nodes, 'scale') *
+                      self.jitter(self.node_ids(nodes))[1])
+            self.apply_vectors(nodes, 'scale', scales, start)
 
     def scatter_height_obj(self):
         """random height"""
-        obj_list = cmds.ls(selection=True)
-        for obj in obj_list:
-            rand_height = random.uniform(self.min_height, self.max_height)
-            cmds.xform(obj, translation=[0.0, rand_height, 0.0],
-                       objectSpace=True, relative=True)
+        start = time.time()
+        with self.profiler.span('scatter_height_obj'):
+            nodes = self.backend.selected_transforms()
+            translations = scatter_engine.offset_along_local_y(
+                self.backend.get_vectors(nodes, 'translate'),
+                self.backend.get_vectors(nodes, 'rotate'),
+                self.jitter(self.node_ids(nodes))[2])
+            self.apply_vectors(nodes, 'translate', translations, start)
@@ -0,0 +1,181 @@
+"""headless scatter jobs run across a process pool
+
+    python scatter_batch.py jobs.json --processes 8
+
+jobs.json holds {"jobs": [job, ...]}. a job names its targets (files
+written by Scatter.export_target), prototypes and their optional weights,
+sampling settings, jitter ranges, seed and an output path. only numpy is
+needed here, applying the results in a scene is done by
+Scatter.apply_batch. Scatter.scatter_tiles uses the same pool for tiles.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import scatter_engine
+import scatter_io
+import scatter_random
+import scatter_sampling
+
+
+JOB_DEFAULTS = {
+    'mode': 'vertex',
+    'density': 1.0,
+    'face_normal': False,
+    'min_distance': 0.0,
+    'rotation': [[0, 0, 0], [360, 360, 360]],
+    'scale': [[0.8, 0.8, 0.8], [1.2, 1.2, 1.2]],
+    'height': [0, 0],
+    'seed': 0,
+    'weights': None,
+}
+
+
+def load_jobs(path):
+    """jobs of a spec file with defaults filled in and paths resolved"""
+    with open(path) as spec_file:
+        spec = json.load(spec_file)
+    root = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for job in spec['jobs']:
+        full = dict(JOB_DEFAULTS)
+        full.update(job)
+        full['targets'] = [os.path.join(root, target)
+                           for target in full['targets']]
+        full['output'] = os.path.join(root, full['output'])
+        jobs.append(full)
+    return jobs
+
+
+def job_sources(job):
+    """scatter sources for every target of a job"""
+    sources = []
+    for slot, target in enumerate(job['targets']):
+        points, normals, triangles, _ = scatter_engine.load_target(target)
+        if job['mode'] == 'surface':
+            sampler = scatter_sampling.SurfaceSampler(points, triangles,
+                                                      normals)
+            sources.append(scatter_engine.surface_source(sampler, slot,
+                                                         job['density']))
+            continue
+        vert_ids = np.arange(len(points), dtype=np.int64)
+        keep = scatter_random.keep_fraction(
+            job['seed'], scatter_engine.stable_ids(slot, vert_ids),
+            job['density'])
+        sources.append(scatter_engine.vertex_source(slot, vert_ids[keep],
+                                                    points, normals))
+    return sources
+
+
+def compute_job(job):
+    """ids, prototype ids and jittered matrices of one job"""
+    ids, proto_ids, matrices = scatter_engine.compute_scatter(
+        job_sources(job), job['face_normal'], job['seed'],
+        job['min_distance'],
+        proto_weights=job['weights'] or [1.0] * len(job['prototypes']))
+    rotations, scales, heights = scatter_random.jitter(
+        job['seed'], ids, job['rotation'], job['scale'], job['height'])
+    matrices = scatter_engine.jitter_matrices(matrices, rotations, scales,
+                                              heights)
+    return ids, proto_ids, matrices
+
+
+def run_job(job):
+    """computes one job and writes its result, returns the output path"""
+    ids, proto_ids, matrices = compute_job(job)
+    save_result(job['output'], job['prototypes'], ids, proto_ids, matrices)
+    return job['output']
+
+
+def save_result(path, prototypes, ids, proto_ids, matrices):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    scatter_io.save(path, matrices, proto_ids, ids, prototypes)
+
+
+def load_result(path):
+    """prototypes, ids, prototype ids and matrices of a job result"""
+    cache = scatter_io.load(path)
+    return (cache.prototypes, cache.ids.astype(np.int64),
+            np.asarray(cache.proto_ids), cache.matrices.astype(np.float64))
+
+
+def compute_tile(task):
+    """tile, ids, prototype ids and matrices of one scatter tile"""
+    tile, seed, sources, face_normal, min_distance, overlap_radius, \
+        proto_weights = task
+    return (tile,) + scatter_engine.compute_scatter(
+        sources, face_normal, seed, min_distance, overlap_radius,
+        proto_weights)
+
+
+def worker_pool(processes=None):
+    """process pool that starts plain python workers, even inside maya
+
+    maya itself cannot be forked or spawned, so its workers run mayapy.
+    None when that is not possible: python 2 can only spawn on windows.
+    """
+    name = os.path.basename(sys.executable).lower()
+    if not name.startswith('maya') or name.startswith('mayapy'):
+        return multiprocessing.Pool(processes)
+    mayapy = os.path.join(os.path.dirname(sys.executable),
+                          'mayapy.exe' if os.name == 'nt' else 'mayapy')
+    if hasattr(multiprocessing, 'get_context'):
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(mayapy)
+        return context.Pool(processes)
+    if os.name == 'nt':
+        multiprocessing.set_executable(mayapy)
+        return multiprocessing.Pool(processes)
+    return None
+
+
+def pool_map(function, items, processes=None):
+    """function over items in a worker pool, results in items order
+
+    runs in this process when there is no pool to use.
+    """
+    pool = None
+    if processes != 1 and len(items) > 1:
+        pool = worker_pool(processes)
+    if pool is None:
+        return [function(item) for item in items]
+    try:
+        return pool.map(function, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def run(jobs, processes=None):
+    """runs jobs across a process pool, returns their output paths"""
+    return pool_map(run_job, jobs, processes)
+
+
+def run_tiles(tasks, processes=None):
+    """computes scatter tiles across a process pool
+
+    every task is (tile, seed, sources, face normal, min distance,
+    overlap radius, prototype weights). results come back in task order,
+    so they do not depend on the number of processes.
+    """
+    return pool_map(compute_tile, tasks, processes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('spec', help='json job spec')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes, all cores by default')
+    args = parser.parse_args(argv)
+    for path in run(load_jobs(args.spec), args.processes):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import collections
+
+import scatter_sampling
+
+
+class MeshCache(object):
+    """per mesh geometry arrays with LRU eviction under a byte budget
+
+    entries are keyed by mesh uuid and stay valid while the mesh signature
+    (topology counts, world bounding box, world matrix and a hash of
+    sampled vertex positions) is unchanged.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, signature, name, build):
+        """cached array name of the mesh key, built with build() on a miss"""
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry['signature'] != signature:
+            self.nbytes -= entry['nbytes']
+            entry = None
+        if entry is None:
+            entry = {'signature': signature, 'arrays': {}, 'nbytes': 0}
+        self._entries[key] = entry
+
+        if name in entry['arrays']:
+            self.hits += 1
+            return entry['arrays'][name]
+        self.misses += 1
+        value = build()
+        size = _nbytes(value)
+        entry['arrays'][name] = value
+        entry['nbytes'] += size
+        self.nbytes += size
+        self._evict(key)
+        return value
+
+    def invalidate(self, key=None):
+        """drops one mesh, or everything when key is None"""
+        keys = list(self._entries) if key is None else [key]
+        for old in keys:
+            entry = self._entries.pop(old, None)
+            if entry is not None:
+                self.nbytes -= entry['nbytes']
+
+    def _evict(self, keep):
+        for key in list(self._entries):
+            if self.nbytes <= self.max_bytes:
+                break
+            if key != keep:
+                self.invalidate(key)
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class CachedBackend(object):
+    """wraps a scene backend so mesh geometry reads go through a MeshCache"""
+
+    cached = ('mesh_points', 'mesh_normals', 'mesh_triangles',
+              'mesh_polygons')
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else MeshCache()
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in self.cached:
+            return attr
+
+        def cached_read(mesh):
+            key, signature = self.backend.mesh_signature(mesh)
+            return self.cache.get(key, signature, name, lambda: attr(mesh))
+        return cached_read
+
+    def mesh_triangle_areas(self, mesh):
+        """triangle areas built from the cached points and triangles"""
+        key, signature = self.backend.mesh_signature(mesh)
+        return self.cache.get(
+            key, signature, 'mesh_triangle_areas',
+            lambda: scatter_sampling.triangle_areas(
+                self.mesh_points(mesh), self.mesh_triangles(mesh)[0]))
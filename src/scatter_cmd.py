@@ -0,0 +1,186 @@
+"""scatterToolOp, one compact undo entry for a scatter or randomize
+
+the command runs a pending operation with undo recording off, so the
+thousands of instance, parent and setAttr calls inside it leave no undo
+entries of their own. the operation keeps what it needs to revert in
+bulk: the created root nodes, or the modifier that wrote the transform
+values.
+
+    execute(CreateOperation(create, roots), 'scatter_obj')
+
+loads the plugin on first use. without it the operation runs through
+plain commands inside an undo chunk instead.
+"""
+import contextlib
+import os
+import sys
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+COMMAND = 'scatterToolOp'
+
+PLUGIN = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+
+
+def maya_useNewAPI():
+    """tells maya the plugin uses the python api 2.0"""
+
+
+class CreateOperation(object):
+    """nodes made by create, undone by deleting their roots in one go
+
+    roots returns the names of the new top nodes once create ran. undo
+    deletes them through one MDagModifier, redo restores them from it,
+    so neither runs the scatter again. create None registers nodes that
+    already exist.
+    """
+
+    def __init__(self, create, roots):
+        self.create = create
+        self.roots = roots
+        self.result = None
+        self.handles = None
+        self.modifier = None
+
+    def redo(self):
+        if self.handles is None:
+            if self.create is not None:
+                self.result = self.create()
+            self.handles = [om.MObjectHandle(_node(root))
+                            for root in self.roots() if root and
+                            cmds.objExists(root)]
+        elif self.modifier is not None:
+            self.modifier.undoIt()
+
+    def undo(self):
+        if self.modifier is None:
+            self.modifier = om.MDagModifier()
+            for handle in self.handles:
+                if handle.isValid():
+                    self.modifier.deleteNode(handle.object())
+        self.modifier.doIt()
+
+    def apply(self):
+        if self.create is not None:
+            self.result = self.create()
+
+
+class TransformOperation(object):
+    """one double3 attribute of many nodes written by one MDGModifier
+
+    values are the new (N, 3) values of nodes. undo and redo replay the
+    same modifier, so neither reads the scene again.
+    """
+
+    def __init__(self, backend, nodes, attr, values):
+        self.backend = backend
+        self.nodes = nodes
+        self.attr = attr
+        self.values = values
+        self.result = None
+        self.modifier = None
+
+    def redo(self):
+        if self.modifier is None:
+            self.modifier = self.backend.vector_modifier(
+                self.nodes, self.attr, self.values)
+        self.modifier.doIt()
+
+    def undo(self):
+        self.modifier.undoIt()
+
+    def apply(self):
+        self.backend.set_vectors(self.nodes, self.attr, self.values)
+
+
+class ScatterCommand(om.MPxCommand):
+    """runs the operation execute queued as a single undoable command"""
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.operation = None
+
+    @staticmethod
+    def creator():
+        return ScatterCommand()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        self.operation = _shared().PENDING.pop()
+        self.redoIt()
+
+    def redoIt(self):
+        with undo_suspended():
+            self.operation.redo()
+
+    def undoIt(self):
+        with undo_suspended():
+            self.operation.undo()
+
+
+PENDING = []
+
+
+def _shared():
+    """this module as scatter imported it
+
+    maya can load the plugin file as a module of its own, the queue has
+    to be the one execute filled.
+    """
+    return sys.modules.get('scatter_cmd', sys.modules[__name__])
+
+
+def _node(name):
+    sel = om.MSelectionList()
+    sel.add(name)
+    return sel.getDependNode(0)
+
+
+def available():
+    """True once the plugin is loaded, loading it if needed"""
+    try:
+        if not cmds.pluginInfo(PLUGIN, query=True, loaded=True):
+            cmds.loadPlugin(PLUGIN, quiet=True)
+        return bool(cmds.pluginInfo(PLUGIN, query=True, loaded=True))
+    except RuntimeError:
+        return False
+
+
+@contextlib.contextmanager
+def undo_suspended(enabled=True):
+    """runs the block without recording undo, when enabled"""
+    if not enabled:
+        yield
+        return
+    state = cmds.undoInfo(query=True, state=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(stateWithoutFlush=state)
+
+
+def execute(operation, name='scatter'):
+    """runs operation as one undo entry, returns its result"""
+    if available():
+        PENDING.append(operation)
+        getattr(cmds, COMMAND)()
+        return operation.result
+    cmds.undoInfo(openChunk=True, chunkName=name)
+    try:
+        operation.apply()
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return operation.result
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'ScatterTool', '1.0').registerCommand(
+        COMMAND, ScatterCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND)
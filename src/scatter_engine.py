@@ -0,0 +1,1411 @@
+import hashlib
+
+import numpy as np
+
+import scatter_random
+import scatter_sampling
+
+
+UP_AXIS = (0.0, 1.0, 0.0)
+# rays project_points casts against one mesh per cast_down call
+PROJECT_BATCH = 10000
+# vertex positions mesh_signature hashes to notice deformations
+SIGNATURE_SAMPLES = 256
+# picked so normals pointing straight up end up with an identity rotation
+FALLBACK_AXIS = (-1.0, 0.0, 0.0)
+
+
+class CmdsBackend(object):
+    """bulk scene access through a maya.cmds like module"""
+
+    def __init__(self, cmds, api=None):
+        self.cmds = cmds
+        self.api = api
+        self.intersectors = {}
+
+    def _api(self):
+        """maya.api.OpenMaya, imported on first use"""
+        if self.api is None:
+            import maya.api.OpenMaya as api
+            self.api = api
+        return self.api
+
+    def _mesh_fn(self, mesh):
+        api = self._api()
+        sel = api.MSelectionList()
+        sel.add(mesh)
+        return api.MFnMesh(sel.getDagPath(0))
+
+    def mesh_points(self, mesh):
+        """returns every world space vertex position of mesh as (N, 3)"""
+        flat = self.cmds.xform(mesh + '.vtx[*]', q=True, ws=True, t=True)
+        return np.asarray(flat, dtype=np.float64).reshape(-1, 3)
+
+    def mesh_normals(self, mesh):
+        """returns every world space vertex normal of mesh as (N, 3)"""
+        normals = self._mesh_fn(mesh).getVertexNormals(
+            False, self._api().MSpace.kWorld)
+        return np.array(normals, dtype=np.float64).reshape(-1, 3)
+
+    def mesh_triangles(self, mesh):
+        """(T, 3) triangle vertex ids and the face id of every triangle"""
+        counts, vertices = self._mesh_fn(mesh).getTriangles()
+        counts = np.array(counts, dtype=np.int32)
+        triangles = np.array(vertices, dtype=np.int32).reshape(-1, 3)
+        face_ids = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        return triangles, face_ids
+
+    def mesh_triangle_areas(self, mesh):
+        """area of every triangle of mesh"""
+        return scatter_sampling.triangle_areas(self.mesh_points(mesh),
+                                               self.mesh_triangles(mesh)[0])
+
+    def vertex_colors(self, mesh):
+        """(N, 4) rgba of every vertex, -1 where nothing is painted"""
+        colors = self._mesh_fn(mesh).getVertexColors()
+        return np.array(colors, dtype=np.float64).reshape(-1, 4)
+
+    def vertex_uvs(self, mesh):
+        """(N, 2) uv of every vertex from the current uv set
+
+        a vertex on a uv seam takes one of its uvs, vertices without uvs
+        get (0, 0).
+        """
+        mesh_fn = self._mesh_fn(mesh)
+        us, vs = mesh_fn.getUVs()
+        uv_counts, uv_ids = mesh_fn.getAssignedUVs()
+        counts, connects = mesh_fn.getVertices()
+        counts = np.array(counts, dtype=np.int32)
+        connects = np.array(connects, dtype=np.int32)
+        # faces without uvs have no entries in uv_ids
+        has_uvs = np.repeat(np.array(uv_counts, dtype=np.int32) > 0, counts)
+        table = np.stack([np.array(us, dtype=np.float64),
+                          np.array(vs, dtype=np.float64)], axis=1)
+        uvs = np.zeros((mesh_fn.numVertices, 2))
+        uvs[connects[has_uvs]] = table[np.array(uv_ids, dtype=np.int32)]
+        return uvs
+
+    def texture_colors(self, texture, uvs):
+        """(N, 3) rgb of a texture node at (N, 2) uvs in one query"""
+        values = self.cmds.colorAtPoint(texture, output='RGB',
+                                        u=uvs[:, 0].tolist(),
+                                        v=uvs[:, 1].tolist())
+        return np.asarray(values, dtype=np.float64).reshape(-1, 3)
+
+    def mesh_signature(self, mesh):
+        """(uuid, signature) that changes when the mesh is edited or moved
+
+        next to the topology counts, bounding box and world matrix it
+        hashes up to SIGNATURE_SAMPLES evenly strided vertex positions,
+        read in one xform query, so sculpting inside the bounding box
+        shows up as well.
+        """
+        cmds = self.cmds
+        vertices = cmds.polyEvaluate(mesh, vertex=True)
+        stride = max(-(-vertices // SIGNATURE_SAMPLES), 1)
+        samples = ['%s.vtx[%d]' % (mesh, index)
+                   for index in range(0, vertices, stride)]
+        positions = cmds.xform(samples, q=True, ws=True, t=True) \
+            if samples else []
+        signature = (vertices,
+                     cmds.polyEvaluate(mesh, edge=True),
+                     cmds.polyEvaluate(mesh, face=True),
+                     tuple(cmds.exactWorldBoundingBox(mesh)),
+                     tuple(cmds.getAttr(mesh + '.worldMatrix[0]')),
+                     hash(tuple(positions)))
+        return cmds.ls(mesh, uuid=True)[0], signature
+
+    def mesh_polygons(self, mesh):
+        """per face vertex counts and the flat face vertex list"""
+        counts, connects = self._mesh_fn(mesh).getVertices()
+        return (np.array(counts, dtype=np.int32),
+                np.array(connects, dtype=np.int32))
+
+    def convert_edges(self, mesh, edge_ids, to='vertex'):
+        """int32 vertex ids of the given edges, or the faces on their sides
+
+        one polyListComponentConversion over compact edge ranges, no query
+        runs per edge.
+        """
+        if len(edge_ids) == 0:
+            return np.zeros(0, dtype=np.int32)
+        flag = 'toVertex' if to == 'vertex' else 'toFace'
+        converted = self.cmds.polyListComponentConversion(
+            component_ranges(mesh, 'e', edge_ids), fromEdge=True,
+            **{flag: True}) or []
+        count = 0
+        if any(component.endswith('[*]') for component in converted):
+            count = self.vertex_count(mesh) if to == 'vertex' else \
+                self.face_count(mesh)
+        return range_ids(converted, count)
+
+    def cast_down(self, mesh, xz, top, distance):
+        """closest hit of a ray cast straight down from every (x, top, z)
+
+        returns the ray params, inf where the ray missed, (N, 3) hit
+        points, face ids, triangle ids within the face and (N, 2)
+        barycentrics of the first two triangle corners. the intersection
+        grid of mesh is built on the first call and reused until
+        free_intersectors.
+        """
+        api = self._api()
+        if mesh not in self.intersectors:
+            mesh_fn = self._mesh_fn(mesh)
+            self.intersectors[mesh] = (mesh_fn,
+                                       mesh_fn.autoUniformGridParams())
+        mesh_fn, accel = self.intersectors[mesh]
+        down = api.MFloatVector(0.0, -1.0, 0.0)
+        params = np.full(len(xz), np.inf)
+        points = np.zeros((len(xz), 3))
+        faces = np.zeros(len(xz), dtype=np.int32)
+        triangles = np.zeros(len(xz), dtype=np.int32)
+        bary = np.zeros((len(xz), 2))
+        for index, (x, z) in enumerate(xz.tolist()):
+            hit = mesh_fn.closestIntersection(
+                api.MFloatPoint(x, top, z), down, api.MSpace.kWorld,
+                distance, False, None, None, False, accel)
+            if hit is None or hit[2] < 0:
+                continue
+            point, params[index], faces[index], triangles[index], \
+                bary[index, 0], bary[index, 1] = hit
+            points[index] = (point.x, point.y, point.z)
+        return params, points, faces, triangles, bary
+
+    def free_intersectors(self):
+        """drops the intersection grids cast_down built"""
+        for mesh_fn, _ in self.intersectors.values():
+            mesh_fn.freeCachedIntersectionAccelerator()
+        self.intersectors = {}
+
+    def bounding_radius(self, obj):
+        """half the diagonal of the world bounding box of obj"""
+        box = np.asarray(self.cmds.exactWorldBoundingBox(obj),
+                         dtype=np.float64)
+        return 0.5 * float(np.linalg.norm(box[3:] - box[:3]))
+
+    def vertex_count(self, mesh):
+        return self.cmds.polyEvaluate(mesh, vertex=True)
+
+    def face_count(self, mesh):
+        return self.cmds.polyEvaluate(mesh, face=True)
+
+    def selected_components(self):
+        """(mesh, kind, int32 ids) for every selected mesh
+
+        kind is vertex, edge or face, or object with ids None when the
+        mesh itself is selected.
+        """
+        api = self._api()
+        kinds = {api.MFn.kMeshVertComponent: 'vertex',
+                 api.MFn.kMeshEdgeComponent: 'edge',
+                 api.MFn.kMeshPolygonComponent: 'face'}
+        sel = api.MGlobal.getActiveSelectionList()
+        selected = []
+        for index in range(sel.length()):
+            if not sel.getDependNode(index).hasFn(api.MFn.kDagNode):
+                continue
+            path, component = sel.getComponent(index)
+            if not path.extendToShape().hasFn(api.MFn.kMesh):
+                continue
+            mesh = path.fullPathName()
+            if component.isNull():
+                selected.append((mesh, 'object', None))
+            elif component.apiType() in kinds:
+                ids = api.MFnSingleIndexedComponent(component).getElements()
+                selected.append((mesh, kinds[component.apiType()],
+                                 np.array(ids, dtype=np.int32)))
+        return selected
+
+    def recording_undo(self):
+        """True while maya records undo, api writes would be left out"""
+        return bool(self.cmds.undoInfo(query=True, state=True))
+
+    def create_instances(self, obj, count, name='obj_inst'):
+        """instance obj count times, returns the new transforms
+
+        every round instances all nodes made so far, so only about
+        log2(count) instance commands run.
+        """
+        if count <= 0:
+            return []
+        nodes = list(self.cmds.instance(obj, n=name))
+        while len(nodes) < count:
+            nodes.extend(self.cmds.instance(nodes[:count - len(nodes)]))
+        return nodes
+
+    def set_translations(self, nodes, translations):
+        """write one (x, y, z) translation per node"""
+        self.set_vectors(nodes, 'translate', translations)
+
+    def parent(self, nodes, group):
+        """parents every node under group in one call, returns long names"""
+        if not nodes:
+            return []
+        return self.cmds.ls(self.cmds.parent(nodes, group), long=True)
+
+    def rename(self, nodes, names):
+        """renames long named nodes, returns their new long names
+
+        one MDGModifier renames them all while undo is not recorded.
+        """
+        if nodes and not self.recording_undo():
+            api = self._api()
+            sel = api.MSelectionList()
+            for node in nodes:
+                sel.add(node)
+            objects = [sel.getDependNode(index)
+                       for index in range(len(nodes))]
+            modifier = api.MDGModifier()
+            for obj, name in zip(objects, names):
+                modifier.renameNode(obj, name)
+            modifier.doIt()
+            return [api.MFnDagNode(obj).fullPathName() for obj in objects]
+        renamed = []
+        for node, name in zip(nodes, names):
+            new_name = self.cmds.rename(node, name)
+            renamed.append(node.rpartition('|')[0] + '|' +
+                           new_name.rpartition('|')[2])
+        return renamed
+
+    def children(self, group):
+        """long names of the transforms directly under group"""
+        return self.cmds.listRelatives(group, children=True, fullPath=True,
+                                       type='transform') or []
+
+    def delete(self, nodes):
+        if nodes:
+            self.cmds.delete(nodes)
+
+    def get_array_attr(self, node, attr):
+        """values of a doubleArray attribute, None when it does not exist"""
+        if not self.cmds.attributeQuery(attr, node=node, exists=True):
+            return None
+        return np.asarray(self.cmds.getAttr(node + '.' + attr) or [],
+                          dtype=np.float64)
+
+    def set_array_attr(self, node, attr, values):
+        """stores values in a doubleArray attribute, adding it if needed"""
+        if not self.cmds.attributeQuery(attr, node=node, exists=True):
+            self.cmds.addAttr(node, ln=attr, dt='doubleArray')
+        self.cmds.setAttr(node + '.' + attr,
+                          np.asarray(values, dtype=np.float64).ravel()
+                          .tolist(), type='doubleArray')
+
+    def selected_transforms(self):
+        """transforms above the selected shapes, shape nodes left out"""
+        shapes = self.cmds.ls(selection=True, dag=True, shapes=True,
+                              noIntermediate=True, long=True) or []
+        seen = set()
+        nodes = []
+        for shape in shapes:
+            node = shape.rpartition('|')[0]
+            if node and node not in seen:
+                seen.add(node)
+                nodes.append(node)
+        return nodes
+
+    def uuids(self, nodes):
+        """uuid of every node"""
+        if not nodes:
+            return []
+        return self.cmds.ls(nodes, uuid=True)
+
+    def _plugs(self, nodes, attr):
+        """the attr plug of every node, looked up through one selection"""
+        api = self._api()
+        sel = api.MSelectionList()
+        for node in nodes:
+            sel.add(node)
+        return [api.MFnDependencyNode(sel.getDependNode(index))
+                .findPlug(attr, False) for index in range(len(nodes))]
+
+    def _ui_scale(self, attr):
+        """factor from the internal units of a double3 attr to ui units"""
+        api = self._api()
+        if attr == 'translate':
+            return api.MDistance.internalToUI(1.0)
+        if attr == 'rotate':
+            return api.MAngle.internalToUI(1.0)
+        return 1.0
+
+    def get_vectors(self, nodes, attr):
+        """(N, 3) ui unit values of a double3 attribute such as translate
+
+        read through the api, no command runs per node.
+        """
+        values = [plug.child(axis).asDouble()
+                  for plug in self._plugs(nodes, attr) for axis in range(3)]
+        return np.asarray(values, dtype=np.float64).reshape(-1, 3) * \
+            self._ui_scale(attr)
+
+    def vector_modifier(self, nodes, attr, values, modifier=None):
+        """an MDGModifier writing one double3 value per node
+
+        nothing is written until its doIt, which sets every value at once.
+        undoIt puts the old values back. given a modifier, the writes are
+        added to it.
+        """
+        if modifier is None:
+            modifier = self._api().MDGModifier()
+        values = np.asarray(values, dtype=np.float64) / self._ui_scale(attr)
+        for plug, value in zip(self._plugs(nodes, attr), values.tolist()):
+            for axis in range(3):
+                modifier.newPlugValueDouble(plug.child(axis), value[axis])
+        return modifier
+
+    def set_vectors(self, nodes, attr, values):
+        """write one double3 value per node
+
+        a single modifier writes them while undo is not recorded, as in
+        the scatter command. otherwise setAttr runs per node, so undo
+        records it.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not self.recording_undo():
+            if nodes:
+                self.vector_modifier(nodes, attr, values).doIt()
+            return
+        for node, value in zip(nodes, values.tolist()):
+            self.cmds.setAttr(node + '.' + attr, value[0], value[1],
+                              value[2], type='double3')
+
+    def set_matrices(self, nodes, matrices):
+        """write one world space 4x4 matrix per node
+
+        the nodes have to share a parent. while undo is not recorded the
+        matrices are split into translate, rotate and scale and written
+        by one modifier, with the xyz rotate order they assume.
+        """
+        if not nodes:
+            return
+        if self.recording_undo():
+            for node, matrix in zip(nodes,
+                                    matrices.reshape(-1, 16).tolist()):
+                self.cmds.xform(node, ws=True, matrix=matrix)
+            return
+        parent_inverse = np.asarray(
+            self.cmds.getAttr(nodes[0] + '.parentInverseMatrix[0]'),
+            dtype=np.float64).reshape(4, 4)
+        translations, rotations, scales = matrices_to_trs(
+            np.matmul(matrices, parent_inverse))
+        modifier = self.vector_modifier(nodes, 'translate', translations)
+        self.vector_modifier(nodes, 'rotate', rotations, modifier)
+        self.vector_modifier(nodes, 'scale', scales, modifier)
+        for plug in self._plugs(nodes, 'rotateOrder'):
+            modifier.newPlugValueInt(plug, 0)
+        modifier.doIt()
+
+    def create_instancer(self, obj, translations, rotations, scales,
+                         proto_ids=None, name='scatter_points'):
+        """one particle node holding every point plus an instancer of obj
+
+        obj can be a list of prototypes, proto_ids then picks the one
+        every point shows.
+        """
+        particle, shape = self.cmds.particle(p=translations.tolist(),
+                                             n=name)
+        for attr, values in (('rotationPP', rotations), ('scalePP', scales)):
+            for plug in (attr, attr + '0'):
+                self.cmds.addAttr(shape, ln=plug, dt='vectorArray')
+            self.cmds.setAttr(shape + '.' + attr, len(values),
+                              *[tuple(v) for v in values.tolist()],
+                              type='vectorArray')
+        options = {}
+        if proto_ids is not None:
+            for plug in ('protoIndexPP', 'protoIndexPP0'):
+                self.cmds.addAttr(shape, ln=plug, dt='doubleArray')
+            self.cmds.setAttr(shape + '.protoIndexPP',
+                              np.asarray(proto_ids, dtype=np.float64)
+                              .tolist(), type='doubleArray')
+            options['objectIndex'] = 'protoIndexPP'
+        self.cmds.saveInitialState(shape)
+        instancer = self.cmds.particleInstancer(
+            shape, addObject=True, object=obj, rotation='rotationPP',
+            scale='scalePP', name=name + '_instancer', **options)
+        return [particle, instancer]
+
+    def create_mesh(self, points, counts, connects, name='scatter_mesh',
+                    uvs=None, reference=False):
+        """one mesh node made from numpy arrays in a single api call
+
+        uvs is (u, v, uv counts, uv ids) like mesh_geometry returns them.
+        a reference mesh cannot be picked in the viewport. returns its
+        transform.
+        """
+        api = self._api()
+        mesh_fn = api.MFnMesh()
+        transform = mesh_fn.create(
+            api.MPointArray(points.tolist()), counts.tolist(),
+            connects.tolist())
+        if uvs is not None and len(uvs[0]):
+            mesh_fn.setUVs(uvs[0].tolist(), uvs[1].tolist())
+            mesh_fn.assignUVs(uvs[2].tolist(), uvs[3].tolist())
+        node = self.cmds.rename(api.MFnDagNode(transform).fullPathName(),
+                                name)
+        self.cmds.sets(node, edit=True, forceElement='initialShadingGroup')
+        if reference:
+            self.cmds.setAttr(node + '.overrideEnabled', 1)
+            self.cmds.setAttr(node + '.overrideDisplayType', 2)
+        return node
+
+    def mesh_geometry(self, mesh):
+        """object space points, face counts, face vertices and uvs of mesh
+
+        uvs is (u, v, uv counts, uv ids) of the current uv set.
+        """
+        api = self._api()
+        mesh_fn = self._mesh_fn(mesh)
+        points = np.array(mesh_fn.getPoints(api.MSpace.kObject),
+                          dtype=np.float64).reshape(-1, 4)[:, :3]
+        counts, connects = mesh_fn.getVertices()
+        us, vs = mesh_fn.getUVs()
+        uv_counts, uv_ids = mesh_fn.getAssignedUVs()
+        return (points, np.array(counts, dtype=np.int32),
+                np.array(connects, dtype=np.int32),
+                (np.array(us, dtype=np.float64),
+                 np.array(vs, dtype=np.float64),
+                 np.array(uv_counts, dtype=np.int32),
+                 np.array(uv_ids, dtype=np.int32)))
+
+    def world_matrix(self, obj):
+        """(4, 4) world matrix of obj"""
+        return np.asarray(self.cmds.getAttr(obj + '.worldMatrix[0]'),
+                          dtype=np.float64).reshape(4, 4)
+
+    def set_mesh_points(self, mesh, points):
+        """moves every vertex of mesh in one MFnMesh.setPoints call
+
+        points has to match its vertex count.
+        """
+        api = self._api()
+        self._mesh_fn(mesh).setPoints(api.MPointArray(points.tolist()),
+                                      api.MSpace.kObject)
+
+    def instancer_trs(self, particle):
+        """reads translations, rotations and scales back off a particle"""
+        shape = self.cmds.listRelatives(particle, shapes=True)[0]
+        return [np.asarray(self.cmds.getAttr(shape + '.' + attr),
+                           dtype=np.float64).reshape(-1, 3)
+                for attr in ('position', 'rotationPP', 'scalePP')]
+
+    def instancer_proto_ids(self, particle):
+        """per point prototype ids of a particle, all 0 without them"""
+        shape = self.cmds.listRelatives(particle, shapes=True)[0]
+        count = self.cmds.particle(shape, q=True, count=True)
+        if not self.cmds.attributeQuery('protoIndexPP', node=shape,
+                                        exists=True):
+            return np.zeros(count, dtype=np.int32)
+        return np.asarray(self.cmds.getAttr(shape + '.protoIndexPP'),
+                          dtype=np.float64).astype(np.int32)
+
+
+def component_ranges(mesh, kind, ids):
+    """mesh.kind[first:last] strings covering the runs of ids"""
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+    firsts = ids[np.concatenate([[0], breaks])].tolist()
+    lasts = ids[np.concatenate([breaks - 1, [len(ids) - 1]])].tolist()
+    return ['%s.%s[%d:%d]' % (mesh, kind, first, last)
+            for first, last in zip(firsts, lasts)]
+
+
+def range_ids(components, count):
+    """unique int32 ids of mesh.kind[first:last] strings
+
+    [*] stands for all count ids.
+    """
+    ids = [np.zeros(0, dtype=np.int64)]
+    for component in components:
+        inside = component.rpartition('[')[2].rstrip(']')
+        if inside == '*':
+            ids.append(np.arange(count))
+            continue
+        first, _, last = inside.partition(':')
+        ids.append(np.arange(int(first), int(last or first) + 1))
+    return np.unique(np.concatenate(ids)).astype(np.int32)
+
+
+def faces_to_vertices(counts, connects, face_ids):
+    """sorted unique vertex ids used by the given faces"""
+    owner = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    return np.unique(connects[np.isin(owner, face_ids)]).astype(np.int32)
+
+
+def vertices_to_faces(counts, connects, vert_ids):
+    """sorted unique face ids touching any of the given vertices"""
+    owner = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    return np.unique(owner[np.isin(connects, vert_ids)]).astype(np.int32)
+
+
+def resolve_selection(backend, to='vertex', whole_object=False):
+    """(mesh, int32 ids) pairs for the current selection
+
+    vertex, edge and face selections are converted to vertex or face ids
+    (to), an edge to its two vertices or the faces on its sides. objects
+    without components, or every mesh when whole_object is set, resolve
+    to all of their ids.
+    """
+    resolved = []
+    for mesh, kind, ids in backend.selected_components():
+        if whole_object or kind == 'object':
+            count = (backend.vertex_count(mesh) if to == 'vertex'
+                     else backend.face_count(mesh))
+            resolved.append((mesh, np.arange(count, dtype=np.int32)))
+            continue
+        if kind == to:
+            resolved.append((mesh, ids))
+            continue
+        if kind == 'edge':
+            resolved.append((mesh, backend.convert_edges(mesh, ids, to)))
+            continue
+        counts, connects = backend.mesh_polygons(mesh)
+        if kind == 'face':
+            resolved.append((mesh, faces_to_vertices(counts, connects, ids)))
+        else:
+            resolved.append((mesh, vertices_to_faces(counts, connects, ids)))
+    return merge_ids(resolved)
+
+
+def merge_ids(pairs):
+    """one (mesh, unique ids) pair per mesh, in first seen order"""
+    merged = {}
+    order = []
+    for mesh, ids in pairs:
+        if mesh not in merged:
+            merged[mesh] = []
+            order.append(mesh)
+        merged[mesh].append(ids)
+    return [(mesh, np.unique(np.concatenate(merged[mesh])).astype(np.int32))
+            for mesh in order]
+
+
+def translation_matrices(translations):
+    """(N, 4, 4) matrices that only translate"""
+    matrices = np.zeros((len(translations), 4, 4))
+    matrices[:, [0, 1, 2, 3], [0, 1, 2, 3]] = 1.0
+    matrices[:, 3, :3] = translations
+    return matrices
+
+
+def stack_matrices(matrices):
+    """concatenates a list of (N, 4, 4) arrays, empty lists included"""
+    if not matrices:
+        return np.zeros((0, 4, 4))
+    return np.concatenate(matrices)
+
+
+def face_up_matrices(backend, mesh, indices):
+    """matrices placing instances upright on the given vertices"""
+    indices = np.asarray(indices, dtype=np.int64)
+    return translation_matrices(backend.mesh_points(mesh)[indices])
+
+
+def _normalize(vectors):
+    length = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+    return vectors / np.maximum(length, 1e-12)[:, None], length
+
+
+def frames_from_normals(positions, normals, up=UP_AXIS,
+                        fallback=FALLBACK_AXIS, eps=1e-6):
+    """builds (N, 4, 4) world matrices with +Y along each normal
+
+    rows follow the maya layout of the old per vertex code: the two
+    tangents, the normal and the position. normals parallel to up use
+    the fallback axis to build the first tangent instead.
+    """
+    normals, _ = _normalize(np.asarray(normals, dtype=np.float64))
+    tangent, length = _normalize(np.cross(normals, up))
+    degenerate = length < eps
+    if degenerate.any():
+        tangent[degenerate], _ = _normalize(
+            np.cross(normals[degenerate], fallback))
+    tangent2, _ = _normalize(np.cross(normals, tangent))
+
+    matrices = np.zeros((len(normals), 4, 4))
+    matrices[:, 0, :3] = tangent2
+    matrices[:, 1, :3] = normals
+    matrices[:, 2, :3] = tangent
+    matrices[:, 3, :3] = positions
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def face_normal_matrices(backend, mesh, indices):
+    """matrices aligning instances to the normals of the given vertices"""
+    indices = np.asarray(indices, dtype=np.int64)
+    return frames_from_normals(backend.mesh_points(mesh)[indices],
+                               backend.mesh_normals(mesh)[indices])
+
+
+def surface_sampler(backend, mesh, face_ids=None, vert_weights=None):
+    """area weighted sampler over mesh, or only the given faces of it
+
+    per vertex density weights are averaged over every triangle. a sampler
+    over some faces only holds the vertices they use, so it stays small
+    when it is sent to a worker process.
+    """
+    triangles, tri_faces = backend.mesh_triangles(mesh)
+    areas = backend.mesh_triangle_areas(mesh)
+    points = backend.mesh_points(mesh)
+    normals = backend.mesh_normals(mesh)
+    if face_ids is not None:
+        keep = np.isin(tri_faces, face_ids)
+        triangles, areas = triangles[keep], areas[keep]
+    weights = None
+    if vert_weights is not None:
+        weights = vert_weights[triangles].mean(axis=1)
+    if face_ids is not None:
+        used, triangles = np.unique(triangles, return_inverse=True)
+        triangles = triangles.reshape(-1, 3)
+        points, normals = points[used], normals[used]
+    return scatter_sampling.SurfaceSampler(points, triangles, normals, areas,
+                                           weights)
+
+
+def filter_mask(points, normals, slope=None, height=None, facing=None):
+    """(N,) bool mask of the vertices passing every given filter
+
+    slope is a (min, max) angle in degrees between the normal and up,
+    height a (min, max) world y band and facing a (direction, max angle)
+    cone the normal has to point into. filters left as None pass all.
+    """
+    mask = np.ones(len(points), dtype=bool)
+    if slope is not None:
+        angles = np.degrees(np.arccos(np.clip(normals.dot(UP_AXIS), -1, 1)))
+        mask &= (angles >= slope[0]) & (angles <= slope[1])
+    if height is not None:
+        mask &= (points[:, 1] >= height[0]) & (points[:, 1] <= height[1])
+    if facing is not None:
+        direction = _normalize(np.asarray(facing[0], dtype=np.float64)
+                               .reshape(1, 3))[0][0]
+        mask &= normals.dot(direction) >= np.cos(np.radians(facing[1]))
+    return mask
+
+
+LUMA = np.array([0.2126, 0.7152, 0.0722])
+
+
+def density_weights(backend, mesh, density_map, texture=None):
+    """per vertex density weights in [0, 1] read in bulk
+
+    density_map is 'color' for the painted vertex colours or 'texture' for
+    a texture node looked up at every vertex uv. the luminance is used,
+    unpainted vertices weigh 0.
+    """
+    if density_map == 'color':
+        colors = backend.vertex_colors(mesh)[:, :3]
+    else:
+        colors = backend.texture_colors(texture, backend.vertex_uvs(mesh))
+    return np.clip(colors.dot(LUMA), 0.0, 1.0)
+
+
+def face_centers(points, counts, connects):
+    """(F, 3) average vertex position of every face"""
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    return (np.add.reduceat(points[connects], starts) /
+            np.asarray(counts, dtype=np.float64)[:, None])
+
+
+def group_by_tile(positions, tile_size):
+    """{(x, z) tile: indices} of positions on a world grid of tile_size"""
+    keys = np.floor(np.asarray(positions)[:, [0, 2]] /
+                    tile_size).astype(np.int64)
+    if not len(keys):
+        return {}
+    tiles, inverse = np.unique(keys, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind='stable')
+    splits = np.cumsum(np.bincount(inverse.ravel()))[:-1]
+    return dict(zip([tuple(tile) for tile in tiles.tolist()],
+                    np.split(order, splits)))
+
+
+def tiles_between(low, high, tile_size):
+    """every (x, z) tile overlapping the xz box between low and high"""
+    first = np.floor(np.array([low[0], low[2]]) / tile_size).astype(int)
+    last = np.floor(np.array([high[0], high[2]]) / tile_size).astype(int)
+    return [(x, z) for x in range(first[0], last[0] + 1)
+            for z in range(first[1], last[1] + 1)]
+
+
+def tile_bounds(tile, tile_size, low, high):
+    """low and high clipped to the xz extent of tile"""
+    tile_low = np.array(low, dtype=np.float64)
+    tile_high = np.array(high, dtype=np.float64)
+    tile_low[[0, 2]] = np.maximum(tile_low[[0, 2]],
+                                  np.array(tile) * tile_size)
+    tile_high[[0, 2]] = np.minimum(tile_high[[0, 2]],
+                                   (np.array(tile) + 1) * tile_size)
+    return tile_low, tile_high
+
+
+def tile_slots(tiles, targets):
+    """gives the sources of every tile slots of their own, in place
+
+    tiles is {(x, z) tile: (seed, sources)} over targets target meshes.
+    surface and projection sources count their ids from 0 in every tile,
+    so the k-th tile in sorted order moves to slots k * targets and up
+    to keep the stable_ids of one scatter unique.
+    """
+    for index, tile in enumerate(sorted(tiles)):
+        for source in tiles[tile][1]:
+            source['slot'] += index * targets
+    return tiles
+
+
+def tile_name(tile):
+    """group name of an (x, z) tile, n marks negative coordinates"""
+    return ('scatter_tile_%d_%d' % tile).replace('-', 'n')
+
+
+def selection_bounds(backend, selection):
+    """world (min, max) corners around the vertices of selected faces"""
+    corners = []
+    for mesh, face_ids in selection:
+        counts, connects = backend.mesh_polygons(mesh)
+        points = backend.mesh_points(mesh)[
+            faces_to_vertices(counts, connects, face_ids)]
+        if len(points):
+            corners.extend([points.min(axis=0), points.max(axis=0)])
+    if not corners:
+        return np.zeros(3), np.zeros(3)
+    return np.min(corners, axis=0), np.max(corners, axis=0)
+
+
+def projection_candidates(seed, low, high, density):
+    """ids and (N, 2) xz positions spread between the low and high corners
+
+    density is the number of candidates per unit of xz area.
+    """
+    area = (high[0] - low[0]) * (high[2] - low[2])
+    ids = np.arange(int(area * density), dtype=np.int64)
+    xz = np.empty((len(ids), 2))
+    xz[:, 0] = scatter_random.uniform(seed, ids, scatter_random.PROJECT_X,
+                                      low[0], high[0])
+    xz[:, 1] = scatter_random.uniform(seed, ids, scatter_random.PROJECT_Z,
+                                      low[2], high[2])
+    return ids, xz
+
+
+def project_points(backend, selection, xz, top, distance, vert_weights=None,
+                   batch_size=PROJECT_BATCH):
+    """casts every xz point down onto the closest selected face
+
+    selection holds (mesh, face ids) pairs, hits on faces that are not
+    selected block the ray, also for the meshes below. every mesh is
+    intersected batch by batch through the grid backend.cast_down keeps
+    for it, the caller frees the grids with backend.free_intersectors.
+    returns the indices of the points that hit, their positions, their
+    interpolated normals and vert_weights (one array or None per mesh)
+    interpolated at them.
+    """
+    best = np.full(len(xz), np.inf)
+    found = np.zeros(len(xz), dtype=bool)
+    points = np.zeros((len(xz), 3))
+    normals = np.zeros((len(xz), 3))
+    weights = np.ones(len(xz))
+    for slot, (mesh, face_ids) in enumerate(selection):
+        triangles, tri_faces = backend.mesh_triangles(mesh)
+        mesh_normals = backend.mesh_normals(mesh)
+        selected = np.zeros(backend.face_count(mesh), dtype=bool)
+        selected[face_ids] = True
+        map_weights = None
+        if vert_weights is not None:
+            map_weights = vert_weights[slot]
+        for start in range(0, len(xz), batch_size):
+            params, hits, faces, tris, bary = backend.cast_down(
+                mesh, xz[start:start + batch_size], top, distance)
+            closer = params < best[start:start + batch_size]
+            nearest = np.flatnonzero(closer) + start
+            best[nearest] = params[closer]
+            found[nearest] = selected[faces[closer]]
+            closer &= selected[faces]
+            corners = triangles[np.searchsorted(tri_faces, faces[closer]) +
+                                tris[closer]]
+            barycentrics = np.column_stack(
+                [bary[closer], 1.0 - bary[closer].sum(axis=1)])
+            index = np.flatnonzero(closer) + start
+            points[index] = hits[closer]
+            normals[index] = np.einsum('ni,nij->nj', barycentrics,
+                                       mesh_normals[corners])
+            weights[index] = 1.0 if map_weights is None else \
+                np.einsum('ni,ni->n', barycentrics, map_weights[corners])
+    hit = np.flatnonzero(found)
+    return hit, points[hit], _normalize(normals[hit])[0], weights[hit]
+
+
+def projection_source(ids, points, normals=None):
+    """plain arrays for scattering on projected points"""
+    return {'slot': 0, 'ids': np.asarray(ids, dtype=np.int64),
+            'count': len(ids), 'points': points, 'normals': normals}
+
+
+def stable_ids(slot, ids):
+    """instance ids unique across the targets of one scatter
+
+    slot is the position of the target mesh, ids its vertex or point ids.
+    """
+    return (np.int64(slot) << np.int64(32)) | np.asarray(ids, np.int64)
+
+
+def hashed_ids(names):
+    """int64 ids hashed from strings such as node uuids
+
+    bit 62 is always set, so they stay clear of the stable_ids of a
+    scatter.
+    """
+    return np.array([int(hashlib.md5(name.encode('utf-8')).hexdigest()[:15],
+                         16) | (1 << 62) for name in names], dtype=np.int64)
+
+
+def instance_ids(backend, nodes):
+    """stable id of every node, whatever the selection order
+
+    an instance of a scatter gets the id stored for it on its group, the
+    one it is named after. any other node gets an id hashed from its uuid.
+    """
+    ids = np.zeros(len(nodes), dtype=np.int64)
+    found = np.zeros(len(nodes), dtype=bool)
+    by_group = {}
+    for index, node in enumerate(nodes):
+        by_group.setdefault(node.rpartition('|')[0], []).append(index)
+    for group, indices in by_group.items():
+        stored = stored_scatter(backend, group) if group else None
+        if stored is None:
+            continue
+        lookup = dict(zip(stored[2], stored[0].tolist()))
+        for index in indices:
+            if nodes[index] in lookup:
+                ids[index] = lookup[nodes[index]]
+                found[index] = True
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        ids[missing] = hashed_ids(backend.uuids([nodes[index]
+                                                 for index in missing]))
+    return ids
+
+
+def vertex_source(slot, vert_ids, points, normals=None):
+    """plain arrays for scattering on vertices, safe to use off thread
+
+    points and normals hold every vertex of the target mesh.
+    """
+    vert_ids = np.asarray(vert_ids, dtype=np.int64)
+    return {'slot': slot, 'ids': vert_ids, 'count': len(vert_ids),
+            'points': points[vert_ids],
+            'normals': None if normals is None else normals[vert_ids]}
+
+
+def surface_source(sampler, slot, density, filters=None):
+    """a sampler plus point count for scattering over a surface
+
+    filters are filter_mask keyword arguments every sampled point has to
+    pass, so they cut exactly across the triangles.
+    """
+    return {'slot': slot, 'sampler': sampler,
+            'count': sampler.count_for_density(density),
+            'filters': filters or None}
+
+
+def source_matrices(source, start, stop, face_normal=False, seed=0):
+    """ids and matrices of the instances start to stop of one source"""
+    if 'sampler' in source:
+        local_ids = np.arange(start, stop, dtype=np.int64)
+        ids = stable_ids(source['slot'], local_ids)
+        positions, normals, _ = source['sampler'].sample_ids(ids, seed)
+        if source.get('filters'):
+            keep = filter_mask(positions, normals, **source['filters'])
+            ids, positions, normals = ids[keep], positions[keep], \
+                normals[keep]
+    else:
+        ids = stable_ids(source['slot'], source['ids'][start:stop])
+        positions = source['points'][start:stop]
+        if face_normal:
+            normals = source['normals'][start:stop]
+    if face_normal:
+        return ids, frames_from_normals(positions, normals)
+    return ids, translation_matrices(positions)
+
+
+def instance_radii(matrices, radius):
+    """radius scaled by the largest axis scale of every matrix"""
+    return radius * np.sqrt(np.einsum('nij,nij->ni', matrices[:, :3, :3],
+                                      matrices[:, :3, :3])).max(axis=1)
+
+
+def pick_prototypes(seed, ids, proto_weights=None):
+    """int32 prototype id of every instance, 0 with a single prototype"""
+    if proto_weights is None:
+        return np.zeros(len(ids), dtype=np.int32)
+    return scatter_random.pick_weighted(seed, ids, proto_weights)
+
+
+def iter_batches(sources, face_normal=False, seed=0, min_distance=0.0,
+                 batch_size=1000, overlap_radius=0.0, proto_weights=None):
+    """yields (ids, proto_ids, matrices, total) batches of batch_size
+
+    only touches numpy, so it can run on a worker thread or process.
+    every instance gets a prototype drawn by proto_weights. overlap_radius
+    is one radius, or one per prototype. min distance thinning and
+    overlap rejection need every candidate first, batching then happens
+    on the thinned result.
+    """
+    total = sum(source['count'] for source in sources)
+    radii = np.asarray(overlap_radius, dtype=np.float64)
+    if min_distance > 0.0 or radii.max() > 0.0:
+        ids, proto_ids, matrices = compute_scatter(sources, face_normal,
+                                                   seed,
+                                                   proto_weights=proto_weights)
+        if min_distance > 0.0:
+            keep = scatter_sampling.poisson_disk(matrices[:, 3, :3],
+                                                 min_distance)
+            ids, proto_ids, matrices = ids[keep], proto_ids[keep], \
+                matrices[keep]
+        if radii.max() > 0.0:
+            keep = scatter_sampling.reject_overlaps(
+                matrices[:, 3, :3], instance_radii(
+                    matrices, radii[proto_ids] if radii.ndim else radii))
+            ids, proto_ids, matrices = ids[keep], proto_ids[keep], \
+                matrices[keep]
+        for start in range(0, len(ids), batch_size):
+            stop = start + batch_size
+            yield (ids[start:stop], proto_ids[start:stop],
+                   matrices[start:stop], len(ids))
+        return
+    for source in sources:
+        for start in range(0, source['count'], batch_size):
+            stop = min(start + batch_size, source['count'])
+            ids, matrices = source_matrices(source, start, stop,
+                                            face_normal, seed)
+            yield (ids, pick_prototypes(seed, ids, proto_weights), matrices,
+                   total)
+
+
+def compute_scatter(sources, face_normal=False, seed=0, min_distance=0.0,
+                    overlap_radius=0.0, proto_weights=None):
+    """ids, prototype ids and matrices of every instance in one go"""
+    batches = list(iter_batches(sources, face_normal, seed, min_distance,
+                                batch_size=max([source['count']
+                                                for source in sources] +
+                                               [1]),
+                                overlap_radius=overlap_radius,
+                                proto_weights=proto_weights))
+    return (np.concatenate([batch[0] for batch in batches] or
+                           [np.zeros(0, dtype=np.int64)]),
+            np.concatenate([batch[1] for batch in batches] or
+                           [np.zeros(0, dtype=np.int32)]),
+            stack_matrices([batch[2] for batch in batches]))
+
+
+def matrices_to_trs(matrices):
+    """splits (N, 4, 4) matrices into translate, xyz euler degrees, scale"""
+    matrices = np.asarray(matrices, dtype=np.float64)
+    translations = matrices[:, 3, :3].copy()
+    scales = np.sqrt(np.einsum('nij,nij->ni', matrices[:, :3, :3],
+                               matrices[:, :3, :3]))
+    rot = matrices[:, :3, :3] / np.maximum(scales, 1e-12)[:, :, None]
+
+    cos_y = np.hypot(rot[:, 0, 0], rot[:, 0, 1])
+    gimbal = cos_y < 1e-6
+    rx = np.where(gimbal, np.arctan2(-rot[:, 2, 1], rot[:, 1, 1]),
+                  np.arctan2(rot[:, 1, 2], rot[:, 2, 2]))
+    ry = np.arctan2(-rot[:, 0, 2], cos_y)
+    rz = np.where(gimbal, 0.0, np.arctan2(rot[:, 0, 1], rot[:, 0, 0]))
+    rotations = np.degrees(np.stack([rx, ry, rz], axis=1))
+    return translations, rotations, scales
+
+
+def _fill_rotations(out, rotations):
+    """writes xyz euler rotations in degrees into the (N, 3, 3) out"""
+    rx, ry, rz = np.radians(np.asarray(rotations, dtype=np.float64)).T
+    cx, sx = np.cos(rx), np.sin(rx)
+    cy, sy = np.cos(ry), np.sin(ry)
+    cz, sz = np.cos(rz), np.sin(rz)
+    out[:, 0, 0] = cy * cz
+    out[:, 0, 1] = cy * sz
+    out[:, 0, 2] = -sy
+    out[:, 1, 0] = sx * sy * cz - cx * sz
+    out[:, 1, 1] = sx * sy * sz + cx * cz
+    out[:, 1, 2] = sx * cy
+    out[:, 2, 0] = cx * sy * cz + sx * sz
+    out[:, 2, 1] = cx * sy * sz - sx * cz
+    out[:, 2, 2] = cx * cy
+    return out
+
+
+def trs_to_matrices(translations, rotations, scales):
+    """inverse of matrices_to_trs for the xyz rotate order"""
+    matrices = np.zeros((len(rotations), 4, 4))
+    _fill_rotations(matrices[:, :3, :3], rotations)
+    matrices[:, :3, :3] *= np.asarray(scales, dtype=np.float64)[:, :, None]
+    matrices[:, 3, :3] = translations
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def build_transforms(backend, obj, matrices, translate_only=False):
+    """one instance transform per matrix
+
+    translate_only keeps the rotation and scale the instance inherits from
+    obj, matching the face up behaviour.
+    """
+    nodes = backend.create_instances(obj, len(matrices))
+    if translate_only:
+        backend.set_translations(nodes, matrices[:, 3, :3])
+    else:
+        backend.set_matrices(nodes, matrices)
+    return nodes
+
+
+def build_prototypes(backend, prototypes, proto_ids, matrices,
+                     translate_only=False):
+    """instance transforms for several prototypes, one batch per prototype
+
+    returns the nodes and the instance index of every node, nodes come
+    out grouped by prototype.
+    """
+    nodes = []
+    order = []
+    for proto_id, prototype in enumerate(prototypes):
+        indices = np.nonzero(proto_ids == proto_id)[0]
+        if len(indices):
+            nodes.extend(build_transforms(backend, prototype,
+                                          matrices[indices], translate_only))
+            order.append(indices)
+    return nodes, np.concatenate(order or [np.zeros(0, dtype=np.int64)])
+
+
+def group_instances(backend, nodes, group, ids, prefix='group_inst_obj'):
+    """moves the tracked nodes under group and names them by instance id"""
+    nodes = backend.parent(nodes, group)
+    return backend.rename(nodes, [prefix + str(inst_id)
+                                  for inst_id in np.asarray(ids).tolist()])
+
+
+def build_instancer(backend, obj, matrices, proto_ids=None):
+    """a single particle instancer holding every matrix
+
+    obj is one prototype, or a list of them picked by proto_ids.
+    """
+    translations, rotations, scales = matrices_to_trs(matrices)
+    return backend.create_instancer(obj, translations, rotations, scales,
+                                    proto_ids)
+
+
+def spatial_chunks(positions, sizes, max_size):
+    """index arrays of nearby instances whose sizes sum to max_size or less
+
+    the instances are split at the median of their longer xz extent until
+    every part fits. a single instance over max_size gets its own chunk.
+    """
+    parts = [np.arange(len(positions))]
+    chunks = []
+    while parts:
+        indices = parts.pop()
+        if len(indices) < 2 or sizes[indices].sum() <= max_size:
+            if len(indices):
+                chunks.append(indices)
+            continue
+        span = np.ptp(positions[indices][:, [0, 2]], axis=0)
+        axis = 0 if span[0] >= span[1] else 2
+        half = len(indices) // 2
+        order = np.argpartition(positions[indices, axis], half)
+        parts.extend([indices[order[:half]], indices[order[half:]]])
+    return chunks
+
+
+def merge_instances(geometries, proto_ids, matrices):
+    """one merged mesh of every instance in a single matmul per prototype
+
+    geometries holds (points, counts, connects, uvs) per prototype like
+    mesh_geometry returns, matrices place the object space points.
+    returns points, face counts, face vertices and uvs of the merge.
+    """
+    merged = [[] for _ in range(7)]
+    vertex_offset = 0
+    uv_offset = 0
+    for proto_id, (points, counts, connects, uvs) in enumerate(geometries):
+        placed = matrices[proto_ids == proto_id]
+        count = len(placed)
+        if not count:
+            continue
+        local = np.column_stack([points, np.ones(len(points))])
+        merged[0].append(np.matmul(local, placed)[:, :, :3]
+                         .reshape(-1, 3))
+        merged[1].append(np.tile(counts, count))
+        steps = np.arange(count)[:, None]
+        merged[2].append((connects + vertex_offset +
+                          steps * len(points)).ravel())
+        merged[3].append(np.tile(uvs[0], count))
+        merged[4].append(np.tile(uvs[1], count))
+        merged[5].append(np.tile(uvs[2], count))
+        merged[6].append((uvs[3] + uv_offset + steps * len(uvs[0]))
+                         .ravel())
+        vertex_offset += count * len(points)
+        uv_offset += count * len(uvs[0])
+    if not merged[0]:
+        return (np.zeros((0, 3)), np.zeros(0, dtype=np.int32),
+                np.zeros(0, dtype=np.int32),
+                (np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int32),
+                 np.zeros(0, dtype=np.int32)))
+    arrays = [np.concatenate(parts) for parts in merged]
+    return arrays[0], arrays[1], arrays[2], tuple(arrays[3:])
+
+
+def placed_matrices(backend, prototypes, proto_ids, matrices):
+    """world matrices of the prototypes moved to the matrix translations
+
+    what a translate_only instance ends up with.
+    """
+    placed = np.array([backend.world_matrix(prototype)
+                       for prototype in prototypes])[proto_ids]
+    placed[:, 3, :3] = matrices[:, 3, :3]
+    return placed
+
+
+def bake_meshes(backend, prototypes, proto_ids, matrices,
+                translate_only=False, max_vertices=65535,
+                name='scatter_bake'):
+    """merges every instance into meshes of at most max_vertices each
+
+    every prototype is read once. translate_only keeps the rotation and
+    scale of the prototype like build_transforms does. returns the
+    chunk meshes, nearby instances share a chunk.
+    """
+    geometries = [backend.mesh_geometry(prototype)
+                  for prototype in prototypes]
+    if translate_only:
+        matrices = placed_matrices(backend, prototypes, proto_ids, matrices)
+    sizes = np.array([len(geometry[0]) for geometry in geometries])
+    nodes = []
+    for indices in spatial_chunks(matrices[:, 3, :3], sizes[proto_ids],
+                                  max_vertices):
+        points, counts, connects, uvs = merge_instances(
+            geometries, proto_ids[indices], matrices[indices])
+        nodes.append(backend.create_mesh(points, counts, connects,
+                                         name + str(len(nodes) + 1), uvs))
+    return nodes
+
+
+def rotation_matrices(rotations):
+    """(N, 3, 3) matrices of xyz euler rotations in degrees"""
+    return _fill_rotations(np.empty((len(rotations), 3, 3)), rotations)
+
+
+def compose_rotations(rotations, deltas):
+    """euler rotations after rotating each by deltas in object space
+
+    both are xyz rotate order degrees, the maya default.
+    """
+    count = len(rotations)
+    matrices = np.zeros((count, 4, 4))
+    matrices[:, :3, :3] = np.matmul(rotation_matrices(deltas),
+                                    rotation_matrices(rotations))
+    matrices[:, 3, 3] = 1.0
+    return matrices_to_trs(matrices)[1]
+
+
+def offset_along_local_y(translations, rotations, heights):
+    """translations moved by heights along each object's own y axis"""
+    axis = rotation_matrices(rotations)[:, 1, :]
+    return translations + axis * np.asarray(heights)[:, None]
+
+
+def instance_keys(ids, protos):
+    """one comparable key per (id, prototype) pair
+
+    the pairs are viewed as 16 byte voids, so np.intersect1d and np.isin
+    match both columns without folding them into one number.
+    """
+    pairs = np.column_stack([np.asarray(ids, dtype=np.int64),
+                             np.asarray(protos, dtype=np.int64)])
+    return np.ascontiguousarray(pairs).view(np.dtype((np.void, 16))).ravel()
+
+
+def diff_instances(old_ids, old_matrices, new_ids, new_matrices, tol=1e-6,
+                   old_protos=None, new_protos=None):
+    """what an update from the old to the new scatter has to touch
+
+    returns index arrays: kept (old, new) pairs in old order, the kept
+    ones whose matrix changed (positions into the kept arrays), the old
+    ones to delete and the new ones to create. an instance that switched
+    prototype is deleted and created again.
+    """
+    old_ids = np.asarray(old_ids, dtype=np.int64)
+    new_ids = np.asarray(new_ids, dtype=np.int64)
+    if old_protos is not None and new_protos is not None:
+        # key on the prototype too so a switch reads as a new id
+        old_ids = instance_keys(old_ids, old_protos)
+        new_ids = instance_keys(new_ids, new_protos)
+    _, kept_old, kept_new = np.intersect1d(old_ids, new_ids,
+                                           assume_unique=True,
+                                           return_indices=True)
+    order = np.argsort(kept_old)
+    kept_old, kept_new = kept_old[order], kept_new[order]
+    delta = np.abs(old_matrices[kept_old] - new_matrices[kept_new])
+    changed = np.nonzero(delta.reshape(len(delta), -1).max(axis=1) > tol
+                         if len(delta) else np.zeros(0, dtype=bool))[0]
+    removed = np.nonzero(~np.isin(old_ids, new_ids))[0]
+    added = np.nonzero(~np.isin(new_ids, old_ids))[0]
+    return kept_old, kept_new, changed, removed, added
+
+
+def store_scatter(backend, group, ids, matrices, proto_ids=None,
+                  transforms=True):
+    """remembers ids, matrices and prototype ids of a scatter on its group
+
+    transforms tells whether the group holds one transform per id, rather
+    than an instancer or baked meshes.
+    """
+    if proto_ids is None:
+        proto_ids = np.zeros(len(ids), dtype=np.int32)
+    backend.set_array_attr(group, 'scatterIds', ids)
+    backend.set_array_attr(group, 'scatterMatrices', matrices)
+    backend.set_array_attr(group, 'scatterProtoIds', proto_ids)
+    backend.set_array_attr(group, 'scatterTransforms', [float(transforms)])
+
+
+def stored_arrays(backend, group):
+    """ids, matrices and prototype ids stored on group, whatever its output
+
+    None if group does not hold a stored scatter.
+    """
+    ids = backend.get_array_attr(group, 'scatterIds')
+    matrices = backend.get_array_attr(group, 'scatterMatrices')
+    proto_ids = backend.get_array_attr(group, 'scatterProtoIds')
+    if ids is None or matrices is None or len(matrices) != 16 * len(ids):
+        return None
+    if proto_ids is None or len(proto_ids) != len(ids):
+        proto_ids = np.zeros(len(ids))
+    return (ids.astype(np.int64), matrices.reshape(-1, 4, 4),
+            proto_ids.astype(np.int32))
+
+
+def stored_scatter(backend, group):
+    """ids, matrices, nodes and prototype ids stored on group
+
+    None if they do not match the transforms under group.
+    """
+    transforms = backend.get_array_attr(group, 'scatterTransforms')
+    if transforms is not None and not transforms.any():
+        return None
+    stored = stored_arrays(backend, group)
+    if stored is None:
+        return None
+    ids, matrices, proto_ids = stored
+    nodes = backend.children(group)
+    if len(ids) != len(nodes):
+        return None
+    return ids, matrices, nodes, proto_ids
+
+
+def update_transforms(backend, obj, group, ids, matrices,
+                      translate_only=False, proto_ids=None):
+    """updates the scatter under group in place to the new ids/matrices
+
+    obj is one prototype, or a list of them picked by proto_ids. only
+    changed matrices are written, and only the difference in instances
+    is created or deleted. returns None when the group does not hold a
+    scatter that can be updated.
+    """
+    stored = stored_scatter(backend, group)
+    if stored is None:
+        return None
+    prototypes = obj if isinstance(obj, list) else [obj]
+    if proto_ids is None:
+        proto_ids = np.zeros(len(ids), dtype=np.int32)
+    old_ids, old_matrices, nodes, old_protos = stored
+    kept_old, kept_new, changed, removed, added = diff_instances(
+        old_ids, old_matrices, ids, matrices, old_protos=old_protos,
+        new_protos=proto_ids)
+
+    backend.delete([nodes[index] for index in removed])
+    kept_nodes = [nodes[index] for index in kept_old]
+    changed_nodes = [kept_nodes[index] for index in changed]
+    changed_matrices = matrices[kept_new[changed]]
+    if translate_only:
+        backend.set_translations(changed_nodes, changed_matrices[:, 3, :3])
+    else:
+        backend.set_matrices(changed_nodes, changed_matrices)
+    new_nodes, created = build_prototypes(backend, prototypes,
+                                          proto_ids[added], matrices[added],
+                                          translate_only)
+    added = added[created]
+    new_nodes = group_instances(backend, new_nodes, group, ids[added])
+
+    order = np.concatenate([kept_new, added])
+    store_scatter(backend, group, ids[order], matrices[order],
+                  proto_ids[order])
+    return kept_nodes + new_nodes
+
+
+def jitter_matrices(matrices, rotations, scales, heights):
+    """applies rotation, scale and height jitter in each instance's space
+
+    scale and rotation happen in object space before the placement, the
+    height moves along the placed instance's own y axis.
+    """
+    local = rotation_matrices(rotations)
+    local *= np.asarray(scales, dtype=np.float64)[:, :, None]
+    jittered = np.array(matrices, dtype=np.float64, copy=True)
+    jittered[:, :3, :3] = np.matmul(local, matrices[:, :3, :3])
+    jittered[:, 3, :3] += height_axes(matrices) * np.asarray(heights)[:, None]
+    return jittered
+
+
+def jitter_axes(matrices, rotations):
+    """(N, 2, 3) x and y axes of the matrices after the rotation jitter
+
+    the scale jitter only scales them, so they can be kept while the
+    scale and height ranges change.
+    """
+    return np.matmul(rotation_matrices(rotations)[:, :2], matrices[:, :3, :3])
+
+
+def height_axes(matrices):
+    """unit y axis of every matrix, the height jitter moves along it"""
+    return _normalize(matrices[:, 1, :3])[0]
+
+
+def tick_points(origins, axes, lengths=1.0):
+    """(3N, 3) corners of a tick at every origin along its x and y axes
+
+    axes is (N, 2, 3). a tick of length 0 collapses into its origin.
+    """
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=np.float64),
+                              (len(origins),))[:, None]
+    points = np.empty((len(origins), 3, 3))
+    points[:, 0] = origins
+    points[:, 1] = origins + axes[:, 1] * lengths
+    points[:, 2] = origins + axes[:, 0] * (0.25 * lengths)
+    return points.reshape(-1, 3)
+
+
+def preview_ticks(matrices, lengths=1.0):
+    """points, face counts and face vertices of one tick per matrix
+
+    a tick is a triangle from the instance position up its y axis and a
+    quarter of the way along its x axis, so it shows placement, rotation
+    and scale. lengths is one length or one per matrix.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    return (tick_points(matrices[:, 3, :3], matrices[:, :2, :3], lengths),) \
+        + tick_faces(len(matrices))
+
+
+def tick_faces(count):
+    """face counts and face vertices of count ticks from tick_points"""
+    return (np.full(count, 3, dtype=np.int32),
+            np.arange(3 * count, dtype=np.int32))
+
+
+def save_target(path, points, normals, triangles, tri_faces):
+    """writes target geometry for scatter jobs that run without maya"""
+    np.savez(path, points=points, normals=normals, triangles=triangles,
+             tri_faces=tri_faces)
+
+
+def load_target(path):
+    """points, normals, triangles and triangle face ids of a saved target"""
+    data = np.load(path)
+    return (data['points'], data['normals'], data['triangles'],
+            data['tri_faces'])
@@ -0,0 +1,97 @@
+"""binary scatter cache files
+
+a fixed little endian header, the prototype names as a json blob and then
+three contiguous arrays, each starting on a 64 byte boundary:
+
+    matrices       float32 (N, 4, 4)
+    prototype ids  int32   (N,)
+    instance ids   uint64  (N,)
+
+load maps the arrays with numpy.memmap, nothing is read until used.
+"""
+import json
+import struct
+
+import numpy as np
+
+
+MAGIC = b'SCTC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQQQQ')
+ALIGN = 64
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(count, names_size):
+    """byte offsets of the name blob and the three arrays"""
+    names_offset = HEADER.size
+    matrices_offset = _align(names_offset + names_size)
+    proto_offset = _align(matrices_offset + count * 64)
+    ids_offset = _align(proto_offset + count * 4)
+    return names_offset, matrices_offset, proto_offset, ids_offset
+
+
+def save(path, matrices, proto_ids, ids, prototypes):
+    """writes a scatter cache file"""
+    matrices = np.ascontiguousarray(matrices, dtype='<f4').reshape(-1, 4, 4)
+    proto_ids = np.ascontiguousarray(proto_ids, dtype='<i4')
+    ids = np.ascontiguousarray(ids, dtype='<u8')
+    names = json.dumps(list(prototypes)).encode('utf-8')
+    count = len(matrices)
+    if len(proto_ids) != count or len(ids) != count:
+        raise ValueError('matrices, prototype ids and ids differ in length')
+
+    offsets = _layout(count, len(names))
+    with open(path, 'wb') as cache_file:
+        cache_file.write(HEADER.pack(MAGIC, VERSION, 0, count, len(names),
+                                     offsets[1], offsets[2], offsets[3]))
+        cache_file.write(names)
+        for offset, array in zip(offsets[1:], (matrices, proto_ids, ids)):
+            cache_file.write(b'\0' * (offset - cache_file.tell()))
+            cache_file.write(array.tobytes())
+
+
+class ScatterCache(object):
+    """a memory mapped scatter cache file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as cache_file:
+            header = HEADER.unpack(cache_file.read(HEADER.size))
+            magic, version, _, count, names_size = header[:5]
+            if magic != MAGIC:
+                raise ValueError('%s is not a scatter cache' % path)
+            if version > VERSION:
+                raise ValueError('%s has unsupported version %d'
+                                 % (path, version))
+            self.prototypes = json.loads(
+                cache_file.read(names_size).decode('utf-8'))
+        matrices_offset, proto_offset, ids_offset = header[5:]
+        self.path = path
+        self.count = count
+        self.matrices = self._map('<f4', matrices_offset, (count, 4, 4))
+        self.proto_ids = self._map('<i4', proto_offset, (count,))
+        self.ids = self._map('<u8', ids_offset, (count,))
+
+    def _map(self, dtype, offset, shape):
+        if not self.count:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset,
+                         shape=shape)
+
+    def __len__(self):
+        return self.count
+
+    def iter_chunks(self, size=10000):
+        """yields (ids, proto_ids, float64 matrices) chunks of at most size"""
+        for start in range(0, self.count, size):
+            stop = start + size
+            yield (self.ids[start:stop].astype(np.int64),
+                   np.asarray(self.proto_ids[start:stop]),
+                   self.matrices[start:stop].astype(np.float64))
+
+
+def load(path):
+    return ScatterCache(path)
@@ -0,0 +1,148 @@
+"""timing spans and call counters for the scatter phases
+
+a disabled Profiler hands out one shared do nothing span, so leaving the
+span calls in place costs a method call per phase.
+"""
+import collections
+import json
+import os
+import threading
+import timeit
+
+clock = timeit.default_timer
+
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.spans.append(
+            (self.name, self.start, clock() - self.start,
+             threading.current_thread().ident, self.args))
+        return False
+
+
+class Profiler(object):
+    """collects (name, start, seconds, thread, args) spans and counters"""
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.spans = []
+        self.counters = collections.Counter()
+        self.origin = clock()
+
+    def span(self, name, **args):
+        """context manager timing one phase, no-op while disabled"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def iterate(self, name, iterable):
+        """iterable with the work behind every item timed as a span"""
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iter(iterable))
+
+    def _iterate(self, name, iterator):
+        while True:
+            with self.span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def summary(self):
+        """{span name: (calls, total seconds)} over every recorded span"""
+        totals = {}
+        for name, _, seconds, _, _ in self.spans:
+            calls, total = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, total + seconds)
+        return totals
+
+    def report(self):
+        """summary and counters as text lines, slowest spans first"""
+        totals = self.summary()
+        lines = ['%-36s %8d %10.4fs' % (name, calls, total)
+                 for name, (calls, total) in sorted(
+                     totals.items(), key=lambda item: -item[1][1])]
+        lines.extend('%-36s %8d' % (name, amount)
+                     for name, amount in sorted(self.counters.items()))
+        return lines
+
+    def write_log(self, path):
+        with open(path, 'w') as log_file:
+            log_file.write('\n'.join(self.report()) + '\n')
+
+    def write_chrome_trace(self, path):
+        """writes the spans as chrome://tracing complete events"""
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': thread,
+                   'ts': (start - self.origin) * 1e6, 'dur': seconds * 1e6,
+                   'args': args}
+                  for name, start, seconds, thread, args in self.spans]
+        if self.counters:
+            events.append({'name': 'calls', 'ph': 'C', 'pid': pid,
+                           'tid': 0, 'ts': (clock() - self.origin) * 1e6,
+                           'args': dict(self.counters)})
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': events}, trace_file)
+
+
+class ProfiledProxy(object):
+    """counts every method call made through it as prefix + name
+
+    with spans set every call is timed as well.
+    """
+
+    def __init__(self, target, profiler, prefix, spans=False):
+        self._target = target
+        self._profiler = profiler
+        self._prefix = prefix
+        self._spans = spans
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        profiler = self._profiler
+        key = self._prefix + name
+
+        if self._spans:
+            def call(*args, **kwargs):
+                profiler.count(key)
+                with profiler.span(key):
+                    return attr(*args, **kwargs)
+        else:
+            def call(*args, **kwargs):
+                profiler.count(key)
+                return attr(*args, **kwargs)
+        setattr(self, name, call)
+        return call
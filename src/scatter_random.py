@@ -0,0 +1,104 @@
+import numpy as np
+
+
+ROT_X, ROT_Y, ROT_Z, SCL_X, SCL_Y, SCL_Z, HEIGHT = range(7)
+DENSITY, SURFACE_TRI, SURFACE_U, SURFACE_V, SURFACE_ALIAS = range(7, 12)
+PROTOTYPE = 12
+PROJECT_X, PROJECT_Z = 13, 14
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MUL_A = np.uint64(0xBF58476D1CE4E5B9)
+_MUL_B = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(values):
+    """splitmix64 finalizer over a uint64 array"""
+    values = (values ^ (values >> np.uint64(30))) * _MUL_A
+    values = (values ^ (values >> np.uint64(27))) * _MUL_B
+    return values ^ (values >> np.uint64(31))
+
+
+def uniform(seed, ids, channel, low=0.0, high=1.0):
+    """one uniform value per id that only depends on (seed, id, channel)
+
+    counter based instead of a stateful generator, so any subset of ids
+    can be generated on its own, in any order or process, and still match.
+    """
+    ids = np.asarray(ids).astype(np.uint64)
+    key = _mix(np.array([seed & 0xFFFFFFFFFFFFFFFF, channel],
+                        dtype=np.uint64) * _GOLDEN)
+    bits = _mix(_mix(ids * _GOLDEN ^ key[0]) ^ key[1])
+    unit = (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+    return low + unit * (high - low)
+
+
+def uniform3(seed, ids, first_channel, low, high):
+    """(N, 3) uniform values with per axis ranges"""
+    values = np.empty((len(ids), 3))
+    for axis in range(3):
+        values[:, axis] = uniform(seed, ids, first_channel + axis,
+                                  low[axis], high[axis])
+    return values
+
+
+def tile_seed(seed, tile):
+    """seed of one (x, z) tile, only depends on seed and the tile"""
+    values = np.array([seed & 0xFFFFFFFFFFFFFFFF], dtype=np.uint64)
+    for coordinate in tile:
+        values = _mix(values * _GOLDEN ^
+                      np.array(coordinate, dtype=np.int64).astype(np.uint64))
+    return int(values[0] >> np.uint64(1))
+
+
+def jitter_units(seed, ids):
+    """(N, 7) unit draws of the ROT_X to HEIGHT channels for ids
+
+    they only depend on seed and ids, so they can be kept while the jitter
+    ranges change.
+    """
+    units = np.empty((len(ids), HEIGHT + 1))
+    for channel in range(HEIGHT + 1):
+        units[:, channel] = uniform(seed, ids, channel)
+    return units
+
+
+def scale_jitter(units, rot_range, scl_range, height_range):
+    """rotation (N, 3), scale (N, 3) and height (N,) jitter of unit draws
+
+    every range is a (min, max) pair, per axis triples for rotation and
+    scale.
+    """
+    low = np.concatenate([rot_range[0], scl_range[0], height_range[:1]])
+    high = np.concatenate([rot_range[1], scl_range[1], height_range[1:]])
+    values = low + units * (high - low)
+    return values[:, ROT_X:ROT_Z + 1], values[:, SCL_X:SCL_Z + 1], \
+        values[:, HEIGHT]
+
+
+def jitter(seed, ids, rot_range, scl_range, height_range):
+    """rotation (N, 3), scale (N, 3) and height (N,) jitter for ids
+
+    every range is a (min, max) pair, per axis triples for rotation and
+    scale.
+    """
+    return scale_jitter(jitter_units(seed, ids), rot_range, scl_range,
+                        height_range)
+
+
+def keep_fraction(seed, ids, fraction):
+    """mask keeping roughly fraction of ids
+
+    a higher fraction keeps a superset of the ids a lower one kept, so
+    small density changes only add or remove a few instances.
+    """
+    return uniform(seed, ids, DENSITY) < fraction
+
+
+def pick_weighted(seed, ids, weights):
+    """(N,) int32 index into weights per id, drawn in proportion to them"""
+    cum_weights = np.cumsum(np.asarray(weights, dtype=np.float64))
+    if len(cum_weights) < 2 or cum_weights[-1] <= 0.0:
+        return np.zeros(len(ids), dtype=np.int32)
+    targets = uniform(seed, ids, PROTOTYPE, 0.0, cum_weights[-1])
+    return np.minimum(np.searchsorted(cum_weights, targets, side='right'),
+                      len(cum_weights) - 1).astype(np.int32)
@@ -0,0 +1,238 @@
+import itertools
+
+import numpy as np
+
+import scatter_random
+
+
+def triangle_areas(points, triangles):
+    """area of every (T, 3) triangle"""
+    corners = points[triangles]
+    cross = np.cross(corners[:, 1] - corners[:, 0],
+                     corners[:, 2] - corners[:, 0])
+    return 0.5 * np.sqrt(np.einsum('ij,ij->i', cross, cross))
+
+
+class AliasTable(object):
+    """O(1) weighted draws over a weight array (Vose's alias method)
+
+    column k keeps itself with probability prob[k] and falls through to
+    alias[k] otherwise, so a draw is one lookup and one comparison.
+
+    the table is built without a python loop. the large columns donate
+    in order: each one fills the small columns until its excess runs out,
+    then the next large column fills its own shortfall and carries on.
+    which large column serves a small one, and where each large column
+    runs out, both come from one searchsorted over the cumulative
+    shortfalls and excesses.
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        count = len(weights)
+        self.total = float(weights.sum())
+        self.prob = np.ones(count)
+        self.alias = np.arange(count, dtype=np.int64)
+        if count == 0 or self.total <= 0.0:
+            return
+        prob = weights * (count / self.total)
+        small = np.nonzero(prob < 1.0)[0]
+        large = np.nonzero(prob >= 1.0)[0]
+        if not len(small) or not len(large):
+            return
+        shortfall = np.cumsum(1.0 - prob[small])
+        excess = np.cumsum(prob[large] - 1.0)
+
+        donor = np.searchsorted(excess, shortfall - (1.0 - prob[small]))
+        # a donor past the last large column only lost to rounding
+        served = donor < len(large)
+        self.prob[small[served]] = prob[small[served]]
+        self.alias[small[served]] = large[donor[served]]
+
+        spent = np.searchsorted(shortfall, excess, side='right')
+        runs_out = np.nonzero(spent[:-1] < len(small))[0]
+        self.prob[large[runs_out]] = np.maximum(
+            1.0 - (shortfall[spent[runs_out]] - excess[runs_out]), 0.0)
+        self.alias[large[runs_out]] = large[runs_out + 1]
+
+    def draw(self, first, second):
+        """indices for two arrays of uniform [0, 1) values"""
+        count = len(self.prob)
+        column = np.minimum((np.asarray(first) * count).astype(np.int64),
+                            count - 1)
+        return np.where(np.asarray(second) < self.prob[column], column,
+                        self.alias[column])
+
+
+class SurfaceSampler(object):
+    """area weighted random points over a triangulated mesh
+
+    the cumulative area table is built once, every drawn point then costs
+    one binary search into it. with per triangle density weights the areas
+    are scaled by them and triangles are drawn from an alias table instead.
+    """
+
+    def __init__(self, points, triangles, normals=None, areas=None,
+                 weights=None):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.normals = normals
+        if areas is None:
+            areas = triangle_areas(self.points, self.triangles)
+        self.alias = None
+        if weights is not None:
+            areas = areas * np.asarray(weights, dtype=np.float64)
+            self.alias = AliasTable(areas)
+        self.areas = areas
+        self.cum_areas = np.cumsum(self.areas)
+        self.total_area = float(self.cum_areas[-1]) if len(self.areas) \
+            else 0.0
+
+    def count_for_density(self, density):
+        """number of points for a density given in points per unit area"""
+        return int(round(density * self.total_area))
+
+    def pick_triangles(self, count, rng):
+        """count triangle ids drawn proportional to area"""
+        if self.alias is not None:
+            return self.alias.draw(rng.random_sample(count),
+                                   rng.random_sample(count))
+        targets = rng.random_sample(count) * self.total_area
+        tri_ids = np.searchsorted(self.cum_areas, targets, side='right')
+        return np.minimum(tri_ids, len(self.areas) - 1)
+
+    def sample(self, count, rng=None):
+        """returns positions, normals and triangle ids of count points"""
+        if rng is None:
+            rng = np.random.RandomState()
+        if count <= 0 or self.total_area <= 0.0:
+            empty = np.zeros((0, 3))
+            return empty, empty.copy(), np.zeros(0, dtype=np.int64)
+        tri_ids = self.pick_triangles(count, rng)
+        root = np.sqrt(rng.random_sample(count))
+        second = rng.random_sample(count)
+        bary = np.stack([1.0 - root, root * (1.0 - second), root * second],
+                        axis=1)
+        return self.interpolate(tri_ids, bary)
+
+    def sample_ids(self, ids, seed):
+        """like sample, but point k only depends on (seed, ids[k])
+
+        growing the id range keeps every earlier point where it was.
+        """
+        if len(ids) == 0 or self.total_area <= 0.0:
+            empty = np.zeros((0, 3))
+            return empty, empty.copy(), np.zeros(0, dtype=np.int64)
+        if self.alias is not None:
+            tri_ids = self.alias.draw(
+                scatter_random.uniform(seed, ids, scatter_random.SURFACE_TRI),
+                scatter_random.uniform(seed, ids,
+                                       scatter_random.SURFACE_ALIAS))
+        else:
+            targets = scatter_random.uniform(
+                seed, ids, scatter_random.SURFACE_TRI, 0.0, self.total_area)
+            tri_ids = np.minimum(np.searchsorted(self.cum_areas, targets,
+                                                 side='right'),
+                                 len(self.areas) - 1)
+        root = np.sqrt(scatter_random.uniform(seed, ids,
+                                              scatter_random.SURFACE_U))
+        second = scatter_random.uniform(seed, ids, scatter_random.SURFACE_V)
+        bary = np.stack([1.0 - root, root * (1.0 - second), root * second],
+                        axis=1)
+        return self.interpolate(tri_ids, bary)
+
+    def interpolate(self, tri_ids, bary):
+        """positions and normals at barycentric coords of the triangles"""
+        corners = self.triangles[tri_ids]
+        positions = np.einsum('ni,nij->nj', bary, self.points[corners])
+        if self.normals is not None:
+            normals = np.einsum('ni,nij->nj', bary, self.normals[corners])
+        else:
+            tri = self.points[corners]
+            normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        length = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+        normals /= np.maximum(length, 1e-12)[:, None]
+        return positions, normals, tri_ids
+
+
+def poisson_disk(positions, radius):
+    """indices of a blue noise subset of positions
+
+    candidates are accepted in order when no accepted point lies within
+    radius. accepted points live in a uniform hash grid with cells of size
+    radius, so every check only looks at the 27 surrounding cells.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if radius <= 0.0 or len(positions) == 0:
+        return np.arange(len(positions))
+    cells = np.floor((positions - positions.min(axis=0)) /
+                     radius).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    # own cell first, it rejects most candidates on its own
+    steps = sorted(itertools.product((-1, 0, 1), repeat=3),
+                   key=lambda step: abs(step[0]) + abs(step[1]) + abs(step[2]))
+    offsets = [(dx * dims[1] + dy) * dims[2] + dz for dx, dy, dz in steps]
+
+    radius_sq = radius * radius
+    coords = positions.tolist()
+    grid = {}
+    accepted = []
+    for index, key in enumerate(keys.tolist()):
+        x, y, z = coords[index]
+        free = True
+        for offset in offsets:
+            for other in grid.get(key + offset, ()):
+                ox, oy, oz = coords[other]
+                if (ox - x) ** 2 + (oy - y) ** 2 + (oz - z) ** 2 < radius_sq:
+                    free = False
+                    break
+            if not free:
+                break
+        if free:
+            grid.setdefault(key, []).append(index)
+            accepted.append(index)
+    return np.asarray(accepted, dtype=np.int64)
+
+
+def reject_overlaps(positions, radii):
+    """indices of the instances kept after dropping overlapping ones
+
+    instances are spheres of the given radii, accepted in order when they
+    do not touch an accepted one. the hash grid uses cells of twice the
+    largest radius, so every check only looks at the 27 surrounding cells.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    if len(positions) == 0 or radii.max() <= 0.0:
+        return np.arange(len(positions))
+    cells = np.floor((positions - positions.min(axis=0)) /
+                     (2.0 * radii.max())).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    steps = sorted(itertools.product((-1, 0, 1), repeat=3),
+                   key=lambda step: abs(step[0]) + abs(step[1]) + abs(step[2]))
+    offsets = [(dx * dims[1] + dy) * dims[2] + dz for dx, dy, dz in steps]
+
+    coords = positions.tolist()
+    sizes = radii.tolist()
+    grid = {}
+    accepted = []
+    for index, key in enumerate(keys.tolist()):
+        x, y, z = coords[index]
+        size = sizes[index]
+        free = True
+        for offset in offsets:
+            for other in grid.get(key + offset, ()):
+                ox, oy, oz = coords[other]
+                reach = size + sizes[other]
+                if (ox - x) ** 2 + (oy - y) ** 2 + (oz - z) ** 2 < \
+                        reach * reach:
+                    free = False
+                    break
+            if not free:
+                break
+        if free:
+            grid.setdefault(key, []).append(index)
+            accepted.append(index)
+    return np.asarray(accepted, dtype=np.int64)
@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+
+import fake_maya
+
+CMDS, API = fake_maya.install()
+
+import scatter  # noqa: E402
+import scatter_engine  # noqa: E402
+
+
+def scatter_tool(count=2500):
+    CMDS.reset()
+    CMDS.add_mesh('ground', *fake_maya.grid_mesh(count))
+    CMDS.add_mesh('proto', *fake_maya.grid_mesh(4))
+    CMDS.select('ground')
+    return scatter.Scatter()
+
+
+def step_until_applied(tool, job):
+    while tool.step_scatter_job(job) is False and not job.done:
+        pass
+
+
+def test_cancelled_scatter_job_stops_before_the_last_batch():
+    tool = scatter_tool()
+    job = tool.start_scatter_job('proto', batch_size=100)
+    step_until_applied(tool, job)
+    job.cancel()
+
+    assert tool.step_scatter_job(job) is True
+    job.thread.join(5.0)
+    assert not job.thread.is_alive()
+    assert 0 < job.done < job.total
+    assert len(job.nodes) == job.done
+    assert len(CMDS.listRelatives(job.output['group'], children=True)) == \
+        job.done
+
+
+def test_profiling_counts_the_tools_own_cmds_calls():
+    tool = scatter_tool(400)
+    tool.set_profiling(True)
+    tool.scatter_obj('proto')
+    counters = tool.profiler.counters
+    tool.set_profiling(False)
+
+    assert counters['cmds.objectType'] == 1
+    assert counters['cmds.group'] >= 1
+    assert counters['cmds.ls'] >= 1
+    assert 'scatter_obj' in tool.profiler.summary()
+    assert tool.cmds is CMDS
+
+
+def test_surface_scatter_keeps_points_inside_the_height_band():
+    tool = scatter_tool()
+    CMDS.meshes['ground'][:, 1] = CMDS.meshes['ground'][:, 0]
+    tool.sample_mode = 'surface'
+    tool.is_height_filter = True
+    tool.min_altitude, tool.max_altitude = 10.5, 20.5
+    ids, _, matrices, _ = tool.sample_matrices(['proto'])
+    heights = matrices[:, 3, 1]
+
+    assert len(ids)
+    assert ((heights >= 10.5) & (heights <= 20.5)).all()
+    # faces straddling the band edges are sampled, not dropped
+    assert heights.min() < 11.0 and heights.max() > 20.0
+
+
+def test_preview_density_change_moves_points_without_a_new_mesh():
+    tool = scatter_tool(900)
+    tool.def_density = 0.9
+    tool.update_preview('proto')
+    node = tool.preview_node
+    ticks = len(CMDS.meshes[node]) // 3
+    tool.def_density = 0.5
+    tool.max_height = 2.0
+    tool.update_preview('proto')
+
+    assert tool.preview_node == node
+    assert CMDS.calls['api.create'] == 1
+    assert CMDS.calls['api.setPoints'] == 1
+    corners = CMDS.meshes[node].reshape(-1, 3, 3)
+    shown = ~(corners == corners[:, :1]).all(axis=(1, 2))
+    assert len(corners) == ticks
+    ids, _, matrices = tool.preview_matrices('proto')
+    assert shown.sum() == len(ids) < ticks
+    radius = tool.backend.bounding_radius('proto')
+    np.testing.assert_allclose(
+        corners[shown].reshape(-1, 3),
+        scatter_engine.preview_ticks(matrices, radius)[0], atol=1e-9)
+
+
+def test_commit_preview_instances_what_the_preview_shows():
+    tool = scatter_tool(400)
+    tool.sample_mode = 'surface'
+    tool.surface_density = 0.5
+    tool.update_preview('proto')
+    ids, _, matrices = tool.preview_matrices('proto')
+    tool.commit_preview('proto')
+    stored_ids, stored_matrices, _ = scatter_engine.stored_arrays(
+        tool.backend, tool.last_group)
+
+    assert tool.preview_node is None
+    np.testing.assert_array_equal(stored_ids, ids)
+    np.testing.assert_allclose(stored_matrices, matrices)
+
+
+@pytest.mark.parametrize('mode', ['surface', 'projection'])
+def test_tiled_ids_stay_unique_across_tiles(mode):
+    tool = scatter_tool(900)
+    tool.sample_mode = mode
+    tool.surface_density = 0.5
+    tool.tile_size = 10.0
+    tool.tile_processes = 1
+    groups = tool.scatter_obj('proto')
+    ids = np.concatenate([
+        scatter_engine.stored_arrays(tool.backend, group)[0]
+        for group in groups])
+
+    assert len(groups) == 9
+    assert len(np.unique(ids)) == len(ids) > 9
+
+
+def test_scatter_undo_and_redo_go_through_the_plugin_command():
+    tool = scatter_tool(400)
+    tool.def_density = 0.5
+    tool.scatter_obj('proto')
+    group = tool.last_group
+    nodes = set(CMDS.nodes)
+    instanced = CMDS.calls['instance']
+
+    assert CMDS.calls['scatterToolOp'] == 1
+    assert len(CMDS.undo_queue) == 1
+    assert CMDS.undo_state
+    CMDS.undo()
+    assert not CMDS.objExists(group)
+    assert set(CMDS.nodes) == {'ground', 'proto'}
+    CMDS.redo()
+    assert set(CMDS.nodes) == nodes
+    # redo restores the deleted nodes instead of scattering again
+    assert CMDS.calls['instance'] == instanced
+    assert CMDS.undo_state
+
+
+def test_randomize_undo_and_redo_replay_one_modifier():
+    tool = scatter_tool(400)
+    tool.scatter_obj('proto')
+    nodes = CMDS.listRelatives(tool.last_group, children=True)
+    CMDS.select(nodes)
+    before = tool.backend.get_vectors(nodes, 'rotate')
+    tool.scatter_rotate_obj()
+    after = tool.backend.get_vectors(nodes, 'rotate')
+    applied = CMDS.calls['api.doIt']
+
+    assert CMDS.calls['scatterToolOp'] == 2
+    assert not np.allclose(before, after)
+    CMDS.undo()
+    np.testing.assert_allclose(tool.backend.get_vectors(nodes, 'rotate'),
+                               before)
+    CMDS.redo()
+    np.testing.assert_allclose(tool.backend.get_vectors(nodes, 'rotate'),
+                               after)
+    # redo replays the modifier the command made, it does not jitter again
+    assert CMDS.calls['api.doIt'] == applied + 1
+    CMDS.undo()
+    CMDS.undo()
+    assert not CMDS.objExists(tool.last_group)
+    assert not CMDS.undo_queue
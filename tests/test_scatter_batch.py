@@ -0,0 +1,137 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import scatter_batch
+import scatter_engine
+import scatter_sampling
+
+
+def grid_target(side=12):
+    """points, normals, triangles and face ids of a flat side x side grid"""
+    u, v = np.meshgrid(np.arange(side), np.arange(side))
+    points = np.stack([u.ravel(), np.zeros(u.size), v.ravel()],
+                      axis=1).astype(np.float64)
+    normals = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+    row, column = np.meshgrid(np.arange(side - 1), np.arange(side - 1),
+                              indexing='ij')
+    corner = (row * side + column).ravel()
+    triangles = np.concatenate([
+        np.stack([corner, corner + side, corner + side + 1], axis=1),
+        np.stack([corner, corner + side + 1, corner + 1], axis=1)])
+    tri_faces = np.tile(np.arange(len(corner)), 2)
+    return points, normals, triangles, tri_faces
+
+
+def make_job(target, output, **settings):
+    job = dict(scatter_batch.JOB_DEFAULTS)
+    job.update({'targets': [target], 'output': output,
+                'prototypes': ['tree', 'bush'], 'weights': [1.0, 3.0],
+                'seed': 7})
+    job.update(settings)
+    return job
+
+
+@pytest.fixture
+def target(tmpdir):
+    path = str(tmpdir.join('ground.npz'))
+    scatter_engine.save_target(path, *grid_target())
+    return path
+
+
+@pytest.mark.parametrize('mode', ['vertex', 'surface'])
+def test_compute_job_is_deterministic(target, tmpdir, mode):
+    job = make_job(target, str(tmpdir.join('out.sctc')), mode=mode,
+                   density=0.5, face_normal=True)
+    ids, proto_ids, matrices = scatter_batch.compute_job(job)
+    again = scatter_batch.compute_job(job)
+
+    assert len(ids) > 0
+    assert len(np.unique(ids)) == len(ids)
+    assert set(proto_ids.tolist()) <= set([0, 1])
+    assert matrices.shape == (len(ids), 4, 4)
+    assert np.isfinite(matrices).all()
+    for first, second in zip((ids, proto_ids, matrices), again):
+        np.testing.assert_array_equal(first, second)
+
+
+def test_compute_job_density(target, tmpdir):
+    vertex = make_job(target, str(tmpdir.join('out.sctc')), density=0.5)
+    ids = scatter_batch.compute_job(vertex)[0]
+    assert 0 < len(ids) < 144
+
+    surface = make_job(target, str(tmpdir.join('out.sctc')),
+                       mode='surface', density=2.0)
+    # the grid covers 11 x 11 units
+    assert len(scatter_batch.compute_job(surface)[0]) == 242
+
+
+def test_run_writes_the_computed_results(target, tmpdir):
+    jobs = [make_job(target, str(tmpdir.join('out', 'job%d.sctc' % seed)),
+                     seed=seed) for seed in range(3)]
+    outputs = scatter_batch.run(jobs, processes=2)
+
+    assert outputs == [job['output'] for job in jobs]
+    for job in jobs:
+        prototypes, ids, proto_ids, matrices = scatter_batch.load_result(
+            job['output'])
+        expected = scatter_batch.compute_job(job)
+        assert prototypes == job['prototypes']
+        np.testing.assert_array_equal(ids, expected[0])
+        np.testing.assert_array_equal(proto_ids, expected[1])
+        # the cache stores float32 matrices
+        np.testing.assert_allclose(matrices, expected[2], rtol=1e-6,
+                                   atol=1e-4)
+
+
+def test_load_jobs_fills_defaults_and_resolves_paths(target, tmpdir):
+    spec = str(tmpdir.join('jobs.json'))
+    with open(spec, 'w') as spec_file:
+        json.dump({'jobs': [{'targets': ['ground.npz'],
+                             'prototypes': ['tree'],
+                             'output': 'out/tree.sctc', 'seed': 3}]},
+                  spec_file)
+    job, = scatter_batch.load_jobs(spec)
+
+    assert job['targets'] == [target]
+    assert job['output'] == os.path.join(str(tmpdir), 'out', 'tree.sctc')
+    assert job['seed'] == 3
+    assert job['mode'] == scatter_batch.JOB_DEFAULTS['mode']
+
+
+def tile_tasks(face_normal):
+    points, normals, triangles, _ = grid_target(20)
+    sampler = scatter_sampling.SurfaceSampler(points, triangles, normals)
+    tasks = []
+    for seed, tile in enumerate([(0, 0), (0, 1), (1, 0), (1, 1)]):
+        vertex = scatter_engine.vertex_source(
+            0, np.arange(seed * 50, seed * 50 + 60), points, normals)
+        surface = scatter_engine.surface_source(sampler, 1, 0.5)
+        tasks.append((tile, seed, [vertex, surface], face_normal, 0.3, 0.0,
+                      [1.0, 2.0]))
+    return tasks
+
+
+@pytest.mark.parametrize('face_normal', [False, True])
+def test_run_tiles_does_not_depend_on_processes(face_normal):
+    tasks = tile_tasks(face_normal)
+    serial = scatter_batch.run_tiles(tasks, processes=1)
+    parallel = scatter_batch.run_tiles(tasks, processes=3)
+
+    assert [result[0] for result in parallel] == \
+        [task[0] for task in tasks]
+    for first, second in zip(serial, parallel):
+        for one, other in zip(first[1:], second[1:]):
+            np.testing.assert_array_equal(one, other)
+
+
+def test_pool_map_runs_here_without_a_pool(monkeypatch):
+    # python 2 inside maya outside windows: no spawn, so no pool
+    monkeypatch.setattr(scatter_batch.sys, 'executable', '/maya/bin/maya')
+    monkeypatch.delattr(scatter_batch.multiprocessing, 'get_context')
+    monkeypatch.setattr(scatter_batch.os, 'name', 'posix')
+
+    assert scatter_batch.worker_pool(2) is None
+    assert scatter_batch.pool_map(abs, [-1, 2, -3], 2) == [1, 2, 3]
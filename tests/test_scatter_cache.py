@@ -0,0 +1,84 @@
+import numpy as np
+
+import fake_maya
+import scatter_cache
+import scatter_engine
+
+
+def block(size):
+    return np.zeros(size, dtype=np.uint8)
+
+
+def test_mesh_cache_evicts_the_least_recently_used_mesh():
+    cache = scatter_cache.MeshCache(max_bytes=300)
+    for key in 'abc':
+        cache.get(key, 1, 'points', lambda: block(100))
+    cache.get('a', 1, 'points', lambda: block(100))
+    cache.get('d', 1, 'points', lambda: block(100))
+
+    assert list(cache._entries) == ['c', 'a', 'd']
+    assert cache.nbytes == 300
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_mesh_cache_keeps_the_mesh_being_built_over_budget():
+    cache = scatter_cache.MeshCache(max_bytes=100)
+    cache.get('a', 1, 'points', lambda: block(80))
+    cache.get('b', 1, 'points', lambda: block(150))
+
+    assert list(cache._entries) == ['b']
+    assert cache.nbytes == 150
+
+
+def test_mesh_cache_accounts_bytes_after_invalidate():
+    cache = scatter_cache.MeshCache()
+    cache.get('a', 1, 'points', lambda: block(100))
+    cache.get('a', 1, 'triangles', lambda: (block(30), block(20)))
+    cache.get('b', 1, 'points', lambda: block(40))
+
+    assert cache.nbytes == 190
+    cache.invalidate('a')
+    assert cache.nbytes == 40
+    cache.invalidate('missing')
+    cache.invalidate()
+    assert cache.nbytes == 0
+    assert not cache._entries
+
+
+def test_mesh_cache_rebuilds_when_the_signature_changes():
+    cache = scatter_cache.MeshCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return block(10 * len(builds))
+
+    first = cache.get('a', 1, 'points', build)
+    assert cache.get('a', 1, 'points', build) is first
+    second = cache.get('a', 2, 'points', build)
+
+    assert second is not first
+    assert len(builds) == 2
+    assert cache.nbytes == 20
+
+
+def test_cached_backend_reads_each_array_once_until_the_mesh_changes():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(100))
+    backend = scatter_cache.CachedBackend(
+        scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds)))
+
+    points = backend.mesh_points('ground')
+    areas = backend.mesh_triangle_areas('ground')
+    assert backend.mesh_points('ground') is points
+    assert backend.mesh_triangle_areas('ground') is areas
+    assert backend.cache.hits >= 2
+    # names outside the cached reads go straight to the wrapped backend
+    assert backend.vertex_count('ground') == len(points)
+
+    cmds.meshes['ground'] = cmds.meshes['ground'] + [0.0, 1.0, 0.0]
+    moved = backend.mesh_points('ground')
+
+    assert moved is not points
+    np.testing.assert_allclose(moved, points + [0.0, 1.0, 0.0])
+    assert list(backend.cache._entries) == ['uuid-ground']
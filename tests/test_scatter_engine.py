@@ -0,0 +1,404 @@
+import numpy as np
+import pytest
+
+import fake_maya
+import scatter_engine
+import scatter_random
+import scatter_sampling
+
+
+@pytest.mark.parametrize('normal', [(0.0, 1.0, 0.0), (0.0, -1.0, 0.0)])
+def test_frames_from_normals_handles_up_and_down(normal):
+    positions = np.array([[1.0, 2.0, 3.0]])
+    matrix = scatter_engine.frames_from_normals(positions, [normal])[0]
+    rotation = matrix[:3, :3]
+
+    assert np.isfinite(matrix).all()
+    np.testing.assert_allclose(rotation[1], normal)
+    np.testing.assert_allclose(rotation.dot(rotation.T), np.eye(3),
+                               atol=1e-12)
+    np.testing.assert_allclose(matrix[3], [1.0, 2.0, 3.0, 1.0])
+
+
+def test_frames_from_normals_keeps_straight_up_unrotated():
+    matrix = scatter_engine.frames_from_normals(np.zeros((1, 3)),
+                                                [(0.0, 1.0, 0.0)])[0]
+    np.testing.assert_allclose(matrix, np.eye(4), atol=1e-12)
+
+
+def test_frames_from_normals_builds_orthonormal_frames():
+    rng = np.random.RandomState(3)
+    normals = rng.normal(size=(500, 3))
+    rotations = scatter_engine.frames_from_normals(np.zeros((500, 3)),
+                                                   normals)[:, :3, :3]
+
+    np.testing.assert_allclose(
+        rotations[:, 1], normals / np.linalg.norm(normals, axis=1)[:, None])
+    np.testing.assert_allclose(np.matmul(rotations,
+                                         rotations.transpose(0, 2, 1)),
+                               np.tile(np.eye(3), (500, 1, 1)), atol=1e-9)
+    np.testing.assert_allclose(np.linalg.det(rotations), 1.0)
+
+
+def test_face_up_matrices_read_the_mesh_in_one_query():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(100))
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    matrices = scatter_engine.face_up_matrices(backend, 'ground', [0, 5, 42])
+
+    assert cmds.calls['xform'] == 1
+    np.testing.assert_allclose(matrices[:, 3, :3],
+                               cmds.meshes['ground'][[0, 5, 42]])
+    np.testing.assert_allclose(matrices[:, :3, :3],
+                               np.tile(np.eye(3), (3, 1, 1)))
+
+
+def test_stored_arrays_outlive_non_transform_outputs():
+    cmds = fake_maya.FakeCmds()
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    group = cmds.ls(cmds.group(em=True, n='scatter_grp'), long=True)[0]
+    ids = np.array([3, 9], dtype=np.int64)
+    matrices = np.tile(np.eye(4), (2, 1, 1))
+    scatter_engine.store_scatter(backend, group, ids, matrices, [1, 0],
+                                 transforms=False)
+
+    stored_ids, stored_matrices, proto_ids = \
+        scatter_engine.stored_arrays(backend, group)
+    np.testing.assert_array_equal(stored_ids, ids)
+    np.testing.assert_array_equal(stored_matrices, matrices)
+    np.testing.assert_array_equal(proto_ids, [1, 0])
+    assert scatter_engine.stored_scatter(backend, group) is None
+
+
+def test_diff_instances_tells_every_prototype_apart():
+    matrices = np.tile(np.eye(4), (2, 1, 1))
+    kept_old, kept_new, changed, removed, added = \
+        scatter_engine.diff_instances([1, 3], matrices, [2, 3], matrices,
+                                      old_protos=[256, 7], new_protos=[0, 7])
+
+    # 1 * 256 + 256 == 2 * 256 + 0 if the prototype is folded into the id
+    np.testing.assert_array_equal(kept_old, [1])
+    np.testing.assert_array_equal(kept_new, [1])
+    assert len(changed) == 0
+    np.testing.assert_array_equal(removed, [0])
+    np.testing.assert_array_equal(added, [0])
+
+
+def test_set_mesh_points_writes_every_vertex_in_one_call():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('preview', *fake_maya.grid_mesh(1000))
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    points = np.random.RandomState(5).uniform(-50, 50, (1000, 3))
+    backend.set_mesh_points('preview', points)
+
+    assert cmds.calls['api.setPoints'] == 1
+    np.testing.assert_allclose(cmds.meshes['preview'], points, rtol=1e-6)
+
+
+def test_surface_sampler_over_faces_holds_their_vertices_only():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(400))
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    face_ids = np.arange(0, 40)
+    weights = np.linspace(0.0, 1.0, 400)
+    whole = scatter_engine.surface_sampler(backend, 'ground',
+                                           vert_weights=weights)
+    part = scatter_engine.surface_sampler(backend, 'ground', face_ids,
+                                          weights)
+
+    assert len(part.points) < len(whole.points)
+    assert len(part.normals) == len(part.points)
+    triangles, tri_faces = backend.mesh_triangles('ground')
+    kept = np.isin(tri_faces, face_ids)
+    np.testing.assert_array_equal(part.points[part.triangles],
+                                  whole.points[triangles[kept]])
+    uncompacted = scatter_sampling.SurfaceSampler(
+        whole.points, triangles[kept], whole.normals,
+        backend.mesh_triangle_areas('ground')[kept],
+        weights[triangles[kept]].mean(axis=1))
+    ids = np.arange(100, dtype=np.int64)
+    for got, expected in zip(part.sample_ids(ids, 4),
+                             uncompacted.sample_ids(ids, 4)):
+        np.testing.assert_array_equal(got, expected)
+
+
+def placed_commands(count, translate_only):
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('proto', *fake_maya.grid_mesh(4))
+    cmds.undoInfo(stateWithoutFlush=False)
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    rng = np.random.RandomState(count)
+    matrices = scatter_engine.trs_to_matrices(
+        rng.uniform(-50, 50, (count, 3)), rng.uniform(-180, 180, (count, 3)),
+        rng.uniform(0.5, 2.0, (count, 3)))
+    nodes = scatter_engine.build_transforms(backend, 'proto', matrices,
+                                            translate_only)
+    commands = sum(calls for name, calls in cmds.calls.items()
+                   if not name.startswith('api.'))
+
+    assert len(set(nodes)) == count
+    placed = scatter_engine.trs_to_matrices(
+        backend.get_vectors(nodes, 'translate'),
+        backend.get_vectors(nodes, 'rotate'),
+        backend.get_vectors(nodes, 'scale'))
+    if translate_only:
+        np.testing.assert_allclose(placed[:, 3], matrices[:, 3])
+    else:
+        np.testing.assert_allclose(placed, matrices, atol=1e-9)
+    return commands
+
+
+@pytest.mark.parametrize('translate_only', [False, True])
+def test_placement_commands_do_not_grow_with_the_count(translate_only):
+    small = placed_commands(100, translate_only)
+    large = placed_commands(3200, translate_only)
+
+    # one more instance command per doubling, nothing per node
+    assert large - small <= 5
+    assert large < 20
+
+
+def test_component_ranges_round_trip():
+    ids = np.array([9, 2, 3, 4, 7, 8, 12], dtype=np.int32)
+    components = scatter_engine.component_ranges('ground', 'e', ids)
+
+    assert components == ['ground.e[2:4]', 'ground.e[7:9]',
+                          'ground.e[12:12]']
+    np.testing.assert_array_equal(
+        scatter_engine.range_ids(components, 0), np.unique(ids))
+    np.testing.assert_array_equal(
+        scatter_engine.range_ids(['ground.f[*]'], 4), np.arange(4))
+
+
+class EdgeSelection(scatter_engine.CmdsBackend):
+    """a backend whose selection is the edges of some faces"""
+
+    def __init__(self, cmds, faces):
+        scatter_engine.CmdsBackend.__init__(self, cmds,
+                                            fake_maya.FakeOpenMaya(cmds))
+        self.faces = faces
+
+    def selected_components(self):
+        counts, _ = self.mesh_polygons('ground')
+        starts = np.cumsum(counts) - counts
+        edges = np.concatenate([np.arange(starts[face],
+                                          starts[face] + counts[face])
+                                for face in self.faces])
+        return [('ground', 'edge', edges.astype(np.int32))]
+
+
+def test_edges_resolve_to_the_faces_on_their_sides_in_one_query():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(400))
+    backend = EdgeSelection(cmds, [5, 40, 41])
+    counts, connects = backend.mesh_polygons('ground')
+
+    (mesh, faces), = scatter_engine.resolve_selection(backend, 'face')
+    (_, vertices), = scatter_engine.resolve_selection(backend, 'vertex')
+
+    assert mesh == 'ground'
+    # going through the end vertices would add every neighbouring face
+    np.testing.assert_array_equal(faces, [5, 40, 41])
+    np.testing.assert_array_equal(
+        vertices,
+        scatter_engine.faces_to_vertices(counts, connects, [5, 40, 41]))
+    assert cmds.calls['polyListComponentConversion'] == 2
+
+
+class RecordingBackend(scatter_engine.CmdsBackend):
+    """counts the matrices written through set_matrices"""
+
+    written = 0
+
+    def set_matrices(self, nodes, matrices):
+        self.written += len(nodes)
+        return scatter_engine.CmdsBackend.set_matrices(self, nodes, matrices)
+
+
+def test_density_change_only_touches_the_difference():
+    cmds = fake_maya.FakeCmds()
+    for prototype in ('oak', 'pine'):
+        cmds.add_mesh(prototype, *fake_maya.grid_mesh(4))
+    cmds.undoInfo(stateWithoutFlush=False)
+    backend = RecordingBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    prototypes = ['oak', 'pine']
+    candidates = np.arange(2000, dtype=np.int64)
+    rng = np.random.RandomState(1)
+    candidate_matrices = scatter_engine.trs_to_matrices(
+        rng.uniform(-50, 50, (2000, 3)), rng.uniform(-180, 180, (2000, 3)),
+        rng.uniform(0.5, 2.0, (2000, 3)))
+    candidate_protos = scatter_random.pick_weighted(7, candidates,
+                                                    [1.0, 1.0])
+
+    def scatter(fraction):
+        keep = scatter_random.keep_fraction(7, candidates, fraction)
+        return (candidates[keep], candidate_matrices[keep],
+                candidate_protos[keep])
+
+    ids, matrices, proto_ids = scatter(0.8)
+    nodes, created = scatter_engine.build_prototypes(backend, prototypes,
+                                                     proto_ids, matrices)
+    group = cmds.group(em=True, n='scatter_grp')
+    scatter_engine.group_instances(backend, nodes, group, ids[created])
+    scatter_engine.store_scatter(backend, group, ids[created],
+                                 matrices[created], proto_ids[created])
+
+    for fraction in (0.85, 0.8):
+        before = set(cmds.nodes)
+        backend.written = 0
+        new_ids, new_matrices, new_protos = scatter(fraction)
+        nodes = scatter_engine.update_transforms(
+            backend, prototypes, group, new_ids, new_matrices, False,
+            new_protos)
+        created = set(cmds.nodes) - before
+        deleted = before - set(cmds.nodes)
+
+        assert len(nodes) == len(new_ids)
+        assert len(created) + len(deleted) == abs(len(new_ids) - len(ids))
+        assert len(created) + len(deleted) < 0.1 * len(ids)
+        # only the new instances are placed, kept ones are not rewritten
+        assert backend.written == len(created)
+        stored_ids = scatter_engine.stored_arrays(backend, group)[0]
+        np.testing.assert_array_equal(np.sort(stored_ids), new_ids)
+        ids = new_ids
+
+
+def test_density_weights_follow_the_painted_luminance():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(400))
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    points = backend.mesh_points('ground')
+    colors = np.full((len(points), 4), -1.0)
+    # the right half is painted white, one vertex green
+    colors[points[:, 0] > 10.0] = 1.0
+    colors[0] = [0.0, 1.0, 0.0, 1.0]
+    cmds.colors['ground'] = colors
+    weights = scatter_engine.density_weights(backend, 'ground', 'color')
+
+    np.testing.assert_allclose(weights[0], scatter_engine.LUMA[1])
+    np.testing.assert_array_equal(weights[1:], points[1:, 0] > 10.0)
+
+    sampler = scatter_engine.surface_sampler(backend, 'ground',
+                                             vert_weights=weights)
+    positions = sampler.sample_ids(np.arange(4000), 2)[0]
+    # only triangles with every corner painted are drawn at full rate
+    assert (positions[:, 0] >= 10.0).mean() > 0.95
+
+
+def test_filter_mask_tests_slope_height_and_facing():
+    angles = np.radians([0.0, 30.0, 60.0, 90.0, 180.0])
+    normals = np.stack([np.sin(angles), np.cos(angles),
+                        np.zeros(5)], axis=1)
+    points = np.stack([np.zeros(5), [-5.0, 0.0, 5.0, 10.0, 20.0],
+                       np.zeros(5)], axis=1)
+
+    np.testing.assert_array_equal(
+        scatter_engine.filter_mask(points, normals, slope=(20.0, 70.0)),
+        [False, True, True, False, False])
+    np.testing.assert_array_equal(
+        scatter_engine.filter_mask(points, normals, height=(0.0, 10.0)),
+        [False, True, True, True, False])
+    np.testing.assert_array_equal(
+        scatter_engine.filter_mask(points, normals,
+                                   facing=((2.0, 0.0, 0.0), 45.0)),
+        [False, False, True, True, False])
+    np.testing.assert_array_equal(
+        scatter_engine.filter_mask(points, normals, slope=(0.0, 45.0),
+                                   height=(-1.0, 1.0)),
+        [False, True, False, False, False])
+    assert scatter_engine.filter_mask(points, normals).all()
+
+
+def test_surface_filters_cut_through_the_triangles():
+    plane = scatter_sampling.SurfaceSampler(
+        [[0.0, 0.0, 0.0], [10.0, 10.0, 0.0], [0.0, 0.0, 10.0]],
+        [[0, 2, 1]])
+    band = scatter_engine.surface_source(plane, 0, 5.0,
+                                         {'height': (2.0, 4.0)})
+    ids, matrices = scatter_engine.source_matrices(band, 0, band['count'])
+    heights = matrices[:, 3, 1]
+
+    assert 0 < len(ids) < band['count']
+    assert ((heights >= 2.0) & (heights <= 4.0)).all()
+
+
+def test_project_points_hits_the_closest_selected_face():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('ground', *fake_maya.grid_mesh(121))
+    points, _, counts, connects = fake_maya.grid_mesh(36)
+    points += [2.0, 0.0, 2.0]
+    points[:, 1] = 3.0 + 0.5 * points[:, 0]
+    slope = np.tile([-0.5, 1.0, 0.0], (len(points), 1)) / np.sqrt(1.25)
+    cmds.add_mesh('ramp', points, slope, counts, connects)
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    # the first ramp face, over x and z 2 to 3, is not selected
+    selection = [('ground', np.arange(100)), ('ramp', np.arange(1, 25))]
+    xz = np.array([[1.0, 1.5], [3.5, 4.5], [6.2, 2.8], [2.5, 2.5],
+                   [20.0, 20.0]])
+    weights = [cmds.meshes['ground'][:, 0] / 10.0, None]
+    hit, positions, normals, hit_weights = scatter_engine.project_points(
+        backend, selection, xz, 100.0, 1000.0, weights, batch_size=2)
+    backend.free_intersectors()
+
+    np.testing.assert_array_equal(hit, [0, 1, 2])
+    np.testing.assert_allclose(positions, [[1.0, 0.0, 1.5],
+                                           [3.5, 4.75, 4.5],
+                                           [6.2, 6.1, 2.8]])
+    np.testing.assert_allclose(normals, [[0.0, 1.0, 0.0], slope[0],
+                                         slope[0]])
+    np.testing.assert_allclose(hit_weights, [0.1, 1.0, 1.0])
+    # one grid per mesh, reused by all three batches
+    assert cmds.calls['api.autoUniformGridParams'] == 2
+    assert cmds.calls['api.freeCachedIntersectionAccelerator'] == 2
+
+
+def test_spatial_chunks_fit_the_size_and_cover_every_instance():
+    rng = np.random.RandomState(8)
+    positions = rng.uniform(0, 100, (500, 3))
+    sizes = rng.randint(1, 30, 500)
+    sizes[7] = 250
+    chunks = scatter_engine.spatial_chunks(positions, sizes, 200)
+
+    np.testing.assert_array_equal(np.sort(np.concatenate(chunks)),
+                                  np.arange(500))
+    assert [chunk.tolist() for chunk in chunks
+            if sizes[chunk].sum() > 200] == [[7]]
+    # nearby instances share a chunk, so chunks are far smaller than the
+    # whole square
+    extents = [np.ptp(positions[chunk][:, [0, 2]], axis=0).max()
+               for chunk in chunks if len(chunk) > 1]
+    assert max(extents) < 50.0
+
+
+def test_bake_meshes_merges_placed_instances_into_bounded_chunks():
+    cmds = fake_maya.FakeCmds()
+    cmds.add_mesh('quad', *fake_maya.grid_mesh(4))
+    cmds.add_mesh('patch', *fake_maya.grid_mesh(9))
+    backend = scatter_engine.CmdsBackend(cmds, fake_maya.FakeOpenMaya(cmds))
+    rng = np.random.RandomState(9)
+    proto_ids = rng.randint(0, 2, 300)
+    matrices = scatter_engine.trs_to_matrices(
+        rng.uniform(0, 100, (300, 3)), rng.uniform(0, 360, (300, 3)),
+        rng.uniform(0.5, 2.0, (300, 3)))
+    nodes = scatter_engine.bake_meshes(backend, ['quad', 'patch'],
+                                       proto_ids, matrices, max_vertices=100)
+
+    sizes = np.array([4, 9])[proto_ids]
+    assert len(nodes) >= sizes.sum() // 100
+    assert all(len(cmds.meshes[node]) <= 100 for node in nodes)
+    assert sum(len(cmds.meshes[node]) for node in nodes) == sizes.sum()
+    assert sum(len(cmds.polygons[node][0]) for node in nodes) == \
+        np.array([1, 4])[proto_ids].sum()
+    expected = []
+    for proto_id, name in enumerate(['quad', 'patch']):
+        local = np.column_stack([cmds.meshes[name],
+                                 np.ones(len(cmds.meshes[name]))])
+        expected.append(np.matmul(local, matrices[proto_ids == proto_id])
+                        [:, :, :3].reshape(-1, 3))
+    baked = np.concatenate([cmds.meshes[node] for node in nodes])
+    np.testing.assert_allclose(np.sort(baked, axis=0),
+                               np.sort(np.concatenate(expected), axis=0))
+    for node in nodes:
+        counts, connects = cmds.polygons[node]
+        assert len(connects) == counts.sum()
+        assert connects.max() < len(cmds.meshes[node])
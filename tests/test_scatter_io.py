@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import scatter_io
+
+
+def random_scatter(count, seed=0):
+    rng = np.random.RandomState(seed)
+    return (rng.uniform(-10, 10, (count, 4, 4)),
+            rng.randint(0, 5, count).astype(np.int32),
+            rng.randint(0, 1 << 40, count).astype(np.int64))
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join('scatter.sctc'))
+    matrices, proto_ids, ids = random_scatter(1000)
+    scatter_io.save(path, matrices, proto_ids, ids, ['tree', 'bush'])
+    cache = scatter_io.load(path)
+
+    assert len(cache) == 1000
+    assert cache.prototypes == ['tree', 'bush']
+    assert isinstance(cache.matrices, np.memmap)
+    np.testing.assert_array_equal(cache.matrices,
+                                  matrices.astype(np.float32))
+    np.testing.assert_array_equal(cache.proto_ids, proto_ids)
+    np.testing.assert_array_equal(cache.ids, ids)
+
+
+def test_iter_chunks_covers_every_instance(tmpdir):
+    path = str(tmpdir.join('scatter.sctc'))
+    matrices, proto_ids, ids = random_scatter(250)
+    scatter_io.save(path, matrices, proto_ids, ids, ['tree'])
+    chunks = list(scatter_io.load(path).iter_chunks(100))
+
+    assert [len(chunk[0]) for chunk in chunks] == [100, 100, 50]
+    np.testing.assert_array_equal(
+        np.concatenate([chunk[0] for chunk in chunks]), ids)
+    np.testing.assert_array_equal(
+        np.concatenate([chunk[1] for chunk in chunks]), proto_ids)
+    assert chunks[0][2].dtype == np.float64
+
+
+def test_empty_round_trip(tmpdir):
+    path = str(tmpdir.join('empty.sctc'))
+    scatter_io.save(path, np.zeros((0, 4, 4)), [], [], [])
+    cache = scatter_io.load(path)
+
+    assert len(cache) == 0
+    assert cache.matrices.shape == (0, 4, 4)
+    assert list(cache.iter_chunks()) == []
+
+
+def test_mismatched_lengths_are_rejected(tmpdir):
+    with pytest.raises(ValueError):
+        scatter_io.save(str(tmpdir.join('bad.sctc')), np.zeros((2, 4, 4)),
+                        [0], [0, 1], ['tree'])
+
+
+def test_other_files_are_rejected(tmpdir):
+    path = tmpdir.join('other.sctc')
+    path.write_binary(b'\0' * 64)
+    with pytest.raises(ValueError):
+        scatter_io.load(str(path))
@@ -0,0 +1,29 @@
+import scatter_profile
+
+
+def test_nested_spans_close_inside_their_parent():
+    profiler = scatter_profile.Profiler()
+    profiler.enabled = True
+    with profiler.span('outer', count=2):
+        for _ in profiler.iterate('inner', range(2)):
+            with profiler.span('leaf'):
+                pass
+
+    names = [span[0] for span in profiler.spans]
+    assert names == ['inner', 'leaf', 'inner', 'leaf', 'inner', 'outer']
+    _, start, seconds, _, args = profiler.spans[-1]
+    assert args == {'count': 2}
+    for _, inner_start, inner_seconds, _, _ in profiler.spans[:-1]:
+        assert start <= inner_start
+        assert inner_start + inner_seconds <= start + seconds
+    assert profiler.summary()['inner'][0] == 3
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = scatter_profile.Profiler()
+    proxy = scatter_profile.ProfiledProxy({}, profiler, 'cmds.')
+    with profiler.span('outer'):
+        proxy.get('key')
+
+    assert profiler.spans == []
+    assert not profiler.counters
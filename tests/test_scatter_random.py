@@ -0,0 +1,35 @@
+import numpy as np
+
+import scatter_random
+
+
+RANGES = (((-10.0, 0.0, -5.0), (10.0, 360.0, 5.0)),
+          ((0.5, 0.8, 1.0), (1.5, 1.2, 1.0)), (-1.0, 2.0))
+
+
+def test_scaled_units_match_the_jitter_channels():
+    ids = np.arange(0, 5000, 7, dtype=np.int64)
+    rotations, scales, heights = scatter_random.scale_jitter(
+        scatter_random.jitter_units(11, ids), *RANGES)
+
+    for axis in range(3):
+        np.testing.assert_array_equal(
+            rotations[:, axis],
+            scatter_random.uniform(11, ids, scatter_random.ROT_X + axis,
+                                   RANGES[0][0][axis], RANGES[0][1][axis]))
+        np.testing.assert_array_equal(
+            scales[:, axis],
+            scatter_random.uniform(11, ids, scatter_random.SCL_X + axis,
+                                   RANGES[1][0][axis], RANGES[1][1][axis]))
+    np.testing.assert_array_equal(
+        heights, scatter_random.uniform(11, ids, scatter_random.HEIGHT,
+                                        *RANGES[2]))
+
+
+def test_jitter_of_a_subset_matches():
+    ids = np.arange(1000, dtype=np.int64)
+    full = scatter_random.jitter(3, ids, *RANGES)
+    part = scatter_random.jitter(3, ids[::-3], *RANGES)
+
+    for whole, subset in zip(full, part):
+        np.testing.assert_array_equal(whole[::-3], subset)
@@ -0,0 +1,117 @@
+import numpy as np
+
+import scatter_engine
+import scatter_sampling
+
+
+def pair_distances(positions):
+    """(N, N) distances with inf on the diagonal"""
+    offsets = positions[:, None, :] - positions[None, :, :]
+    distances = np.sqrt((offsets ** 2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    return distances
+
+
+def plane_sampler(size=20.0):
+    points = np.array([[0.0, 0.0, 0.0], [size, 0.0, 0.0],
+                       [size, 0.0, size], [0.0, 0.0, size]])
+    return scatter_sampling.SurfaceSampler(points, [[0, 3, 2], [0, 2, 1]])
+
+
+def thinned(seed, min_distance=0.0, overlap_radius=0.0):
+    sources = [scatter_engine.surface_source(plane_sampler(), 0, 2.0)]
+    batches = list(scatter_engine.iter_batches(
+        sources, seed=seed, min_distance=min_distance, batch_size=100,
+        overlap_radius=overlap_radius))
+    return (np.concatenate([batch[0] for batch in batches]),
+            np.concatenate([batch[2] for batch in batches]))
+
+
+def test_poisson_disk_keeps_points_apart():
+    positions = np.random.RandomState(1).uniform(0, 30, (3000, 3))
+    keep = scatter_sampling.poisson_disk(positions, 2.5)
+
+    assert 0 < len(keep) < len(positions)
+    assert pair_distances(positions[keep]).min() >= 2.5
+    # every rejected point had an accepted one too close
+    dropped = np.setdiff1d(np.arange(len(positions)), keep)
+    offsets = positions[dropped][:, None] - positions[keep][None]
+    assert (np.sqrt((offsets ** 2).sum(axis=2)).min(axis=1) < 2.5).all()
+
+
+def test_poisson_disk_without_radius_keeps_everything():
+    positions = np.zeros((5, 3))
+    np.testing.assert_array_equal(
+        scatter_sampling.poisson_disk(positions, 0.0), np.arange(5))
+
+
+def test_min_distance_scatter_is_deterministic_per_seed():
+    ids, matrices = thinned(4, min_distance=1.5)
+    again_ids, again_matrices = thinned(4, min_distance=1.5)
+    other_ids = thinned(5, min_distance=1.5)[0]
+
+    assert pair_distances(matrices[:, 3, :3]).min() >= 1.5
+    np.testing.assert_array_equal(ids, again_ids)
+    np.testing.assert_array_equal(matrices, again_matrices)
+    assert not np.array_equal(ids, other_ids)
+
+
+def test_reject_overlaps_keeps_spheres_from_touching():
+    rng = np.random.RandomState(2)
+    positions = rng.uniform(0, 30, (2000, 3))
+    radii = rng.uniform(0.2, 2.0, 2000)
+    keep = scatter_sampling.reject_overlaps(positions, radii)
+
+    assert 0 < len(keep) < len(positions)
+    reach = radii[keep][:, None] + radii[keep][None, :]
+    assert (pair_distances(positions[keep]) >= reach).all()
+    # instances are accepted in order, so the first one always stays
+    assert keep[0] == 0
+    dropped = np.setdiff1d(np.arange(len(positions)), keep)
+    offsets = positions[dropped][:, None] - positions[keep][None]
+    touching = np.sqrt((offsets ** 2).sum(axis=2)) < \
+        radii[dropped][:, None] + radii[keep][None, :]
+    assert touching.any(axis=1).all()
+
+
+def test_overlap_scatter_is_deterministic_per_seed():
+    ids, matrices = thinned(4, overlap_radius=0.6)
+    again_ids, again_matrices = thinned(4, overlap_radius=0.6)
+
+    assert 0 < len(ids) < len(thinned(4)[0])
+    assert pair_distances(matrices[:, 3, :3]).min() >= 1.2
+    np.testing.assert_array_equal(ids, again_ids)
+    np.testing.assert_array_equal(matrices, again_matrices)
+    assert not np.array_equal(ids, thinned(5, overlap_radius=0.6)[0])
+
+
+def alias_odds(table):
+    """probability of every column under the table, worked out exactly"""
+    odds = table.prob.copy()
+    np.add.at(odds, table.alias, 1.0 - table.prob)
+    return odds / len(odds)
+
+
+def test_alias_table_reproduces_the_weights():
+    rng = np.random.RandomState(6)
+    for _ in range(50):
+        weights = rng.exponential(size=rng.randint(1, 80))
+        weights[rng.uniform(size=len(weights)) < 0.3] = 0.0
+        if not weights.any():
+            continue
+        table = scatter_sampling.AliasTable(weights)
+
+        assert ((table.prob >= 0.0) & (table.prob <= 1.0)).all()
+        np.testing.assert_allclose(alias_odds(table),
+                                   weights / weights.sum(), atol=1e-12)
+
+
+def test_alias_table_draws_follow_the_weights():
+    weights = np.array([1.0, 0.0, 3.0, 6.0, 0.5, 0.5])
+    table = scatter_sampling.AliasTable(weights)
+    rng = np.random.RandomState(0)
+    drawn = table.draw(rng.uniform(size=200000), rng.uniform(size=200000))
+
+    np.testing.assert_allclose(np.bincount(drawn, minlength=6) / 200000.0,
+                               weights / weights.sum(), atol=0.005)
+    assert not (drawn == 1).any()